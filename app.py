@@ -1,7 +1,10 @@
+import hashlib
+import time
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib
+import altair as alt
 from streamlit.components.v1 import html
 
 # =========================
@@ -584,19 +587,69 @@ setup_interface()
 
 # ----- NEW: import explainability helpers -----
 try:
-    from explain import explain_flow, simple_explanation, load_error
+    from explain import explain_flow, simple_explanation, load_error, FEATURE_ORDER
+    from explain import set_model as explain_set_model
 except Exception as e:
     explain_flow = None
     simple_explanation = None
+    explain_set_model = None
+    FEATURE_ORDER = None
     load_error = f"Could not import explain_flow/simple_explanation from explain.py: {e}"
 
 # ----- NEW: import threat ledger helpers -----
 try:
-    from ledger import add_log, verify_chain, get_chain_as_list
+    from ledger import (
+        add_log, add_logs, verify_chain, get_chain_as_list, audit_chain, audit_report,
+        get_merkle_root, get_inclusion_proof, query_blocks, ledger_facets,
+        idempotency_key, find_block, get_block_features,
+    )
+    from merkle import verify_inclusion
 except Exception:
     add_log = None
+    add_logs = None
     verify_chain = None
     get_chain_as_list = None
+    audit_chain = None
+    audit_report = None
+    get_merkle_root = None
+    get_inclusion_proof = None
+    verify_inclusion = None
+    query_blocks = None
+    ledger_facets = None
+    idempotency_key = None
+    find_block = None
+    get_block_features = None
+
+# ----- model scoring helpers (shared with the headless batch scorer) -----
+import scoring
+from scoring import (
+    MODEL_PATH, build_sweep_grid, ledger_batch, prepare_feature_frame,
+    recommend_action,
+)
+
+# ----- hot-reloadable live model -----
+from model_manager import ModelManager
+
+# ----- cascaded inference (fast model first, ensemble for the uncertain band) -----
+import cascade
+
+# ----- latency-tiered scoring (truncated tree ranges under load) -----
+from latency_tiers import TIER_NAMES, TierPolicy, load_tiers, run_tiered
+
+# ----- shadow scoring of a candidate model -----
+import shadow
+
+# ----- background bulk-analysis jobs -----
+from bulk_jobs import CANCELLED, DONE, QUEUED, JobRunner
+
+# ----- streaming, compressed results export -----
+from results_export import available_formats, export_bytes, export_file_name, export_mime
+
+# ----- server-side results explorer -----
+from results_view import ResultsView
+
+# ----- per-upload column statistics (simulator slider ranges) -----
+from column_profile import build_profile, slider_max
 
 # =========================
 # AUTH GATE (LIGHTWEIGHT)
@@ -669,23 +722,42 @@ with col_title:
 # 1. LOAD THE TRAINED MODEL
 # =========================
 
+# Seconds between checks of the model file for a new version
+MODEL_WATCH_SECONDS = 5.0
+
 @st.cache_resource
-def load_model():
+def model_manager():
     """
-    Loads the trained model from best_threshold.pkl.
-    Assumes this file is in the SAME FOLDER as this app.py.
+    Owner of the live model (see model_manager.py): loads best_threshold.pkl
+    (same folder as this app.py), watches it, and hot-swaps validated new
+    versions for every session and for explain.py – no restart needed.
     """
-    model_path = "best_threshold.pkl"
-    model = joblib.load(model_path)
-    return model
+    manager = ModelManager(MODEL_PATH)
+    if explain_set_model is not None:
+        manager.add_listener(lambda loaded: explain_set_model(loaded.model))
+    manager.watch(MODEL_WATCH_SECONDS)
+    return manager
+
+def model_version():
+    """
+    Short content hash of this run's model. Part of every ledger idempotency
+    key, so the same flow scored by a retrained model is a new incident.
+    """
+    return live_model.version
 
 try:
-    model = load_model()
+    # One snapshot per script run: everything this run (or a job it starts)
+    # scores uses this version, even if a newer one is swapped in meanwhile
+    live_model = model_manager().current
+    model = live_model.model
 
     # Show this toast only once per session
     if "core_loaded_toast_shown" not in st.session_state:
         st.toast("✅ ML Neural Core Loaded Successfully", icon="🔋")
         st.session_state["core_loaded_toast_shown"] = True
+    elif st.session_state.get("model_version_seen") not in (None, live_model.version):
+        st.toast(f"🔁 Model updated to version {live_model.version}", icon="🔋")
+    st.session_state["model_version_seen"] = live_model.version
 
 except Exception as e:
     st.error("❌ Could not load model. Make sure 'best_threshold.pkl' is in the same folder.")
@@ -703,54 +775,6 @@ if st.session_state.get("auth_success"):
 # 2. HELPER FUNCTIONS
 # =========================
 
-def normalize_label(raw_label):
-    """
-    Convert whatever the model outputs into either:
-    - 'Intrusion'
-    - 'Benign'
-
-    Handles:
-    - 0 / 1
-    - strings like 'normal', 'attack', etc.
-    """
-    # Numeric
-    if isinstance(raw_label, (int, float, np.integer, np.floating)):
-        return "Intrusion" if int(raw_label) == 1 else "Benign"
-
-    s = str(raw_label).strip().lower()
-    if s in ["1", "attack", "intrusion", "malicious", "anomaly", "bad"]:
-        return "Intrusion"
-    if s in ["0", "normal", "benign", "good"]:
-        return "Benign"
-
-    # Fallback: treat unknown as Benign (safer for demo)
-    return "Benign"
-
-
-def recommend_action(label, score=None):
-    """
-    Given:
-      - label: 'Intrusion' or 'Benign'
-      - score: confidence (0–1) if available
-    Returns: text like BLOCK / QUARANTINE / ALERT / ALLOW
-    """
-    if label == "Intrusion":
-        if score is not None:
-            if score >= 0.9:
-                return "BLOCK"
-            elif score >= 0.7:
-                return "QUARANTINE"
-            else:
-                return "ALERT"
-        else:
-            return "BLOCK"
-    else:  # Benign
-        if score is not None and score >= 0.9:
-            return "ALLOW"
-        else:
-            return "ALLOW (monitor)"
-
-
 def build_analyst_summary(flow_dict, pred_label, action, score_display, explanation_text=None) -> str:
     """
     Build a plain-English justification for the decision so a security analyst
@@ -833,57 +857,858 @@ def build_analyst_summary(flow_dict, pred_label, action, score_display, explanat
     return "\n".join(lines)
 
 
-def run_model_on_df(df: pd.DataFrame) -> pd.DataFrame:
+def intrusion_proba(feature_df: pd.DataFrame) -> np.ndarray:
+    """P(Intrusion) per row of a prepared feature frame, from the loaded model."""
+    return scoring.intrusion_proba(model, feature_df)
+
+
+def upload_cache_key(uploaded_file):
+    """
+    Identify an upload without hashing its bytes: Streamlit gives every upload
+    its own file_id. Older versions have none, and the parse cache is shared by
+    every session, so the fallback key includes a hash of the content – two
+    users' files with the same name and size must never share a cache entry.
+    """
+    file_id = getattr(uploaded_file, "file_id", None)
+    if file_id:
+        return file_id
+    uploaded_file.seek(0)
+    digest = hashlib.sha256(uploaded_file.read()).hexdigest()
+    return f"{getattr(uploaded_file, 'name', 'upload')}:{getattr(uploaded_file, 'size', None)}:{digest}"
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _parse_csv_cached(cache_key, _uploaded_file) -> pd.DataFrame:
+    _uploaded_file.seek(0)
+    return pd.read_csv(_uploaded_file)
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _profile_cached(cache_key, _df: pd.DataFrame) -> dict:
+    return build_profile(_df, columns=FEATURE_ORDER)
+
+
+def load_uploaded_csv(uploaded_file) -> pd.DataFrame:
     """
-    Core function:
-    - Takes a DataFrame with (optionally) a 'label' column from training
-    - Drops non-feature columns like 'label' and 'num_outbound_cmds'
-    - Runs model.predict and (if supported) model.predict_proba
-    - Adds columns: prediction_raw, label, score, recommended_action
+    Parse an uploaded CSV once per upload and reuse it on every rerun.
+    The returned DataFrame is shared between reruns – treat it as read-only.
     """
-    # Keep original for display + download
-    result = df.copy()
+    return _parse_csv_cached(upload_cache_key(uploaded_file), uploaded_file)
 
-    # Build feature-only DataFrame for the model
-    feature_df = df.copy()
 
-    # Drop training label if present
-    if "label" in feature_df.columns:
-        feature_df = feature_df.drop(columns=["label"])
+def load_upload_profile(uploaded_file, df: pd.DataFrame) -> dict:
+    """
+    Column statistics profile (min/max/quantiles/cardinality for every
+    FEATURE_ORDER column) of an upload, computed once and cached next to
+    the parsed data.
+    """
+    return _profile_cached(upload_cache_key(uploaded_file), df)
+
 
-    # Model was trained WITHOUT this column
-    if "num_outbound_cmds" in feature_df.columns:
-        feature_df = feature_df.drop(columns=["num_outbound_cmds"])
+def sweep_range(profile: dict, col: str):
+    """
+    (min, max) sweep bounds for a simulator feature: rate features live in
+    [0, 1], counters/volumes go up to twice their 95th percentile.
+    """
+    if col.endswith("_rate"):
+        return 0.0, 1.0
+    return 0.0, slider_max(profile, col)
 
-    # Keep only numeric columns – model is fully numerical
-    feature_df = feature_df.select_dtypes(include=["number"])
 
-    # --- Prediction ---
-    preds = model.predict(feature_df)
-    result["prediction_raw"] = preds
+def score_sweep_grid(grid: pd.DataFrame) -> pd.DataFrame:
+    """
+    Score a whole sweep grid in a single batched model call.
 
-    # --- Probability / confidence (if available) ---
+    Returns the grid with `p_intrusion`, `label`, `score` and
+    `recommended_action` columns. The label/score follow the model's own
+    argmax decision, so the decision boundary sits at p_intrusion = 0.5.
+    """
+    p = intrusion_proba(prepare_feature_frame(grid))
+
+    out = grid.copy()
+    out["p_intrusion"] = p
+    out["label"] = np.where(p > 0.5, "Intrusion", "Benign")
+    out["score"] = np.maximum(p, 1.0 - p).round(3)
+    out["recommended_action"] = [
+        recommend_action(lbl, sc) for lbl, sc in zip(out["label"], out["score"])
+    ]
+    return out
+
+
+@st.cache_resource(show_spinner=False)
+def shadow_scorer():
+    """
+    The shared candidate-model shadow scorer (see shadow.py), or None if the
+    candidate cannot be loaded. Switched on / off on the Model & Evaluation page.
+    """
     try:
-        proba = model.predict_proba(feature_df)
-        scores = proba.max(axis=1)
-        result["score"] = scores.round(3)
+        return shadow.load_shadow()
     except Exception:
-        pass
+        return None
+
+
+def active_shadow():
+    scorer = shadow_scorer()
+    return scorer if scorer is not None and scorer.enabled else None
+
+
+def run_model_on_df(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Score a DataFrame with the loaded model: adds prediction_raw, label,
+    score and recommended_action (see scoring.run_model_on_df).
+    """
+    model_manager().note_batch(df)  # first full-size batch becomes the reload canary
+    return scoring.run_model_on_df(model, df, shadow=active_shadow())
 
-    # --- Normalize labels to 'Intrusion' / 'Benign' ---
-    result["label"] = result["prediction_raw"].apply(normalize_label)
 
-    # --- Recommended action ---
-    if "score" in result.columns:
-        result["recommended_action"] = [
-            recommend_action(lbl, sc) for lbl, sc in zip(result["label"], result["score"])
-        ]
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cascade_cached(version, _full):
+    try:
+        return cascade.load_cascade(full=_full)
+    except Exception:
+        return None
+
+
+def load_cascade_model():
+    """
+    The fast-model-first cascade over this run's model (see cascade.py),
+    or None if the fast model is missing or unusable.
+    """
+    return _cascade_cached(live_model.version, model)
+
+
+def run_cascade_on_df(df: pd.DataFrame) -> pd.DataFrame:
+    """run_model_on_df in cascade mode: adds a scored_by ('fast' / 'full') column."""
+    return scoring.run_model_on_df(load_cascade_model(), df, shadow=active_shadow())
+
+# =========================
+# 2b. WHAT-IF SIMULATOR PANELS (PARTIAL RERUNS)
+# =========================
+
+# Widgets inside a fragment only rerun the fragment, not the whole script
+# (no CSS injection, CSV re-parse or baseline re-scoring on every slider move).
+# Older Streamlit versions without fragments fall back to a normal full rerun.
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or (lambda f: f)
+
+
+def score_single_flow(row: pd.Series):
+    """
+    Fast path for ONE flow: a single predict_proba call on a 1-row frame,
+    no result copies. Returns (label, recommended_action, score).
+    """
+    one = pd.DataFrame({col: [row[col]] for col in row.index})
+    scored = score_sweep_grid(one)
+    return (
+        scored["label"].iloc[0],
+        scored["recommended_action"].iloc[0],
+        float(scored["score"].iloc[0]),
+    )
+
+
+@fragment
+def render_simulation_panel(df_sim, sim_profile, base_row, base_label, base_action, base_score):
+    """
+    Step 2 of the simulator: sliders + live comparison against the baseline.
+    Runs as its own partial-rerun region; every slider release rescores only the
+    modified row (sliders emit on release, and unchanged rows are not rescored).
+    """
+    st.write("### Step 2: Tweak key features and simulate")
+
+    sim_row = base_row.copy()
+    updated_values = {}
+
+    st.write("#### Core volume / frequency features")
+    col_int1, col_int2, col_int3 = st.columns(3)
+    with col_int1:
+        if "duration" in df_sim.columns:
+            updated_values["duration"] = st.slider(
+                "duration (connection length)",
+                min_value=0,
+                max_value=int(slider_max(sim_profile, "duration", key="max", floor=1)),
+                value=int(base_row["duration"]),
+                step=1,
+            )
+    with col_int2:
+        if "src_bytes" in df_sim.columns:
+            updated_values["src_bytes"] = st.slider(
+                "src_bytes (bytes from source)",
+                min_value=0,
+                max_value=int(slider_max(sim_profile, "src_bytes", floor=1000)),
+                value=int(base_row["src_bytes"]),
+                step=1,
+            )
+    with col_int3:
+        if "dst_bytes" in df_sim.columns:
+            updated_values["dst_bytes"] = st.slider(
+                "dst_bytes (bytes to destination)",
+                min_value=0,
+                max_value=int(slider_max(sim_profile, "dst_bytes", floor=1000)),
+                value=int(base_row["dst_bytes"]),
+                step=1,
+            )
+
+    col_int4, col_int5 = st.columns(2)
+    with col_int4:
+        if "count" in df_sim.columns:
+            updated_values["count"] = st.slider(
+                "count (connections to same host)",
+                min_value=0,
+                max_value=int(slider_max(sim_profile, "count", floor=10)),
+                value=int(base_row["count"]),
+                step=1,
+            )
+    with col_int5:
+        if "srv_count" in df_sim.columns:
+            updated_values["srv_count"] = st.slider(
+                "srv_count (connections to same service)",
+                min_value=0,
+                max_value=int(slider_max(sim_profile, "srv_count", floor=10)),
+                value=int(base_row["srv_count"]),
+                step=1,
+            )
+
+    st.write("#### Error / anomaly rate features (0.0 – 1.0)")
+    col_rate1, col_rate2, col_rate3 = st.columns(3)
+    with col_rate1:
+        if "serror_rate" in df_sim.columns:
+            updated_values["serror_rate"] = st.slider(
+                "serror_rate",
+                min_value=0.0,
+                max_value=1.0,
+                value=float(base_row["serror_rate"]),
+                step=0.01,
+            )
+    with col_rate2:
+        if "srv_serror_rate" in df_sim.columns:
+            updated_values["srv_serror_rate"] = st.slider(
+                "srv_serror_rate",
+                min_value=0.0,
+                max_value=1.0,
+                value=float(base_row["srv_serror_rate"]),
+                step=0.01,
+            )
+    with col_rate3:
+        if "same_srv_rate" in df_sim.columns:
+            updated_values["same_srv_rate"] = st.slider(
+                "same_srv_rate",
+                min_value=0.0,
+                max_value=1.0,
+                value=float(base_row["same_srv_rate"]),
+                step=0.01,
+            )
+
+    col_rate4, col_rate5, col_rate6 = st.columns(3)
+    with col_rate4:
+        if "diff_srv_rate" in df_sim.columns:
+            updated_values["diff_srv_rate"] = st.slider(
+                "diff_srv_rate",
+                min_value=0.0,
+                max_value=1.0,
+                value=float(base_row["diff_srv_rate"]),
+                step=0.01,
+            )
+    with col_rate5:
+        if "dst_host_same_srv_rate" in df_sim.columns:
+            updated_values["dst_host_same_srv_rate"] = st.slider(
+                "dst_host_same_srv_rate",
+                min_value=0.0,
+                max_value=1.0,
+                value=float(base_row["dst_host_same_srv_rate"]),
+                step=0.01,
+            )
+    with col_rate6:
+        if "dst_host_srv_diff_host_rate" in df_sim.columns:
+            updated_values["dst_host_srv_diff_host_rate"] = st.slider(
+                "dst_host_srv_diff_host_rate",
+                min_value=0.0,
+                max_value=1.0,
+                value=float(base_row["dst_host_srv_diff_host_rate"]),
+                step=0.01,
+            )
+
+    # Apply the updated values into a copy of the base row
+    for k, v in updated_values.items():
+        sim_row[k] = v
+
+    # Skip rescoring when nothing changed since the last run of this panel
+    sim_key = tuple(sim_row.tolist())
+    last = st.session_state.get("sim_last_scored")
+    t0 = time.perf_counter()
+    if last is not None and last[0] == sim_key:
+        sim_label, sim_action, sim_score = last[1]
     else:
-        result["recommended_action"] = [
-            recommend_action(lbl, None) for lbl in result["label"]
-        ]
+        sim_label, sim_action, sim_score = score_single_flow(sim_row)
+        st.session_state["sim_last_scored"] = (sim_key, (sim_label, sim_action, sim_score))
+    elapsed_ms = (time.perf_counter() - t0) * 1000
+
+    st.markdown("### 🔍 Comparison: Original vs Simulated")
+
+    col_a, col_b = st.columns(2)
+    with col_a:
+        st.markdown("**Original flow**")
+        st.metric("Prediction", base_label)
+        st.metric("Action", base_action)
+        st.metric("Confidence", f"{base_score:.3f}" if base_score is not None else "N/A")
+    with col_b:
+        st.markdown("**Simulated flow**")
+        st.metric("Prediction", sim_label)
+        st.metric("Action", sim_action)
+        st.metric("Confidence", f"{sim_score:.3f}" if sim_score is not None else "N/A")
+
+    st.caption(f"⚡ Live rescoring: simulated flow scored in {elapsed_ms:.0f} ms.")
+
+    if st.button("🧠 Explain simulated flow (XAI + justification)"):
+        st.write("#### Simulated flow (full feature view)")
+        st.json(sim_row.to_dict())
+
+        # ---------- XAI on the simulated flow ----------
+        st.write("### 🧠 Why did the model say this? (XAI on simulated flow)")
+
+        explanation_text = None
+        reasons = []
+
+        if explain_flow is None:
+            st.warning(
+                "Explainability module could not be imported. "
+                "Check explain.py and that it's in the same folder."
+            )
+        else:
+            try:
+                explanation_text = explain_flow(sim_row.to_dict(), top_n=5)
+                st.code(explanation_text, language="markdown")
+
+                # Parse into reasons for simple_explanation
+                if explanation_text:
+                    for line in explanation_text.splitlines():
+                        if line.startswith("- ") and "importance=" in line:
+                            try:
+                                body = line[2:]
+                                name_part, rest = body.split(":", 1)
+                                name = name_part.strip()
+
+                                val_str = None
+                                imp_str = None
+                                if "value=" in rest:
+                                    val_str = rest.split("value=", 1)[1].split(",", 1)[0].strip()
+                                if "importance=" in rest:
+                                    imp_str = rest.split("importance=", 1)[1].strip()
+
+                                reasons.append((name, val_str, imp_str))
+                            except Exception:
+                                continue
+            except Exception as e:
+                st.error("Explainability failed at runtime.")
+                st.exception(e)
+
+        if load_error:
+            st.caption(f"ℹ️ explain.py model note: {load_error}")
+
+        st.write("### 📌 Simplified Analyst Summary (simulated flow)")
+        if simple_explanation is not None and reasons:
+            simple_msg = simple_explanation(sim_label, sim_score, reasons)
+            st.success(simple_msg)
+        elif simple_explanation is None:
+            st.caption("simple_explanation function not available in explain.py.")
+        else:
+            st.caption("No detailed feature importance available to build a summary.")
+
+        st.write("### 📄 Analyst-friendly justification (simulated flow)")
+        justification = build_analyst_summary(
+            flow_dict=sim_row.to_dict(),
+            pred_label=sim_label,
+            action=sim_action,
+            score_display=sim_score,
+            explanation_text=explanation_text,
+        )
+        st.markdown(justification)
+
+
+@fragment
+def render_sweep_panel(sim_profile, base_row):
+    """
+    Step 3 of the simulator: batched sensitivity sweep around the base flow,
+    also isolated as a partial-rerun region.
+    """
+    # ----- Step 3: Sensitivity sweep / decision boundary -----
+    st.write("### Step 3: Sensitivity sweep (decision boundary map)")
+    st.caption(
+        "Sweep one or two features across a dense grid around the base flow. "
+        "The whole grid is scored in ONE batched model call."
+    )
+
+    sweepable = [c for c in sim_profile if c not in ("label", "num_outbound_cmds")]
+    default_x = sweepable.index("src_bytes") if "src_bytes" in sweepable else 0
+    default_y = sweepable.index("serror_rate") + 1 if "serror_rate" in sweepable else 0
+
+    col_sx, col_sy, col_res = st.columns(3)
+    with col_sx:
+        sweep_x = st.selectbox("Feature on X axis", sweepable, index=default_x, key="sweep_x")
+    with col_sy:
+        sweep_y = st.selectbox(
+            "Feature on Y axis (optional)", ["(none)"] + sweepable, index=default_y, key="sweep_y"
+        )
+    with col_res:
+        resolution = st.slider("Grid resolution (points per axis)", 10, 200, 100, 10, key="sweep_res")
+
+    if sweep_y == sweep_x:
+        sweep_y = "(none)"
+
+    if st.button("🗺️ Run sensitivity sweep"):
+        x_lo, x_hi = sweep_range(sim_profile, sweep_x)
+        sweep = {sweep_x: np.linspace(x_lo, x_hi, resolution)}
+        if sweep_y != "(none)":
+            y_lo, y_hi = sweep_range(sim_profile, sweep_y)
+            sweep[sweep_y] = np.linspace(y_lo, y_hi, resolution)
+
+        grid = build_sweep_grid(base_row, sweep)
+        t0 = time.perf_counter()
+        with st.spinner(f"Scoring {len(grid):,} grid points in one batch..."):
+            surface = score_sweep_grid(grid)
+        elapsed_ms = (time.perf_counter() - t0) * 1000
+
+        st.caption(
+            f"Scored {len(surface):,} points in a single model call ({elapsed_ms:.0f} ms). "
+            "Decision boundary: p(intrusion) = 0.5 · tiers: ALERT < 0.7 ≤ QUARANTINE < 0.9 ≤ BLOCK."
+        )
+
+        if sweep_y == "(none)":
+            line = alt.Chart(surface).mark_line(color="#00f3ff").encode(
+                x=alt.X(f"{sweep_x}:Q", title=sweep_x),
+                y=alt.Y("p_intrusion:Q", title="p(intrusion)", scale=alt.Scale(domain=[0, 1])),
+                tooltip=[sweep_x, "p_intrusion", "label", "recommended_action"],
+            )
+            tiers = pd.DataFrame({
+                "p_intrusion": [0.1, 0.5, 0.7, 0.9],
+                "tier": ["ALLOW ≤ 0.1", "decision boundary", "QUARANTINE ≥ 0.7", "BLOCK ≥ 0.9"],
+            })
+            rules = alt.Chart(tiers).mark_rule(strokeDash=[4, 4]).encode(
+                y="p_intrusion:Q",
+                color=alt.Color("tier:N", title="Action tiers"),
+            )
+            st.altair_chart(line + rules, use_container_width=True)
+        else:
+            x_step = (sweep[sweep_x][1] - sweep[sweep_x][0]) / 2 if resolution > 1 else 0.5
+            y_step = (sweep[sweep_y][1] - sweep[sweep_y][0]) / 2 if resolution > 1 else 0.5
+            surface["x0"] = surface[sweep_x] - x_step
+            surface["x1"] = surface[sweep_x] + x_step
+            surface["y0"] = surface[sweep_y] - y_step
+            surface["y1"] = surface[sweep_y] + y_step
+
+            # Cells where the label / action tier changes vs. the next cell on either axis
+            labels = surface["label"].to_numpy().reshape(resolution, resolution)
+            actions = surface["recommended_action"].to_numpy().reshape(resolution, resolution)
+            label_edge = np.zeros_like(labels, dtype=bool)
+            tier_edge = np.zeros_like(actions, dtype=bool)
+            label_edge[:-1, :] |= labels[:-1, :] != labels[1:, :]
+            label_edge[:, :-1] |= labels[:, :-1] != labels[:, 1:]
+            tier_edge[:-1, :] |= actions[:-1, :] != actions[1:, :]
+            tier_edge[:, :-1] |= actions[:, :-1] != actions[:, 1:]
+            surface["edge"] = np.where(
+                label_edge.ravel(), "decision boundary",
+                np.where(tier_edge.ravel(), "action tier", "")
+            )
+
+            heat = alt.Chart(surface).mark_rect().encode(
+                x=alt.X("x0:Q", title=sweep_x),
+                x2="x1:Q",
+                y=alt.Y("y0:Q", title=sweep_y),
+                y2="y1:Q",
+                color=alt.Color(
+                    "p_intrusion:Q",
+                    title="p(intrusion)",
+                    scale=alt.Scale(scheme="magma", domain=[0, 1]),
+                ),
+                tooltip=[sweep_x, sweep_y, "p_intrusion", "label", "recommended_action"],
+            )
+            edges = alt.Chart(surface[surface["edge"] != ""]).mark_circle(size=12).encode(
+                x=f"{sweep_x}:Q",
+                y=f"{sweep_y}:Q",
+                color=alt.Color(
+                    "edge:N",
+                    title="Overlay",
+                    scale=alt.Scale(
+                        domain=["decision boundary", "action tier"],
+                        range=["#00f3ff", "#ff00c8"],
+                    ),
+                ),
+            )
+            st.altair_chart(heat + edges, use_container_width=True)
+
+        tier_counts = surface["recommended_action"].value_counts()
+        st.write("#### Action tier coverage across the grid")
+        st.dataframe(
+            tier_counts.rename("grid_points").to_frame(),
+            use_container_width=True,
+        )
+
+
+# =========================
+# 2c. THREAT LEDGER BROWSER (PAGINATED)
+# =========================
+
+LEDGER_TIME_WINDOWS = {
+    "All time": None,
+    "Last hour": 3600,
+    "Last 24 hours": 86400,
+    "Last 7 days": 7 * 86400,
+}
+
+
+@fragment
+def render_ledger_browser():
+    """
+    Filtered, paginated view of the threat ledger. Filters run on the
+    ledger's secondary indexes and only the visible page of blocks is
+    fetched, so paging through a large ledger stays responsive.
+    """
+    facets = ledger_facets()
+
+    f1, f2, f3 = st.columns(3)
+    labels = f1.multiselect("Label", facets["labels"], key="ledger_view_labels")
+    actions = f2.multiselect("Recommended action", facets["actions"], key="ledger_view_actions")
+    window = f3.selectbox("Time window", list(LEDGER_TIME_WINDOWS), key="ledger_view_window")
+
+    f4, f5, f6 = st.columns(3)
+    conf_lo, conf_hi = f4.slider(
+        "Confidence band", 0.0, 1.0, (0.0, 1.0), 0.01, key="ledger_view_conf"
+    )
+    flow_text = f5.text_input("flow_index (exact)", key="ledger_view_flow").strip()
+    page_size = f6.selectbox("Blocks per page", [25, 50, 100, 250], index=1, key="ledger_view_page_size")
+
+    p1, p2 = st.columns([1, 2])
+    page = p1.number_input("Page", min_value=1, step=1, key="ledger_view_page")
+    newest_first = p2.checkbox("Newest first", value=True, key="ledger_view_newest")
+
+    flow_index = None
+    if flow_text:
+        try:
+            flow_index = int(flow_text)
+        except ValueError:
+            st.warning("flow_index must be an integer – filter ignored.")
+
+    seconds = LEDGER_TIME_WINDOWS[window]
+    result = query_blocks(
+        page=int(page) - 1,
+        page_size=page_size,
+        newest_first=newest_first,
+        start_time=time.time() - seconds if seconds else None,
+        labels=labels or None,
+        actions=actions or None,
+        # The full band means "no filter", so blocks without a confidence (genesis) still show
+        min_confidence=conf_lo if conf_lo > 0.0 else None,
+        max_confidence=conf_hi if conf_hi < 1.0 else None,
+        flow_index=flow_index,
+    )
+
+    st.caption(
+        f"{result['total']:,} matching blocks (of {facets['blocks']:,}) · "
+        f"page {result['page'] + 1} of {result['pages']}"
+    )
+    blocks = result["blocks"]
+    if not blocks:
+        st.info("No ledger blocks match these filters.")
+        return
+
+    page_df = pd.DataFrame({
+        "index": [b["index"] for b in blocks],
+        "time": pd.to_datetime([b["timestamp"] for b in blocks], unit="s"),
+        "event_type": [b["event_type"] for b in blocks],
+        "label": [b["data"].get("label") for b in blocks],
+        "recommended_action": [b["data"].get("recommended_action") for b in blocks],
+        "confidence": [b["data"].get("confidence") for b in blocks],
+        "flow_index": [b["data"].get("flow_index") for b in blocks],
+        "hash": [b["hash"][:16] + "…" for b in blocks],
+    })
+    st.dataframe(page_df, use_container_width=True, hide_index=True)
+
+    by_index = {b["index"]: b for b in blocks}
+    shown = st.selectbox("Inspect block", list(by_index), key="ledger_view_block")
+    st.json(by_index[shown])
+
+    # Blocks only carry a digest of the flow; the row itself lives in the feature store
+    if get_block_features is not None and "features_digest" in by_index[shown]["data"]:
+        try:
+            features = get_block_features(by_index[shown])
+        except ValueError as e:
+            st.error(f"⚠️ {e}")
+        else:
+            if features is None:
+                st.warning("Feature row for this block is missing from the feature store.")
+            else:
+                st.caption("Flow features (content-addressed, verified against the block's digest)")
+                st.dataframe(pd.DataFrame([features]), use_container_width=True)
+
+
+# =========================
+# 2d. BULK ANALYSIS JOBS (BACKGROUND)
+# =========================
+
+BULK_JOB_WORKERS = 2
+
+
+@st.cache_resource
+def bulk_job_runner():
+    """One bounded scoring pool (and its retained results) shared by all sessions."""
+    return JobRunner(max_workers=BULK_JOB_WORKERS)
+
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def tier_measurements(version):
+    """Up-front accuracy / cost measurements of the latency tiers for this model, or None."""
+    config = load_tiers(version)
+    return config["tiers"] if config else None
+
+
+def make_tiered_scorer(runner, budget_ms_per_1k=None):
+    """
+    Bulk score function that picks a latency tier per chunk from the budget
+    and the number of queued jobs (see latency_tiers.py).
+    """
+    policy = TierPolicy(
+        budget_ms_per_1k,
+        queue_depth=lambda: sum(j.status == QUEUED for j in runner.jobs()),
+        measurements=tier_measurements(live_model.version),
+    )
+    scoring_model = model
+
+    def score(df):
+        return run_tiered(scoring_model, df, policy, shadow=active_shadow())
+
+    return score
+
+
+def polling_fragment(seconds):
+    """Fragment that reruns itself every `seconds` (plain function without fragment support)."""
+    frag = getattr(st, "fragment", None)
+    return frag(run_every=seconds) if frag is not None else (lambda f: f)
+
+
+@polling_fragment(1.0)
+def render_bulk_job_progress(job_id):
+    """
+    Live progress of a running bulk job (rows scored, throughput) with a
+    cancel button. Polls on its own; redraws the whole page once the job ends.
+    """
+    runner = bulk_job_runner()
+    job = runner.get(job_id)
+    if job is None or not job.active:
+        st.rerun()
+
+    if job.status == QUEUED:
+        st.progress(0.0, text=f"⏳ Queued – waiting for a free worker ({job.total_rows:,} flows)")
+    else:
+        rate = f" · {job.rows_per_s:,.0f} flows/s" if job.rows_per_s else ""
+        st.progress(
+            job.progress,
+            text=f"Scoring flows: {job.processed_rows:,} / {job.total_rows:,}{rate}",
+        )
+
+    if job.cancel_requested:
+        st.caption("Cancelling after the current chunk…")
+    elif st.button("✖ Cancel analysis", key=f"bulk_cancel_{job_id}"):
+        runner.cancel(job_id)
+        st.caption("Cancelling after the current chunk…")
+
+
+def render_bulk_job_history(runner):
+    """Selector for finished analyses kept by the job runner; returns a job id or None."""
+    finished = [j for j in runner.jobs() if j.status == DONE]
+    if not finished:
+        return None
+    labels = {
+        j.job_id: f"{j.name} · {j.total_rows:,} flows · model {j.model_version} · job {j.job_id}"
+        for j in finished
+    }
+    return st.selectbox(
+        "Reopen a previous analysis",
+        list(labels),
+        format_func=labels.get,
+        key="bulk_job_pick",
+    )
+
+
+@st.cache_resource(show_spinner=False, max_entries=8)
+def _results_view_cached(job_id, _results) -> ResultsView:
+    return ResultsView(_results)
+
+
+def load_results_view(job_id, results) -> ResultsView:
+    """Filter / sort / page view of a finished job's results, built once per job."""
+    return _results_view_cached(job_id, results)
+
+
+@fragment
+def render_results_explorer(job_id, results):
+    """
+    Detailed results, one page at a time: label / action / score filters and
+    sorting run server-side on the job's ResultsView, and only the visible
+    page of rows is sent to the browser.
+    """
+    view = load_results_view(job_id, results)
+
+    f1, f2, f3 = st.columns(3)
+    labels = f1.multiselect("Label", view.vocabulary("label"), key="results_view_labels")
+    actions = f2.multiselect(
+        "Recommended action", view.vocabulary("recommended_action"), key="results_view_actions"
+    )
+    score_lo, score_hi = f3.slider(
+        "Score range", 0.0, 1.0, (0.0, 1.0), 0.01, key="results_view_score"
+    )
+
+    s1, s2, s3, s4 = st.columns([2, 1, 1, 1])
+    sort_by = s1.selectbox(
+        "Sort by", ["(original order)"] + view.sortable_columns(), key="results_view_sort"
+    )
+    descending = s2.checkbox("Descending", value=True, key="results_view_desc")
+    page_size = s3.selectbox("Rows per page", [25, 50, 100, 250, 500], index=1, key="results_view_page_size")
+    page = s4.number_input("Page", min_value=1, step=1, key="results_view_page")
+
+    result = view.query(
+        labels=labels or None,
+        actions=actions or None,
+        # The full range means "no filter", so rows without a score still show
+        min_score=score_lo if score_lo > 0.0 else None,
+        max_score=score_hi if score_hi < 1.0 else None,
+        sort_by=None if sort_by == "(original order)" else sort_by,
+        descending=descending,
+        page=int(page) - 1,
+        page_size=page_size,
+    )
+    st.caption(
+        f"{result['total']:,} matching flows (of {len(view):,}) · "
+        f"page {result['page'] + 1} of {result['pages']}"
+    )
+    if result["total"] == 0:
+        st.info("No flows match these filters.")
+        return
+    st.dataframe(result["rows"], use_container_width=True)
+
+
+# Streamlit versions whose download_button takes a callable build the file on click
+DEFERRED_DOWNLOADS = "callable" in (st.download_button.__doc__ or "")
+
+
+def render_results_export(results, job_id):
+    """
+    Export controls for a finished analysis: format (CSV / gzip / zstd /
+    Parquet, as installed) and an intrusions-only projection. The file is
+    streamed out of the result frame in chunks and only built on request.
+    """
+    st.write("### ⬇️ Export results")
+    formats = available_formats()
+    col_fmt, col_only = st.columns(2)
+    fmt = col_fmt.selectbox(
+        "Format",
+        list(formats),
+        format_func=lambda f: formats[f]["label"],
+        key="export_format",
+    )
+    intrusions_only = col_only.checkbox("Intrusions only", key="export_intrusions_only")
+    download = {
+        "label": f"⬇️ Download {formats[fmt]['label']}",
+        "file_name": export_file_name(fmt, intrusions_only),
+        "mime": export_mime(fmt),
+    }
+
+    if DEFERRED_DOWNLOADS:
+        st.download_button(
+            data=lambda: export_bytes(results, fmt, intrusions_only),
+            key="export_download",
+            **download,
+        )
+        return
+
+    # Older Streamlit: build on an explicit click, keep only the latest export
+    export_key = (job_id, fmt, intrusions_only)
+    if st.button("Prepare export", key="export_prepare"):
+        with st.spinner("Writing export..."):
+            st.session_state["bulk_export"] = (export_key, export_bytes(results, fmt, intrusions_only))
+    prepared = st.session_state.get("bulk_export")
+    if prepared is not None and prepared[0] == export_key:
+        st.download_button(data=prepared[1], key="export_download", **download)
+
+
+def render_live_model_status():
+    """
+    Live model version, hot-reload controls and the load / swap / rejection
+    history for the Model & Evaluation page.
+    """
+    st.markdown("### 🔁 Live Model")
+    manager = model_manager()
+    status = manager.status()
+    st.caption(
+        f"Serving `{status['path']}` version **{status['version']}** since "
+        f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(status['loaded_at']))}. "
+        + (f"The file is checked every {MODEL_WATCH_SECONDS:g}s; " if status["watching"] else "")
+        + "a new version is warmed and validated on a canary batch before it replaces this one, "
+        "and analyses already running finish on the version they started with."
+    )
+    if st.button("🔄 Reload model now", key="model_reload", disabled=status["reloading"]):
+        with st.spinner("Loading, warming and validating the model file..."):
+            outcome = manager.reload(wait=True)
+        if outcome["event"] == "swapped":
+            st.success(f"Swapped in version {outcome['version']}.")
+            st.rerun()
+        elif outcome["event"] == "unchanged":
+            st.info("The model file has not changed.")
+        else:
+            st.error(f"New model rejected – still serving {status['version']}: {outcome.get('error')}")
+
+    events = pd.DataFrame(manager.events())
+    if not events.empty:
+        events["time"] = pd.to_datetime(events["time"], unit="s")
+        st.dataframe(events, use_container_width=True, hide_index=True)
+
+
+def render_shadow_report():
+    """
+    Shadow-mode switch and the live production-vs-candidate comparison
+    (disagreement, action flips, latency) for the Model & Evaluation page.
+    """
+    st.markdown("### 🕶️ Shadow Scoring")
+    scorer = shadow_scorer()
+    if scorer is None:
+        st.caption(
+            f"Shadow mode unavailable – candidate model could not be loaded "
+            f"(set {shadow.SHADOW_MODEL_ENV} to its path)."
+        )
+        return
+
+    c1, c2, _ = st.columns([1, 1, 3])
+    if c1.button("⏸ Stop shadowing" if scorer.enabled else "▶ Start shadowing", key="shadow_toggle"):
+        scorer.enabled = not scorer.enabled
+        st.rerun()
+    if c2.button("Reset statistics", key="shadow_reset"):
+        scorer.reset()
+
+    report = scorer.report()
+    st.caption(
+        f"Candidate `{report['candidate']}` is {'**shadowing**' if scorer.enabled else 'idle'}: "
+        "it scores every production batch (Bulk Analysis, Playground) in the background on the "
+        "same feature matrix. Its decisions are never shown to analysts or written to the ledger."
+    )
+    if not report["batches"]:
+        st.info("No shadowed batches yet – start shadowing and run an analysis.")
+        return
+
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Flows compared", f"{report['flows']:,}", f"{report['batches']:,} batches", delta_color="off")
+    m2.metric("Label disagreement", f"{report['disagreement_rate']:.2%}")
+    m3.metric("Candidate misses", f"{report['candidate_misses']:,}",
+              f"+{report['candidate_extra_alerts']:,} extra alerts", delta_color="off")
+    m4.metric("Action flips", f"{report['action_flip_rate']:.2%}")
+
+    latency = pd.DataFrame(report["latency"]).T
+    latency.index.name = "model"
+    st.dataframe(latency, use_container_width=True)
+    if report["flips"]:
+        st.dataframe(pd.DataFrame(report["flips"]), use_container_width=True, hide_index=True)
+    if report["skipped_batches"] or report["errors"]:
+        st.caption(
+            f"{report['skipped_batches']:,} batches skipped (candidate busy), "
+            f"{report['errors']:,} candidate errors."
+        )
 
-    return result
 
 # =========================
 # 3. SIDEBAR NAVIGATION
@@ -910,7 +1735,7 @@ st.sidebar.markdown(
         <strong>SentinelSecure v0.1</strong><br/><br/>
         • Upload CSVs with the SAME columns as the training data<br/>
         • Model + thresholds are for demo, not production<br/>
-        • Threat ledger is an in-memory, hash-chained audit trail
+        • Threat ledger is a persistent, hash-chained audit trail
     </div>
     """,
     unsafe_allow_html=True
@@ -942,9 +1767,12 @@ if page == "Bulk Analysis":
         help="Use the same schema/columns as the dataset used in the notebook."
     )
 
+    # Scoring runs as a background job: reruns and page switches don't restart it
+    runner = bulk_job_runner()
+    job = None
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
+            df = load_uploaded_csv(uploaded_file)
         except Exception as e:
             st.error("Could not read the CSV file. Check encoding / format.")
             st.exception(e)
@@ -953,30 +1781,89 @@ if page == "Bulk Analysis":
         st.write("### Preview of uploaded data")
         st.dataframe(df.head(), use_container_width=True)
 
-        # Tiny neon loader + spinner while running model
-        loader_placeholder = st.empty()
-        loader_placeholder.markdown(
-            '<div class="neon-loader"><div class="neon-loader-bar"></div></div>',
-            unsafe_allow_html=True
+        cascaded = load_cascade_model() is not None and st.checkbox(
+            "⚡ Cascade mode (fast model first, full ensemble only for uncertain flows)",
+            key="bulk_cascade",
+            help="Flows the light XGBoost model is sure about skip the ensemble. "
+                 "Tune the uncertainty band on labeled data with `python cascade.py labeled.csv`.",
         )
+        tiered = not cascaded and st.checkbox(
+            "⏱️ Latency-tiered scoring (fewer trees per chunk under load)",
+            key="bulk_tiered",
+            help="Chunks are scored with a prefix of the boosted trees when the latency budget "
+                 "or the job queue depth is exceeded. Measure each tier's accuracy with "
+                 "`python latency_tiers.py labeled.csv`.",
+        )
+        # Keyed on the model too: after a swap the same upload is scored again
+        job_key = f"{upload_cache_key(uploaded_file)}:{live_model.version}"
+        if cascaded:
+            score_fn, job_key = run_cascade_on_df, job_key + ":cascade"
+        elif tiered:
+            budget = st.number_input(
+                "Latency budget (ms per 1,000 flows; 0 = only degrade when jobs are queued)",
+                min_value=0.0, value=0.0, step=5.0, key="bulk_tier_budget",
+            )
+            score_fn = make_tiered_scorer(runner, budget or None)
+            job_key += f":tiered:{budget:g}"
+        else:
+            score_fn = run_model_on_df
+        job = runner.submit(
+            df, score_fn,
+            key=job_key,
+            name=getattr(uploaded_file, "name", None),
+            model_version=live_model.version,
+        )
+    else:
+        job = runner.get(render_bulk_job_history(runner))
 
-        with st.spinner("Running intrusion detection on uploaded flows..."):
-            results = run_model_on_df(df)
-
-        loader_placeholder.empty()
+    results = None
+    if job is not None:
+        if job.active:
+            st.caption(
+                f"Analysis job `{job.job_id}` runs in the background – you can leave this page "
+                "and come back; finished results are kept."
+            )
+            render_bulk_job_progress(job.job_id)
+        elif job.status == DONE:
+            results = job.result
+        else:
+            if job.status == CANCELLED:
+                st.warning(f"Analysis job `{job.job_id}` was cancelled.")
+            else:
+                st.error(f"Analysis job `{job.job_id}` failed: {job.error}")
+            if uploaded_file is not None and st.button("↻ Restart analysis", key="bulk_restart"):
+                runner.submit(df, score_fn, key=job.key, name=job.name, restart=True,
+                              model_version=live_model.version)
+                st.rerun()
 
+    if results is not None:
         st.success(f"Analysis complete. Total flows: {len(results)}")
+        stages = cascade.stage_report(results)
+        if stages is not None:
+            st.caption(
+                f"Cascade: {stages['fast_only']:,} flows decided by the fast model, "
+                f"{stages['forwarded']:,} forwarded to the full ensemble "
+                f"({stages['pass_through']:.1%} pass-through)"
+            )
+        if "tier" in results.columns:
+            tiers_used = results["tier"].value_counts()
+            st.caption(
+                "Latency tiers used: "
+                + ", ".join(f"{name} {tiers_used[name]:,} flows" for name in TIER_NAMES if tiers_used.get(name, 0))
+            )
 
         # 🔥 Live Threat Feed (latest intrusions)
         st.markdown("### 🔥 Live Threat Feed (latest intrusions)")
-        intrusions_feed = results[results["label"] == "Intrusion"].copy()
+        view = load_results_view(job.job_id, results)
+        intrusions_feed = view.query(
+            labels=["Intrusion"],
+            sort_by="score" if "score" in results.columns else None,
+            descending=True,
+            page_size=30,
+        )["rows"]
         if intrusions_feed.empty:
             st.caption("No intrusions detected in this batch.")
         else:
-            # Sort by confidence if available
-            if "score" in intrusions_feed.columns:
-                intrusions_feed = intrusions_feed.sort_values("score", ascending=False)
-
             # Choose key columns for the feed (only if they exist)
             feed_cols = []
             for col in [
@@ -994,7 +1881,7 @@ if page == "Bulk Analysis":
             if not feed_cols:
                 feed_cols = intrusions_feed.columns.tolist()
 
-            feed_df = intrusions_feed[feed_cols].head(30)
+            feed_df = intrusions_feed[feed_cols]
             feed_html = feed_df.to_html(index=False, classes="threat-table")
             st.markdown(
                 f"""
@@ -1030,16 +1917,10 @@ if page == "Bulk Analysis":
             )
 
         st.write("### Detailed Results")
-        st.dataframe(results, use_container_width=True)
+        render_results_explorer(job.job_id, results)
 
-        # Option to download
-        csv_out = results.to_csv(index=False).encode("utf-8")
-        st.download_button(
-            label="⬇️ Download results as CSV",
-            data=csv_out,
-            file_name="sentinelsecure_bulk_results.csv",
-            mime="text/csv",
-        )
+        # Export: generated only when requested, streamed chunk by chunk
+        render_results_export(results, job.job_id)
 
         # ---------- ⛓️ Commit intrusions to threat ledger ----------
         if add_log is not None:
@@ -1048,40 +1929,77 @@ if page == "Bulk Analysis":
             if not intrusions.empty:
                 st.markdown("### ⛓️ Threat Ledger")
                 if st.button("Commit all detected intrusions to ledger"):
-                    committed = 0
-                    for idx, row in intrusions.iterrows():
-                        row_dict = row.to_dict()
-                        features_only = {
-                            k: v for k, v in row_dict.items()
-                            if k not in ["prediction_raw", "label", "score", "recommended_action"]
-                        }
-
-                        entry = {
-                            "flow_index": int(idx),
-                            "label": row_dict.get("label"),
-                            "recommended_action": row_dict.get("recommended_action"),
-                            "confidence": float(row_dict["score"]) if "score" in row_dict else None,
-                            "features": features_only,
-                        }
-                        add_log(entry)
-                        committed += 1
-
-                    st.success(f"✅ Committed {committed} intrusion logs to the in-memory threat ledger.")
+                    # One columnar batch -> one bulk ledger append; the
+                    # idempotency keys make re-committing the same results a no-op.
+                    # A reopened job may predate a model swap: credit the model that scored it
+                    batch, keys = ledger_batch(
+                        intrusions, idempotency_key,
+                        (job.model_version or model_version()) if idempotency_key is not None else None,
+                    )
+                    committed = len(add_logs(batch, idempotency_keys=keys))
+                    skipped = len(intrusions) - committed
+
+                    st.success(f"✅ Committed {committed} intrusion logs to the threat ledger.")
+                    if skipped:
+                        st.caption(f"{skipped} already-recorded intrusions were skipped (idempotent commit).")
                     if verify_chain is not None:
                         st.caption(
                             f"Ledger integrity: "
                             f"{'✅ valid' if verify_chain() else '⚠️ chain broken (hash mismatch)'}"
                         )
 
-                # Optional: view the ledger
-                if get_chain_as_list is not None:
-                    with st.expander("View current threat ledger (debug view)"):
-                        st.json(get_chain_as_list())
+                # Routine checks above only cover blocks added since the last checkpoint
+                if audit_report is not None and st.button("🔎 Run full ledger audit (from genesis)"):
+                    with st.spinner("Re-verifying every block in the ledger..."):
+                        audit = audit_report()
+                    if audit["ok"]:
+                        st.caption(
+                            f"Full audit: ✅ all {audit['blocks']:,} blocks and "
+                            f"{audit.get('feature_rows', 0):,} feature rows verified in "
+                            f"{audit['elapsed_s']:.2f}s ({audit['workers']} worker process(es))"
+                        )
+                    elif audit.get("first_bad_index") is not None:
+                        st.caption(
+                            f"Full audit: ⚠️ chain broken – first tampered block is "
+                            f"#{audit['first_bad_index']}"
+                        )
+                    elif not audit.get("features_ok", True):
+                        st.caption(
+                            f"Full audit: ⚠️ feature row #{audit['first_bad_feature_row']} "
+                            f"does not match its digest (tampered feature store)"
+                        )
+                    else:
+                        st.caption("Full audit: ⚠️ a sealed segment does not match its seal")
+
+                # Merkle root (publishable) + per-block inclusion proofs
+                if get_merkle_root is not None:
+                    with st.expander("🌳 Merkle root & inclusion proof"):
+                        root_info = get_merkle_root()
+                        st.code(f"root: {root_info['root']}\ntree_size: {root_info['tree_size']}")
+                        proof_index = st.number_input(
+                            "Block index to prove",
+                            min_value=0,
+                            max_value=max(0, root_info["tree_size"] - 1),
+                            value=max(0, root_info["tree_size"] - 1),
+                            step=1,
+                            key="merkle_proof_index",
+                        )
+                        proof = get_inclusion_proof(int(proof_index))
+                        st.json(proof)
+                        st.caption(
+                            f"Proof check against root: "
+                            f"{'✅ included' if verify_inclusion(**proof) else '⚠️ proof does not verify'}"
+                        )
+
+                # Browse the ledger page by page (indexed filters, no full-chain dump)
+                if query_blocks is not None:
+                    with st.expander("📜 Threat ledger browser"):
+                        render_ledger_browser()
             else:
                 st.info("No intrusions detected in this batch to commit to the ledger.")
         else:
             st.caption("⚠️ ledger.py not available – threat ledger features disabled.")
-    else:
+    elif job is None:
         st.info("Upload a CSV file to run bulk intrusion analysis.")
 
 # =========================
@@ -1107,7 +2025,7 @@ elif page == "Attack Playground":
 
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
+            df = load_uploaded_csv(uploaded_file)
         except Exception as e:
             st.error("Could not read the CSV file.")
             st.exception(e)
@@ -1240,7 +2158,17 @@ elif page == "Attack Playground":
                 "features": flow_dict,
             }
 
-            block = add_log(entry)
+            # Streamlit reruns this page on every widget change: key the append on
+            # the flow + decision + model so a rerun reuses the existing block
+            if idempotency_key is not None:
+                key = idempotency_key(entry, model_version())
+                block = find_block(key)
+                already_logged = block is not None
+                if block is None:
+                    block = add_log(entry, idempotency_key=key)
+            else:
+                block = add_log(entry)
+                already_logged = False
             chain_ok = verify_chain() if verify_chain is not None else None
 
             st.json({
@@ -1249,12 +2177,19 @@ elif page == "Attack Playground":
                 "hash": block["hash"],
                 "prev_hash": block["prev_hash"],
                 "chain_valid": chain_ok,
+                "merkle_root": get_merkle_root()["root"] if get_merkle_root is not None else None,
             })
 
-            st.caption(
-                "This block is now part of an append-only, hash-chained audit trail "
-                "for security incidents."
-            )
+            if already_logged:
+                st.caption(
+                    "This flow and decision were already recorded – showing the existing "
+                    "block instead of appending a duplicate."
+                )
+            else:
+                st.caption(
+                    "This block is now part of an append-only, hash-chained audit trail "
+                    "for security incidents."
+                )
 
     else:
         st.info("Upload a CSV to play with individual flows.")
@@ -1284,7 +2219,8 @@ elif page == "Attack Simulator (what-if)":
 
     if uploaded_file is not None:
         try:
-            df_sim = pd.read_csv(uploaded_file)
+            df_sim = load_uploaded_csv(uploaded_file)
+            sim_profile = load_upload_profile(uploaded_file, df_sim)
         except Exception as e:
             st.error("Could not read the CSV file.")
             st.exception(e)
@@ -1336,214 +2272,11 @@ elif page == "Attack Simulator (what-if)":
 
         st.markdown("---")
 
-        # ----- Step 2: Let the user tweak key numeric features -----
-        st.write("### Step 2: Tweak key features and simulate")
-
-        sim_row = base_row.copy()
-        updated_values = {}
-
-        st.write("#### Core volume / frequency features")
-        col_int1, col_int2, col_int3 = st.columns(3)
-        with col_int1:
-            if "duration" in df_sim.columns:
-                updated_values["duration"] = st.slider(
-                    "duration (connection length)",
-                    min_value=0,
-                    max_value=int(max(1, df_sim["duration"].max() * 2)),
-                    value=int(base_row["duration"]),
-                    step=1,
-                )
-        with col_int2:
-            if "src_bytes" in df_sim.columns:
-                updated_values["src_bytes"] = st.slider(
-                    "src_bytes (bytes from source)",
-                    min_value=0,
-                    max_value=int(max(1000, df_sim["src_bytes"].quantile(0.95) * 2)),
-                    value=int(base_row["src_bytes"]),
-                    step=1,
-                )
-        with col_int3:
-            if "dst_bytes" in df_sim.columns:
-                updated_values["dst_bytes"] = st.slider(
-                    "dst_bytes (bytes to destination)",
-                    min_value=0,
-                    max_value=int(max(1000, df_sim["dst_bytes"].quantile(0.95) * 2)),
-                    value=int(base_row["dst_bytes"]),
-                    step=1,
-                )
-
-        col_int4, col_int5 = st.columns(2)
-        with col_int4:
-            if "count" in df_sim.columns:
-                updated_values["count"] = st.slider(
-                    "count (connections to same host)",
-                    min_value=0,
-                    max_value=int(max(10, df_sim["count"].quantile(0.95) * 2)),
-                    value=int(base_row["count"]),
-                    step=1,
-                )
-        with col_int5:
-            if "srv_count" in df_sim.columns:
-                updated_values["srv_count"] = st.slider(
-                    "srv_count (connections to same service)",
-                    min_value=0,
-                    max_value=int(max(10, df_sim["srv_count"].quantile(0.95) * 2)),
-                    value=int(base_row["srv_count"]),
-                    step=1,
-                )
-
-        st.write("#### Error / anomaly rate features (0.0 – 1.0)")
-        col_rate1, col_rate2, col_rate3 = st.columns(3)
-        with col_rate1:
-            if "serror_rate" in df_sim.columns:
-                updated_values["serror_rate"] = st.slider(
-                    "serror_rate",
-                    min_value=0.0,
-                    max_value=1.0,
-                    value=float(base_row["serror_rate"]),
-                    step=0.01,
-                )
-        with col_rate2:
-            if "srv_serror_rate" in df_sim.columns:
-                updated_values["srv_serror_rate"] = st.slider(
-                    "srv_serror_rate",
-                    min_value=0.0,
-                    max_value=1.0,
-                    value=float(base_row["srv_serror_rate"]),
-                    step=0.01,
-                )
-        with col_rate3:
-            if "same_srv_rate" in df_sim.columns:
-                updated_values["same_srv_rate"] = st.slider(
-                    "same_srv_rate",
-                    min_value=0.0,
-                    max_value=1.0,
-                    value=float(base_row["same_srv_rate"]),
-                    step=0.01,
-                )
-
-        col_rate4, col_rate5, col_rate6 = st.columns(3)
-        with col_rate4:
-            if "diff_srv_rate" in df_sim.columns:
-                updated_values["diff_srv_rate"] = st.slider(
-                    "diff_srv_rate",
-                    min_value=0.0,
-                    max_value=1.0,
-                    value=float(base_row["diff_srv_rate"]),
-                    step=0.01,
-                )
-        with col_rate5:
-            if "dst_host_same_srv_rate" in df_sim.columns:
-                updated_values["dst_host_same_srv_rate"] = st.slider(
-                    "dst_host_same_srv_rate",
-                    min_value=0.0,
-                    max_value=1.0,
-                    value=float(base_row["dst_host_same_srv_rate"]),
-                    step=0.01,
-                )
-        with col_rate6:
-            if "dst_host_srv_diff_host_rate" in df_sim.columns:
-                updated_values["dst_host_srv_diff_host_rate"] = st.slider(
-                    "dst_host_srv_diff_host_rate",
-                    min_value=0.0,
-                    max_value=1.0,
-                    value=float(base_row["dst_host_srv_diff_host_rate"]),
-                    step=0.01,
-                )
-
-        st.markdown("When you're ready, run the simulated flow through the model:")
-
-        if st.button("🚀 Run simulation with updated values"):
-            # Apply the updated values into a copy of the base row
-            for k, v in updated_values.items():
-                sim_row[k] = v
-
-            sim_df = pd.DataFrame([sim_row])
-
-            with st.spinner("Classifying simulated flow..."):
-                sim_res = run_model_on_df(sim_df)
-
-            sim_label = sim_res["label"].iloc[0]
-            sim_action = sim_res["recommended_action"].iloc[0]
-            sim_score = sim_res["score"].iloc[0] if "score" in sim_res.columns else None
-
-            st.markdown("### 🔍 Comparison: Original vs Simulated")
-
-            col_a, col_b = st.columns(2)
-            with col_a:
-                st.markdown("**Original flow**")
-                st.metric("Prediction", base_label)
-                st.metric("Action", base_action)
-                st.metric("Confidence", f"{base_score:.3f}" if base_score is not None else "N/A")
-            with col_b:
-                st.markdown("**Simulated flow**")
-                st.metric("Prediction", sim_label)
-                st.metric("Action", sim_action)
-                st.metric("Confidence", f"{sim_score:.3f}" if sim_score is not None else "N/A")
-
-            st.write("#### Simulated flow (full feature view)")
-            st.json(sim_row.to_dict())
+        render_simulation_panel(df_sim, sim_profile, base_row, base_label, base_action, base_score)
 
-            # ---------- XAI on the simulated flow ----------
-            st.write("### 🧠 Why did the model say this? (XAI on simulated flow)")
-
-            explanation_text = None
-            reasons = []
-
-            if explain_flow is None:
-                st.warning(
-                    "Explainability module could not be imported. "
-                    "Check explain.py and that it's in the same folder."
-                )
-            else:
-                try:
-                    explanation_text = explain_flow(sim_row.to_dict(), top_n=5)
-                    st.code(explanation_text, language="markdown")
-
-                    # Parse into reasons for simple_explanation
-                    if explanation_text:
-                        for line in explanation_text.splitlines():
-                            if line.startswith("- ") and "importance=" in line:
-                                try:
-                                    body = line[2:]
-                                    name_part, rest = body.split(":", 1)
-                                    name = name_part.strip()
-
-                                    val_str = None
-                                    imp_str = None
-                                    if "value=" in rest:
-                                        val_str = rest.split("value=", 1)[1].split(",", 1)[0].strip()
-                                    if "importance=" in rest:
-                                        imp_str = rest.split("importance=", 1)[1].strip()
-
-                                    reasons.append((name, val_str, imp_str))
-                                except Exception:
-                                    continue
-                except Exception as e:
-                    st.error("Explainability failed at runtime.")
-                    st.exception(e)
-
-            if load_error:
-                st.caption(f"ℹ️ explain.py model note: {load_error}")
-
-            st.write("### 📌 Simplified Analyst Summary (simulated flow)")
-            if simple_explanation is not None and reasons:
-                simple_msg = simple_explanation(sim_label, sim_score, reasons)
-                st.success(simple_msg)
-            elif simple_explanation is None:
-                st.caption("simple_explanation function not available in explain.py.")
-            else:
-                st.caption("No detailed feature importance available to build a summary.")
+        st.markdown("---")
 
-            st.write("### 📄 Analyst-friendly justification (simulated flow)")
-            justification = build_analyst_summary(
-                flow_dict=sim_row.to_dict(),
-                pred_label=sim_label,
-                action=sim_action,
-                score_display=sim_score,
-                explanation_text=explanation_text,
-            )
-            st.markdown(justification)
+        render_sweep_panel(sim_profile, base_row)
 
     else:
         st.info("Upload a CSV to build and simulate custom flows.")
@@ -1585,5 +2318,41 @@ elif page == "Model & Evaluation":
       analysts triage noisy or low-confidence cases.
     """)
 
+    render_live_model_status()
+
+    render_shadow_report()
+
+    st.markdown("### ⏱️ Latency Tiers")
+    measured = tier_measurements(live_model.version)
+    if measured is None:
+        st.caption(
+            f"Tiers {', '.join(TIER_NAMES)} evaluate a shrinking prefix of the boosted trees. "
+            "Run `python latency_tiers.py labeled_flows.csv` to measure their recall, accuracy and cost."
+        )
+    else:
+        st.caption("Accuracy and cost of each tier, measured up front on labeled flows:")
+        st.dataframe(pd.DataFrame(measured), use_container_width=True, hide_index=True)
+
+    st.markdown("### ⚡ Cascaded Inference")
+    cascade_model = load_cascade_model()
+    if cascade_model is None:
+        st.caption(f"Cascade mode unavailable – `{cascade.FAST_MODEL_PATH}` could not be loaded.")
+    elif cascade_model.tuned is None:
+        st.caption(
+            f"Uncertainty band **[{cascade_model.low:.2f}, {cascade_model.high:.2f}]** (untuned default). "
+            "Run `python cascade.py labeled_flows.csv` to tune it for these models."
+        )
+    else:
+        tuned = cascade_model.tuned["report"]
+        st.caption(
+            f"Uncertainty band **[{cascade_model.low:.4f}, {cascade_model.high:.4f}]**, tuned on "
+            f"{tuned['flows']:,} labeled flows: {tuned['pass_through']:.1%} of flows reach the full "
+            f"ensemble (expected speedup ×{tuned['timing']['expected_speedup']})."
+        )
+        st.dataframe(
+            pd.DataFrame({name: tuned[name] for name in ("fast", "cascade", "full")}).T,
+            use_container_width=True,
+        )
+
     st.markdown("""
     """)
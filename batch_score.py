@@ -0,0 +1,255 @@
+# batch_score.py
+"""
+SentinelSecure – Headless batch scorer (no Streamlit)
+
+Scores network-flow files with the same model, feature handling, labels and
+recommend_action tiers as the dashboard (all from scoring.py), for cron jobs,
+pipelines and files too large to upload:
+
+- input: CSV or Parquet files, or '-' for CSV on stdin; read in row chunks so
+  memory stays at a few chunks however large the input is
+- --workers N scores chunks in N spawned processes (each loads the model once);
+  results are still written in input order
+- --cascade scores with the fast-model-first cascade (cascade.py) and reports
+  how many flows reached the full ensemble
+- --tier / --latency-budget score with a prefix of the boosted trees
+  (latency_tiers.py); the tier is recorded per row and ledger entry
+- --output writes the scored rows as CSV / CSV.gz / CSV.zst / Parquet, picked
+  by extension ('-' = CSV on stdout)
+- --ledger commits detected intrusions to the threat ledger with the same
+  idempotency keys as the dashboard, so re-running a file adds nothing new
+
+flow_index is the row's position in its input file, as for an upload.
+Prints rows, intrusions, action counts and throughput when done.
+
+Usage:
+    python batch_score.py flows.csv
+    python batch_score.py flows.parquet --output scored.parquet --workers 4
+    cat flows.csv | python batch_score.py - --output - --intrusions-only > hits.csv
+    python batch_score.py day1.csv day2.csv --ledger --ledger-dir ledger_data
+    python batch_score.py big.csv --cascade --workers 4
+    python batch_score.py big.csv --latency-budget 15
+"""
+
+import argparse
+import collections
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, Iterator, Optional
+
+import pandas as pd
+
+import cascade
+import latency_tiers
+import scoring
+from results_export import ExportWriter, available_formats, format_for_path
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+# Chunks in flight per worker process (bounds memory while keeping workers busy)
+PREFETCH_PER_WORKER = 2
+
+_worker_model = None
+_worker_policy = None
+
+
+# -------------------------------------------------------
+# Input
+# -------------------------------------------------------
+
+def iter_input_chunks(path: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Row chunks of one input file ('-' = CSV on stdin), indexed by row position."""
+    if path.lower().endswith(".parquet"):
+        import pyarrow.parquet
+
+        offset = 0
+        for batch in pyarrow.parquet.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            chunk = batch.to_pandas()
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
+    else:
+        # read_csv chunks keep counting the index across chunks
+        with pd.read_csv(sys.stdin if path == "-" else path, chunksize=chunk_rows) as reader:
+            yield from reader
+
+
+# -------------------------------------------------------
+# Scoring (in-process or in worker processes)
+# -------------------------------------------------------
+
+def _init_worker(model_path: str, cascaded: bool = False, tier: Optional[str] = None,
+                 budget_ms_per_1k: Optional[float] = None) -> None:
+    global _worker_model, _worker_policy
+    _worker_policy = None
+    if cascaded:
+        _worker_model = cascade.load_cascade(full_path=model_path)
+    elif tier is not None:
+        _worker_model = latency_tiers.TieredModel(scoring.load_model(model_path), tier)
+    else:
+        _worker_model = scoring.load_model(model_path)
+        if budget_ms_per_1k is not None:
+            config = latency_tiers.load_tiers(scoring.model_version(model_path))
+            _worker_policy = latency_tiers.TierPolicy(
+                budget_ms_per_1k, measurements=config["tiers"] if config else None,
+            )
+
+
+def _score_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    if _worker_policy is not None:
+        return latency_tiers.run_tiered(_worker_model, chunk, _worker_policy)
+    return scoring.run_model_on_df(_worker_model, chunk)
+
+
+def iter_scored(chunks: Iterator[pd.DataFrame], model_path: str, workers: int,
+                *mode) -> Iterator[pd.DataFrame]:
+    """
+    Scored chunks, in input order. `workers <= 1` scores in this process.
+    `mode` is passed on to _init_worker (cascaded, tier, budget_ms_per_1k).
+    """
+    if workers <= 1:
+        _init_worker(model_path, *mode)
+        for chunk in chunks:
+            yield _score_chunk(chunk)
+        return
+
+    # spawn: the parent may have live ledger writer/fsync threads that must not be forked
+    with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                             initializer=_init_worker, initargs=(model_path, *mode)) as pool:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append(pool.submit(_score_chunk, chunk))
+            if len(pending) >= workers * PREFETCH_PER_WORKER:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+# -------------------------------------------------------
+# Batch run
+# -------------------------------------------------------
+
+def score_files(
+    paths,
+    model_path: str = scoring.MODEL_PATH,
+    output: Optional[str] = None,
+    intrusions_only: bool = False,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    workers: int = 1,
+    ledger_dir: Optional[str] = None,
+    commit_ledger: bool = False,
+    cascaded: bool = False,
+    tier: Optional[str] = None,
+    budget_ms_per_1k: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Score every input file and return a summary dict
+    (rows, intrusions, actions, elapsed_s, rows_per_s, ledger counts).
+    """
+    add_logs = key_fn = version = None
+    if commit_ledger:
+        import ledger
+
+        if ledger_dir is not None:
+            ledger.configure_storage(ledger_dir, backend=os.environ.get(ledger.LEDGER_BACKEND_ENV) or "segments")
+        add_logs, key_fn = ledger.add_logs, ledger.idempotency_key
+        version = scoring.model_version(model_path)
+
+    writer = None
+    out_fh = None
+    if output is not None:
+        out_fh = sys.stdout.buffer if output == "-" else open(output, "wb")
+        writer = ExportWriter("csv" if output == "-" else format_for_path(output), out_fh)
+
+    rows = intrusions = committed = skipped = forwarded = 0
+    actions: Dict[str, int] = collections.Counter()
+    tiers: Dict[str, int] = collections.Counter()
+    t0 = time.perf_counter()
+    try:
+        for path in paths:
+            chunks = iter_input_chunks(path, chunk_rows)
+            for scored in iter_scored(chunks, model_path, workers, cascaded, tier, budget_ms_per_1k):
+                hits = scored[scored["label"] == "Intrusion"]
+                rows += len(scored)
+                intrusions += len(hits)
+                actions.update(scored["recommended_action"].value_counts().to_dict())
+                if latency_tiers.TIER_COLUMN in scored.columns:
+                    tiers.update(scored[latency_tiers.TIER_COLUMN].value_counts().to_dict())
+                stages = cascade.stage_report(scored)
+                if stages is not None:
+                    forwarded += stages["forwarded"]
+                if writer is not None:
+                    writer.write(hits if intrusions_only else scored)
+                if add_logs is not None and not hits.empty:
+                    batch, keys = scoring.ledger_batch(hits, key_fn, version)
+                    n = len(add_logs(batch, idempotency_keys=keys))
+                    committed += n
+                    skipped += len(hits) - n
+    finally:
+        if writer is not None:
+            writer.close()
+        if out_fh is not None and out_fh is not sys.stdout.buffer:
+            out_fh.close()
+        if add_logs is not None:
+            ledger.flush()
+
+    elapsed = time.perf_counter() - t0
+    # value_counts() of the coded result columns also lists unused categories (count 0)
+    report = {
+        "files": len(paths),
+        "rows": rows,
+        "intrusions": intrusions,
+        "actions": {action: n for action, n in sorted(actions.items()) if n},
+        "workers": max(1, workers),
+        "elapsed_s": round(elapsed, 3),
+        "rows_per_s": round(rows / elapsed, 1) if elapsed > 0 else None,
+    }
+    if any(tiers.values()):
+        report["tiers"] = {name: tiers[name] for name in latency_tiers.TIER_NAMES if tiers.get(name)}
+    if cascaded:
+        report["forwarded"] = forwarded
+        report["pass_through"] = round(forwarded / rows, 4) if rows else 0.0
+    if commit_ledger:
+        report["ledger_committed"] = committed
+        report["ledger_skipped"] = skipped
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Score network-flow files without the dashboard")
+    parser.add_argument("inputs", nargs="+", help="CSV / Parquet files to score ('-' = CSV on stdin)")
+    parser.add_argument("--model", default=scoring.MODEL_PATH, help="model artifact (default: %(default)s)")
+    parser.add_argument("--output", default=None,
+                        help=f"write scored rows here; format by extension ({', '.join(available_formats())}), "
+                             "'-' = CSV on stdout")
+    parser.add_argument("--intrusions-only", action="store_true", help="only write intrusion rows")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help="rows scored per chunk")
+    parser.add_argument("--workers", type=int, default=1, help="scoring processes (1 = in-process)")
+    parser.add_argument("--cascade", action="store_true",
+                        help="fast model first, full ensemble only for the tuned uncertainty band")
+    parser.add_argument("--tier", choices=latency_tiers.TIER_NAMES, default=None,
+                        help="score every chunk at this latency tier")
+    parser.add_argument("--latency-budget", type=float, default=None, metavar="MS_PER_1K",
+                        help="pick the tier per chunk to stay within this many ms per 1,000 flows")
+    parser.add_argument("--ledger", action="store_true", help="commit detected intrusions to the threat ledger")
+    parser.add_argument("--ledger-dir", default=None,
+                        help="ledger directory (default: $SENTINEL_LEDGER_DIR or ledger_data)")
+    args = parser.parse_args(argv)
+
+    report = score_files(
+        args.inputs, args.model, args.output, args.intrusions_only,
+        max(1, args.chunk_rows), args.workers, args.ledger_dir, args.ledger, args.cascade,
+        args.tier, args.latency_budget,
+    )
+    # Keep stdout clean when the results themselves go there
+    log = sys.stderr if args.output == "-" else sys.stdout
+    for key, value in report.items():
+        print(f"{key:>16}: {value}", file=log)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
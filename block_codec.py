@@ -0,0 +1,224 @@
+# block_codec.py
+"""
+SentinelSecure – Canonical block encodings used for ledger hashing
+
+A block's hash is SHA-256 over a canonical byte encoding of its core fields
+(index, timestamp, event_type, data, prev_hash). Two encodings exist; each
+block records which one it was hashed with in its `enc` field:
+
+- ENCODING_LEGACY (1, blocks without `enc`):
+    json.dumps(core, sort_keys=True, separators=(",", ":"))
+  Slow on blocks that embed a 40-field feature dict, and cannot encode NumPy scalars.
+
+- ENCODING_V2 (2):
+    b"SSv2|" index "|" repr(timestamp) "|" event_type "|" prev_hash "|" payload
+  where payload packs the flow features of the FROZEN schema FEATURE_SCHEMA_V2
+  as 40 little-endian float64 values plus a 40-byte type mask, and everything
+  else in the entry as sorted-key JSON:
+
+    b"F" + mask[40] + float64[40] + json(rest)   (entry has a "features" dict)
+    b"N" + json(entry)                           (no features dict)
+
+  mask bytes: b"f" float, b"i" integer (|v| <= 2**53), b"n" NaN,
+              b"x" anything else (value moved into the JSON rest instead).
+
+The v2 schema is pinned here on purpose: if the model's FEATURE_ORDER ever
+changes, existing v2 blocks must still hash the same way. A future schema gets
+a new encoding version instead.
+"""
+
+import hashlib
+import json
+import math
+import struct
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+ENCODING_LEGACY = 1
+ENCODING_V2 = 2
+CURRENT_ENCODING = ENCODING_V2
+
+# Frozen copy of explain.FEATURE_ORDER at the time v2 was introduced
+FEATURE_SCHEMA_V2 = (
+    "duration", "protocol_type", "service", "flag", "src_bytes", "dst_bytes",
+    "land", "wrong_fragment", "urgent", "hot", "num_failed_logins", "logged_in",
+    "num_compromised", "root_shell", "su_attempted", "num_root",
+    "num_file_creations", "num_shells", "num_access_files", "is_host_login",
+    "is_guest_login", "count", "srv_count", "serror_rate", "srv_serror_rate",
+    "rerror_rate", "srv_rerror_rate", "same_srv_rate", "diff_srv_rate",
+    "srv_diff_host_rate", "dst_host_count", "dst_host_srv_count",
+    "dst_host_same_srv_rate", "dst_host_diff_srv_rate",
+    "dst_host_same_src_port_rate", "dst_host_srv_diff_host_rate",
+    "dst_host_serror_rate", "dst_host_srv_serror_rate", "dst_host_rerror_rate",
+    "dst_host_srv_rerror_rate",
+)
+_SCHEMA_SET = frozenset(FEATURE_SCHEMA_V2)
+_N = len(FEATURE_SCHEMA_V2)
+_PACK = struct.Struct(f"<{_N}d").pack
+_UNPACK = struct.Struct(f"<{_N}d").unpack
+_KIND_FLOAT, _KIND_INT, _KIND_NAN = b"f"[0], b"i"[0], b"n"[0]
+_ALL_FLOAT_MASK = b"f" * _N
+_FLOAT_ONLY = {float}
+_MAX_EXACT_INT = 2 ** 53
+_MISSING = object()
+
+
+def json_default(obj: Any) -> Any:
+    """json.dumps fallback for NumPy scalars/arrays coming from pandas rows."""
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+# Encoders are built once: json.dumps(..., default=...) constructs a new encoder per call
+_SORTED_ENCODER = json.JSONEncoder(sort_keys=True, separators=(",", ":"), default=json_default)
+_COMPACT_ENCODER = json.JSONEncoder(separators=(",", ":"), default=json_default)
+
+
+def _dumps_sorted(obj: Any) -> bytes:
+    return _SORTED_ENCODER.encode(obj).encode("utf-8")
+
+
+def dumps_compact(obj: Any) -> bytes:
+    """Compact (unsorted) JSON with NumPy support – used for storage lines, not hashing."""
+    return _COMPACT_ENCODER.encode(obj).encode("utf-8")
+
+
+# -------------------------------------------------------
+# Legacy (v1) encoding
+# -------------------------------------------------------
+
+def encode_core_legacy(core: Dict[str, Any]) -> bytes:
+    """Original encoding: sorted-key compact JSON of the whole core."""
+    return json.dumps(core, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+
+# -------------------------------------------------------
+# v2 encoding
+# -------------------------------------------------------
+
+def _pack_features_slow(features: Dict[str, Any]):
+    """Per-value classification for feature rows that are not all plain floats."""
+    mask = bytearray(b"x" * _N)
+    packed = [0.0] * _N
+    moved = {}
+    for i, name in enumerate(FEATURE_SCHEMA_V2):
+        v = features.get(name, _MISSING)
+        if isinstance(v, (bool, np.bool_)) or v is _MISSING:
+            pass
+        elif isinstance(v, (float, np.floating)):
+            if math.isnan(v):
+                mask[i] = ord("n")
+            else:
+                mask[i] = ord("f")
+                packed[i] = float(v)
+        elif isinstance(v, (int, np.integer)) and -_MAX_EXACT_INT <= v <= _MAX_EXACT_INT:
+            mask[i] = ord("i")
+            packed[i] = float(v)
+        if mask[i] == ord("x") and v is not _MISSING:
+            moved[FEATURE_SCHEMA_V2[i]] = v
+    return bytes(mask), _PACK(*packed), moved
+
+
+def pack_features(features: Dict[str, Any]) -> Tuple[bytes, bytes, Dict[str, Any]]:
+    """
+    (40-byte type mask, 40 packed float64 values, dict of everything else)
+    for one feature row under the v2 schema. Inverse of `unpack_features`.
+    """
+    values = list(map(features.get, FEATURE_SCHEMA_V2))
+    total = sum(values) if set(map(type, values)) == _FLOAT_ONLY else None
+    if total is not None and total == total:
+        # Fast path: a full row of plain, non-NaN floats (the common pandas case)
+        mask, packed, moved = _ALL_FLOAT_MASK, _PACK(*values), {}
+        has_extra = len(features) > _N
+    else:
+        mask, packed, moved = _pack_features_slow(features)
+        has_extra = True
+
+    extra = {}
+    if has_extra:
+        extra = {k: features[k] for k in features.keys() - _SCHEMA_SET}
+        extra.update(moved)
+    return mask, packed, extra
+
+
+def unpack_features(mask: bytes, packed: bytes, extra: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a feature row from `pack_features` output (schema fields first)."""
+    values = _UNPACK(packed)
+    features: Dict[str, Any] = {}
+    for name, kind, value in zip(FEATURE_SCHEMA_V2, mask, values):
+        if kind == _KIND_FLOAT:
+            features[name] = value
+        elif kind == _KIND_INT:
+            features[name] = int(value)
+        elif kind == _KIND_NAN:
+            features[name] = math.nan
+        elif name in extra:
+            features[name] = extra[name]
+    for name, value in extra.items():
+        if name not in _SCHEMA_SET:
+            features[name] = value
+    return features
+
+
+def encode_features_v2(mask: bytes, packed: bytes, extra: Dict[str, Any]) -> bytes:
+    """Canonical bytes of a packed feature row on its own (what `features_digest` hashes)."""
+    return b"F" + mask + packed + _dumps_sorted({"features": extra})
+
+
+def encode_payload_v2(entry: Dict[str, Any]) -> bytes:
+    """
+    Canonical v2 bytes of a block's `data` entry. Depends only on the entry,
+    so writers can compute it before taking the ledger's append lock.
+    """
+    features = entry.get("features")
+    if not isinstance(features, dict):
+        return b"N" + _dumps_sorted(entry)
+
+    mask, packed, extra = pack_features(features)
+    rest = {k: v for k, v in entry.items() if k != "features"}
+    rest["features"] = extra
+    return b"F" + mask + packed + _dumps_sorted(rest)
+
+
+def features_digest(features: Dict[str, Any]) -> str:
+    """
+    SHA-256 hex digest of a flow's feature row under the v2 packing
+    (type mask + float64 values + sorted JSON of any other fields), so the
+    same flow gets the same digest whether it came from pandas or JSON.
+    """
+    return hashlib.sha256(encode_features_v2(*pack_features(features or {}))).hexdigest()
+
+
+def block_header_v2(index: int, timestamp: float, event_type: str, prev_hash: str) -> bytes:
+    return f"SSv2|{index}|{timestamp!r}|{event_type}|{prev_hash}|".encode("utf-8")
+
+
+def encode_core_v2(core: Dict[str, Any]) -> bytes:
+    return block_header_v2(
+        core["index"], core["timestamp"], core["event_type"], core["prev_hash"]
+    ) + encode_payload_v2(core["data"])
+
+
+# -------------------------------------------------------
+# Dispatch
+# -------------------------------------------------------
+
+def block_encoding(block: Dict[str, Any]) -> int:
+    return block.get("enc", ENCODING_LEGACY)
+
+
+def hash_core(core: Dict[str, Any], encoding: int = ENCODING_LEGACY) -> str:
+    """SHA-256 hex digest of a block core under the given encoding."""
+    if encoding == ENCODING_V2:
+        return hashlib.sha256(encode_core_v2(core)).hexdigest()
+    if encoding == ENCODING_LEGACY:
+        return hashlib.sha256(encode_core_legacy(core)).hexdigest()
+    raise ValueError(f"Unknown block encoding version: {encoding}")
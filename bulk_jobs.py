@@ -0,0 +1,208 @@
+# bulk_jobs.py
+"""
+SentinelSecure – Background jobs for Bulk Analysis
+
+Scoring a large upload inside the Streamlit script blocks the session, and
+every widget interaction (or leaving the page) throws the work away. Instead
+the Bulk Analysis page submits each upload as a JOB:
+
+- jobs run on a small bounded thread pool shared by all sessions; extra jobs
+  wait in the queue ("queued") until a worker is free
+- a job scores its frame in chunks and updates rows processed / throughput
+  after each one, which the page polls for its progress bar
+- cancellation is cooperative: the job stops before its next chunk
+- finished results stay in memory under the job id (the oldest finished jobs
+  are dropped past `max_retained`), so an analyst can reopen them without
+  rescoring
+
+Submitting the same `key` again (e.g. the same upload on a rerun) returns the
+existing job – whatever its state – instead of starting a new one; pass
+`restart=True` to score it again. A job records the `model_version` it was
+submitted with, so results reopened after a model swap are still attributed
+to the model that scored them.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+ACTIVE_STATES = (QUEUED, RUNNING)
+
+# Rows scored per chunk (progress granularity / cancellation latency)
+DEFAULT_CHUNK_ROWS = 20_000
+
+
+class BulkJob:
+    """
+    One bulk analysis. Progress fields are written by the worker thread and
+    read by the UI without locking (single attribute writes).
+    """
+
+    def __init__(self, job_id: str, key: Optional[str], name: str, total_rows: int,
+                 model_version: Optional[str] = None):
+        self.job_id = job_id
+        self.key = key
+        self.name = name
+        self.total_rows = total_rows
+        self.model_version = model_version
+        self.processed_rows = 0
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.result: Optional[pd.DataFrame] = None
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self._cancel = threading.Event()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATES
+
+    @property
+    def cancel_requested(self) -> bool:
+        return self._cancel.is_set()
+
+    @property
+    def elapsed_s(self) -> float:
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def rows_per_s(self) -> Optional[float]:
+        elapsed = self.elapsed_s
+        return self.processed_rows / elapsed if elapsed > 0 else None
+
+    @property
+    def progress(self) -> float:
+        """Fraction of rows scored, 0.0 – 1.0."""
+        if self.status == DONE or not self.total_rows:
+            return 1.0 if self.status == DONE else 0.0
+        return min(1.0, self.processed_rows / self.total_rows)
+
+    def summary(self) -> Dict[str, Any]:
+        """Plain dict for tables / logs (no result frame)."""
+        return {
+            "job_id": self.job_id,
+            "name": self.name,
+            "status": self.status,
+            "rows": self.total_rows,
+            "model_version": self.model_version,
+            "processed": self.processed_rows,
+            "elapsed_s": round(self.elapsed_s, 2),
+            "rows_per_s": round(self.rows_per_s, 1) if self.rows_per_s else None,
+            "submitted_at": self.submitted_at,
+            "error": self.error,
+        }
+
+
+class JobRunner:
+    """
+    Bounded pool of bulk-scoring workers plus the table of retained jobs.
+    """
+
+    def __init__(self, max_workers: int = 2, max_retained: int = 8,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.max_retained = max_retained
+        self.chunk_rows = chunk_rows
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bulk-job")
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, BulkJob]" = OrderedDict()
+
+    # ---------- submission ----------
+
+    def submit(self, df: pd.DataFrame, score_fn: Callable[[pd.DataFrame], pd.DataFrame],
+               key: Optional[str] = None, name: Optional[str] = None,
+               restart: bool = False, model_version: Optional[str] = None) -> BulkJob:
+        """
+        Queue `score_fn` over `df` (chunk by chunk) and return its job.
+        An existing job with the same `key` is returned as-is unless `restart` is set;
+        `model_version` is the version `score_fn` scores with.
+        """
+        with self._lock:
+            if key is not None and not restart:
+                existing = self._find_locked(key)
+                if existing is not None:
+                    return existing
+            job = BulkJob(uuid.uuid4().hex[:8], key, name or "bulk analysis", len(df), model_version)
+            self._jobs[job.job_id] = job
+            self._evict_locked()
+        self._pool.submit(self._run, job, df, score_fn)
+        return job
+
+    def _run(self, job: BulkJob, df: pd.DataFrame,
+             score_fn: Callable[[pd.DataFrame], pd.DataFrame]) -> None:
+        if job.cancel_requested:
+            job.status = CANCELLED
+            job.finished_at = time.time()
+            return
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            parts = []
+            for start in range(0, len(df), self.chunk_rows):
+                if job.cancel_requested:
+                    job.status = CANCELLED
+                    return
+                parts.append(score_fn(df.iloc[start:start + self.chunk_rows]))
+                job.processed_rows = min(len(df), start + self.chunk_rows)
+            job.result = pd.concat(parts) if len(parts) > 1 else (parts[0] if parts else score_fn(df))
+            job.status = DONE
+        except Exception as e:  # noqa: BLE001  (surfaced to the analyst via job.error)
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+
+    def cancel(self, job_id: str) -> bool:
+        """Ask a queued / running job to stop. True if the job was still active."""
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        job._cancel.set()
+        return True
+
+    # ---------- retained jobs ----------
+
+    def get(self, job_id: Optional[str]) -> Optional[BulkJob]:
+        with self._lock:
+            return self._jobs.get(job_id) if job_id else None
+
+    def _find_locked(self, key: str) -> Optional[BulkJob]:
+        for job in reversed(self._jobs.values()):
+            if job.key == key:
+                return job
+        return None
+
+    def find(self, key: str) -> Optional[BulkJob]:
+        """Newest job submitted with `key`, or None."""
+        with self._lock:
+            return self._find_locked(key)
+
+    def jobs(self) -> List[BulkJob]:
+        """Retained jobs, newest first."""
+        with self._lock:
+            return list(reversed(self._jobs.values()))
+
+    def _evict_locked(self) -> None:
+        """Drop the oldest finished jobs (and their results) past `max_retained`."""
+        finished = [j for j in self._jobs.values() if not j.active]
+        excess = len(self._jobs) - self.max_retained
+        for job in finished[:max(0, excess)]:
+            del self._jobs[job.job_id]
+
+    def shutdown(self) -> None:
+        with self._lock:
+            for job in self._jobs.values():
+                job._cancel.set()
+        self._pool.shutdown(wait=False)
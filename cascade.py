@@ -0,0 +1,292 @@
+# cascade.py
+"""
+SentinelSecure – Cascaded inference: fast model first, full ensemble only when unsure
+
+The stacked ensemble (best_threshold.pkl) is accurate but costly; the light
+XGBoost model (cybersecure_xgb_binary.pkl) is several times cheaper. In
+cascade mode:
+
+- stage 1: the fast model scores EVERY flow
+- flows whose stage-1 P(Intrusion) lies inside the uncertainty band
+  [low, high] are forwarded to stage 2, the full ensemble; all other flows
+  keep the stage-1 probability and decision
+- run_model_on_df records the deciding stage per flow in a `scored_by`
+  column ("fast" / "full"); stage_report() turns it into pass-through rates
+
+The band is tuned on LABELED flows (tune_band, or `python cascade.py
+labeled.csv`): the band forwarding the fewest flows whose cascade recall is
+still at least the full ensemble's recall on the same data (or an explicit
+--min-recall) AND whose accuracy is at most MAX_ACCURACY_DROP below the
+full ensemble's, so a fast model that over-flags cannot win by raising
+false alarms instead of forwarding. It is saved to cascade_band.json together with the hashes of
+both models; a band tuned for other model files is ignored and the
+untuned DEFAULT_BAND is used instead.
+
+Usage:
+    python cascade.py labeled_flows.csv                 # tune + save the band
+    python cascade.py labeled_flows.csv --min-recall 0.99
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import scoring
+
+FAST_MODEL_PATH = "cybersecure_xgb_binary.pkl"
+CASCADE_CONFIG = "cascade_band.json"
+
+# Used until a band has been tuned for the current pair of models
+DEFAULT_BAND = (0.2, 0.8)
+
+# Accuracy the cascade may lose against the full ensemble on the tuning flows
+MAX_ACCURACY_DROP = 0.01
+
+# Candidate band edges per side (quantiles of the stage-1 probabilities)
+BAND_GRID = 101
+
+STAGE_COLUMN = "scored_by"
+
+
+# -------------------------------------------------------
+# Cascade model
+# -------------------------------------------------------
+
+class CascadeModel:
+    """
+    Binary classifier facade (classes_ / predict / predict_proba) over the
+    two-stage cascade, so it can be used anywhere the plain model is.
+    """
+
+    def __init__(self, fast, full, low: float, high: float, tuned: Optional[Dict[str, Any]] = None):
+        self.fast = fast
+        self.full = full
+        self.low = float(low)
+        self.high = float(high)
+        self.tuned = tuned
+        self.classes_ = np.asarray(getattr(full, "classes_", [0, 1]))
+        if len(self.classes_) != 2:
+            raise ValueError("Cascade mode needs binary (Benign / Intrusion) models")
+        intrusion = [i for i, c in enumerate(self.classes_) if scoring.normalize_label(c) == "Intrusion"]
+        self._pos = intrusion[0] if intrusion else 1
+
+    def predict_proba_staged(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """(class probabilities, boolean mask of flows forwarded to the full ensemble)."""
+        p_fast = scoring.intrusion_proba(self.fast, X)
+        forwarded = (p_fast >= self.low) & (p_fast <= self.high)
+
+        # Same dtype as the models' own output, so scores round (and tier) identically
+        proba = np.empty((len(X), 2), dtype=p_fast.dtype)
+        proba[:, self._pos] = p_fast
+        proba[:, 1 - self._pos] = 1.0 - p_fast
+        if forwarded.any():
+            proba[forwarded] = self.full.predict_proba(X[forwarded])
+        return proba, forwarded
+
+    def predict_proba(self, X: pd.DataFrame) -> np.ndarray:
+        return self.predict_proba_staged(X)[0]
+
+    def predict(self, X: pd.DataFrame) -> np.ndarray:
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def stage_report(results: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """Per-stage counts and pass-through rate of cascade results (None if not cascaded)."""
+    if STAGE_COLUMN not in results.columns:
+        return None
+    flows = len(results)
+    forwarded = int((results[STAGE_COLUMN] == "full").sum())
+    return {
+        "flows": flows,
+        "fast_only": flows - forwarded,
+        "forwarded": forwarded,
+        "pass_through": forwarded / flows if flows else 0.0,
+    }
+
+
+# -------------------------------------------------------
+# Band tuning
+# -------------------------------------------------------
+
+def _rates(pred: np.ndarray, y: np.ndarray) -> Dict[str, float]:
+    tp = int((pred & y).sum())
+    positives, flagged = int(y.sum()), int(pred.sum())
+    return {
+        "recall": tp / positives if positives else 1.0,
+        "precision": tp / flagged if flagged else 1.0,
+        "accuracy": float((pred == y).mean()) if len(y) else 1.0,
+    }
+
+
+def tune_band(p_fast: np.ndarray, p_full: np.ndarray, y: np.ndarray,
+              min_recall: Optional[float] = None, grid: int = BAND_GRID,
+              max_accuracy_drop: float = MAX_ACCURACY_DROP) -> Dict[str, Any]:
+    """
+    Narrowest uncertainty band on labeled flows.
+
+    `p_fast` / `p_full` are each model's P(Intrusion), `y` is 1 for intrusions.
+    Picks the [low, high] forwarding the fewest flows whose cascade recall is
+    >= `min_recall` (default: the full ensemble's own recall) and whose
+    accuracy is >= the full ensemble's minus `max_accuracy_drop`, ties broken
+    by fewer false positives. Every candidate band is evaluated at once from
+    prefix sums over the flows sorted by p_fast.
+    """
+    p_fast = np.asarray(p_fast, dtype=np.float64)
+    y = np.asarray(y).astype(bool)
+    fast_pred = p_fast > 0.5
+    full_pred = np.asarray(p_full, dtype=np.float64) > 0.5
+    fast, full = _rates(fast_pred, y), _rates(full_pred, y)
+    target = full["recall"] if min_recall is None else float(min_recall)
+    min_accuracy = full["accuracy"] - max_accuracy_drop
+
+    # Forwarding a flow changes its decision from fast_pred to full_pred
+    order = np.argsort(p_fast, kind="stable")
+    sorted_p = p_fast[order]
+    delta = (full_pred.astype(np.int64) - fast_pred)[order]
+    d_tp = np.concatenate(([0], np.cumsum(delta * y[order])))
+    d_fp = np.concatenate(([0], np.cumsum(delta * ~y[order])))
+
+    qs = np.linspace(0.0, 1.0, grid)
+    below, above = p_fast[p_fast <= 0.5], p_fast[p_fast >= 0.5]
+    lows = np.unique(np.concatenate(([0.0, 0.5], np.quantile(below, qs) if below.size else [])))
+    highs = np.unique(np.concatenate(([0.5, 1.0], np.quantile(above, qs) if above.size else [])))
+    lo_idx = np.searchsorted(sorted_p, lows, side="left")[:, None]
+    hi_idx = np.searchsorted(sorted_p, highs, side="right")[None, :]
+
+    positives = max(1, int(y.sum()))
+    tp = int((fast_pred & y).sum()) + d_tp[hi_idx] - d_tp[lo_idx]
+    fp = int((fast_pred & ~y).sum()) + d_fp[hi_idx] - d_fp[lo_idx]
+    forwarded = hi_idx - lo_idx
+    correct = tp + int((~y).sum()) - fp
+    feasible = (tp / positives >= target - 1e-12) & (correct / max(1, len(y)) >= min_accuracy - 1e-12)
+
+    target_met = bool(feasible.any())
+    if target_met:
+        cost = np.where(feasible, forwarded * (len(y) + 1) + fp, np.iinfo(np.int64).max)
+        i, j = np.unravel_index(np.argmin(cost), cost.shape)
+        low, high = float(lows[i]), float(highs[j])
+    else:  # unreachable targets: forward everything (= the full ensemble)
+        low, high = 0.0, 1.0
+
+    band = (p_fast >= low) & (p_fast <= high)
+    cascade = _rates(np.where(band, full_pred, fast_pred), y)
+    return {
+        "low": low,
+        "high": high,
+        "target_recall": round(target, 4),
+        "min_accuracy": round(min_accuracy, 4),
+        "target_met": target_met,
+        "flows": int(len(y)),
+        "intrusions": int(y.sum()),
+        "pass_through": round(float(band.mean()) if len(y) else 0.0, 4),
+        "cascade": {k: round(v, 4) for k, v in cascade.items()},
+        "full": {k: round(v, 4) for k, v in full.items()},
+        "fast": {k: round(v, 4) for k, v in fast.items()},
+    }
+
+
+def tune_on_frame(df: pd.DataFrame, fast, full, min_recall: Optional[float] = None,
+                  label_column: str = "label", max_accuracy_drop: float = MAX_ACCURACY_DROP) -> Dict[str, Any]:
+    """Tune the band on a labeled flow frame; adds per-stage timings to the report."""
+    if label_column not in df.columns:
+        raise ValueError(f"Tuning needs labeled flows: no {label_column!r} column")
+    y = df[label_column].map(scoring.normalize_label).eq("Intrusion").to_numpy()
+    X = scoring.prepare_feature_frame(df)
+
+    t0 = time.perf_counter()
+    p_fast = scoring.intrusion_proba(fast, X)
+    t1 = time.perf_counter()
+    p_full = scoring.intrusion_proba(full, X)
+    t2 = time.perf_counter()
+
+    report = tune_band(p_fast, p_full, y, min_recall, max_accuracy_drop=max_accuracy_drop)
+    fast_s, full_s = t1 - t0, t2 - t1
+    # Expected cascade cost: every flow through stage 1, pass_through of them through stage 2
+    cascade_s = fast_s + report["pass_through"] * full_s
+    report["timing"] = {
+        "fast_ms_per_1k": round(1000 * fast_s / max(1, len(X)) * 1000, 3),
+        "full_ms_per_1k": round(1000 * full_s / max(1, len(X)) * 1000, 3),
+        "expected_speedup": round(full_s / cascade_s, 2) if cascade_s > 0 else None,
+    }
+    return report
+
+
+# -------------------------------------------------------
+# Persisted band
+# -------------------------------------------------------
+
+def save_band(report: Dict[str, Any], path: str = CASCADE_CONFIG,
+              fast_path: str = FAST_MODEL_PATH, full_path: str = scoring.MODEL_PATH) -> None:
+    config = {
+        "low": report["low"],
+        "high": report["high"],
+        "fast_model": scoring.model_version(fast_path),
+        "full_model": scoring.model_version(full_path),
+        "tuned_at": time.time(),
+        "report": report,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(config, fh, indent=2)
+    os.replace(tmp, path)
+
+
+def load_band(path: str = CASCADE_CONFIG, fast_path: str = FAST_MODEL_PATH,
+              full_path: str = scoring.MODEL_PATH) -> Optional[Dict[str, Any]]:
+    """The saved band config, or None if missing, unreadable or tuned for other model files."""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            config = json.load(fh)
+        if (config.get("fast_model") != scoring.model_version(fast_path)
+                or config.get("full_model") != scoring.model_version(full_path)):
+            return None
+        return config
+    except (OSError, ValueError):
+        return None
+
+
+def load_cascade(full=None, fast_path: str = FAST_MODEL_PATH, full_path: str = scoring.MODEL_PATH,
+                 config_path: str = CASCADE_CONFIG) -> CascadeModel:
+    """Cascade over the two model files with the saved band (DEFAULT_BAND if none fits)."""
+    fast = scoring.load_model(fast_path)
+    if full is None:
+        full = scoring.load_model(full_path)
+    config = load_band(config_path, fast_path, full_path)
+    low, high = (config["low"], config["high"]) if config else DEFAULT_BAND
+    return CascadeModel(fast, full, low, high, tuned=config)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Tune the cascade uncertainty band on labeled flows")
+    parser.add_argument("labeled", help="CSV of flows with a 'label' column")
+    parser.add_argument("--min-recall", type=float, default=None,
+                        help="recall the cascade must keep (default: the full ensemble's recall)")
+    parser.add_argument("--max-accuracy-drop", type=float, default=MAX_ACCURACY_DROP,
+                        help="accuracy the cascade may lose against the full ensemble (default: %(default)s)")
+    parser.add_argument("--fast", default=FAST_MODEL_PATH, help="stage-1 model (default: %(default)s)")
+    parser.add_argument("--full", default=scoring.MODEL_PATH, help="stage-2 model (default: %(default)s)")
+    parser.add_argument("--config", default=CASCADE_CONFIG, help="where to save the band (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="report only, do not save the band")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(args.labeled)
+    report = tune_on_frame(df, scoring.load_model(args.fast), scoring.load_model(args.full), args.min_recall,
+                           max_accuracy_drop=args.max_accuracy_drop)
+    for key, value in report.items():
+        print(f"{key:>16}: {value}")
+    if not report["target_met"]:
+        print("warning: target recall / accuracy not reachable – band forwards every flow", file=sys.stderr)
+    if not args.dry_run:
+        save_band(report, args.config, args.fast, args.full)
+        print(f"saved band [{report['low']:.4f}, {report['high']:.4f}] to {args.config}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,104 @@
+# column_profile.py
+"""
+SentinelSecure – Per-upload column statistics profile
+
+- One profile per uploaded CSV, computed ONCE and cached next to the parsed data
+- For every model feature (FEATURE_ORDER) we keep min / max / mean / quantiles / cardinality
+- Numbers are exact: the upload is already parsed into memory, so each column
+  is profiled from a single float64 copy of it (one column at a time)
+
+The simulator reads slider ranges from this profile instead of re-scanning the
+whole upload on every rerun.
+"""
+
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Quantiles kept for every column (keys in the profile are "q05", "q25", ...)
+PROFILE_QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+# Exact distinct counting stops here (profile then reports distinct_capped=True)
+DISTINCT_CAP = 10_000
+
+
+# -------------------------------------------------------
+# Internal helpers
+# -------------------------------------------------------
+
+def _quantile_key(q: float) -> str:
+    return f"q{int(round(q * 100)):02d}"
+
+
+def _empty_stats() -> Dict[str, Any]:
+    stats: Dict[str, Any] = {
+        "count": 0,
+        "min": None,
+        "max": None,
+        "mean": None,
+        "distinct": 0,
+        "distinct_capped": False,
+        "is_integer": True,
+    }
+    for q in PROFILE_QUANTILES:
+        stats[_quantile_key(q)] = None
+    return stats
+
+
+def _profile_exact(values: np.ndarray) -> Dict[str, Any]:
+    stats = _empty_stats()
+    values = values[~np.isnan(values)]
+    if values.size == 0:
+        return stats
+
+    stats["count"] = int(values.size)
+    stats["min"] = float(values.min())
+    stats["max"] = float(values.max())
+    stats["mean"] = float(values.mean())
+    for q, v in zip(PROFILE_QUANTILES, np.quantile(values, PROFILE_QUANTILES)):
+        stats[_quantile_key(q)] = float(v)
+
+    distinct = np.unique(values)
+    stats["distinct"] = int(min(distinct.size, DISTINCT_CAP))
+    stats["distinct_capped"] = bool(distinct.size > DISTINCT_CAP)
+    stats["is_integer"] = bool(np.all(np.mod(distinct, 1) == 0))
+    return stats
+
+
+# -------------------------------------------------------
+# Public API
+# -------------------------------------------------------
+
+def build_profile(
+    df: pd.DataFrame,
+    columns: Optional[Iterable[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Profile the numeric `columns` of `df` (defaults to every numeric column).
+
+    Returns {column: stats} where stats holds count, min, max, mean,
+    q05/q25/q50/q75/q95/q99, distinct (capped at DISTINCT_CAP), distinct_capped
+    and is_integer. Columns that are missing or non-numeric are skipped.
+    """
+    if columns is None:
+        columns = df.select_dtypes(include=["number"]).columns
+
+    profile: Dict[str, Dict[str, Any]] = {}
+    for col in columns:
+        if col not in df.columns or not pd.api.types.is_numeric_dtype(df[col]):
+            continue
+        profile[col] = _profile_exact(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+    return profile
+
+
+def slider_max(profile: Dict[str, Dict[str, Any]], col: str, key: str = "q95",
+               factor: float = 2.0, floor: float = 1.0) -> float:
+    """
+    Upper bound for a simulator slider: `factor` × the profiled statistic `key`,
+    never below `floor`. Falls back to `floor` if the column was not profiled.
+    """
+    value = profile.get(col, {}).get(key)
+    if value is None:
+        return floor
+    return max(floor, float(value) * factor)
@@ -33,6 +33,16 @@ else:
         load_error = f"Could not load model: {e}"
 
 
+def set_model(new_model, error=None):
+    """
+    Point explanations at another model object (app.py does this on every
+    hot reload). Explanations already running finish with the model they started with.
+    """
+    global model, load_error
+    model = new_model
+    load_error = error
+
+
 # ----------------- KNOWN FEATURE ORDER (from training) -----------------
 # This must match EXACTLY the order the model was trained with.
 FEATURE_ORDER = [
@@ -227,8 +237,9 @@ def explain_flow(flow_row: dict, top_n: int = 5) -> str:
     - For top N features, shows importance + this flow's value.
     """
     lines = []
+    current = model  # one snapshot for the whole explanation (see set_model)
 
-    if model is None:
+    if current is None:
         lines.append("Model not available for explanation.")
         if load_error:
             lines.append(load_error)
@@ -238,7 +249,7 @@ def explain_flow(flow_row: dict, top_n: int = 5) -> str:
         lines.append("FEATURE_ORDER is empty - cannot map inputs to features.")
         return "\n".join(lines)
 
-    booster, booster_err = _get_xgb_booster(model)
+    booster, booster_err = _get_xgb_booster(current)
     if booster is None:
         lines.append("Could not access underlying XGBoost booster for feature importance.")
         if booster_err:
@@ -290,10 +301,10 @@ def explain_flow(flow_row: dict, top_n: int = 5) -> str:
 
     # ---------- Optional: predicted probabilities for this flow ----------
     try:
-        if pd is not None and hasattr(model, "predict_proba"):
+        if pd is not None and hasattr(current, "predict_proba"):
             df_row = _row_to_dataframe(flow_row)
             if df_row is not None:
-                proba = model.predict_proba(df_row)[0]
+                proba = current.predict_proba(df_row)[0]
                 lines.append("")
                 lines.append(
                     f"Predicted class probabilities [Benign, Intrusion]: {proba.tolist()}"
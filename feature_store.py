@@ -0,0 +1,294 @@
+# feature_store.py
+"""
+SentinelSecure – Content-addressed store for flow feature rows
+
+Threat ledger blocks used to embed the full 40+ field `features` dict of
+every flow. Instead, each distinct feature row is stored ONCE here, keyed by
+its digest (block_codec.features_digest), and blocks only carry that digest
+in `data["features_digest"]` – covered by the block hash like any other field.
+
+Rows are kept in the compact v2 packing, one fixed-width record per column:
+
+- digests.bin     32 bytes   SHA-256 of the packed row (the content address)
+- mask.bin        40 bytes   v2 type mask (float / int / NaN / other)
+- values.bin     320 bytes   40 little-endian float64 values
+- extra_off.bin    8 bytes   offset into extras.jsonl (-1 = nothing extra)
+- extras.jsonl               JSON of non-numeric / off-schema fields, when any
+
+Lookups by digest binary-search a sorted copy of the digests' first 64 bits
+(recent rows sit in a small dict); reads re-hash the row, so a tampered
+feature file is detected just like a tampered block. `verify()` re-hashes
+every row at once (the full ledger audit runs it).
+
+Unlike the Merkle tree and the secondary indexes, this is primary data: rows
+are written through to the OS before the blocks that reference them are
+appended, and the ledger's stores call `flush()` (fsync) before every fsync
+of their own, so a durable block never cites a row that is not.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from block_codec import (
+    FEATURE_SCHEMA_V2, dumps_compact, encode_features_v2, pack_features, unpack_features,
+)
+
+DIGEST_SIZE = 32
+N_FEATURES = len(FEATURE_SCHEMA_V2)
+COLUMNS = (
+    ("digests", DIGEST_SIZE),
+    ("mask", N_FEATURES),
+    ("values", 8 * N_FEATURES),
+    ("extra_off", 8),
+)
+EXTRAS_FILE = "extras.jsonl"
+
+# Rows re-hashed per read by verify()
+VERIFY_CHUNK_ROWS = 65_536
+
+# Digests added since the last sorted rebuild are looked up in a dict;
+# past this many the sorted array is rebuilt
+DIGEST_TAIL_MAX = 50_000
+
+
+class FeatureStore:
+    """
+    Deduplicated feature rows keyed by digest. `directory=None` keeps
+    everything in memory (same layout, bytearrays instead of files).
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._n = 0
+        self._extras_size = 0
+        self._buf: Dict[str, bytearray] = {}
+        self._fh: Dict[str, Any] = {}
+        self._sorted: Optional[np.ndarray] = None
+        self._sorted_rows: Optional[np.ndarray] = None
+        self._tail: Dict[int, int] = {}
+        if directory is None:
+            self._buf = {name: bytearray() for name, _ in COLUMNS}
+            self._buf["extras"] = bytearray()
+        else:
+            os.makedirs(directory, exist_ok=True)
+            self._open()
+
+    # ---------- persistence ----------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, EXTRAS_FILE if name == "extras" else f"{name}.bin")
+
+    def _open(self) -> None:
+        sizes = {}
+        for name, width in COLUMNS:
+            try:
+                sizes[name] = os.path.getsize(self._path(name)) // width
+            except OSError:
+                sizes[name] = 0
+        self._n = min(sizes.values())
+
+        # Drop partial rows from an interrupted write
+        for name, width in COLUMNS + (("extras", 0),):
+            fh = open(self._path(name), "a+b")
+            if width:
+                fh.truncate(self._n * width)
+            self._fh[name] = fh
+        self._extras_size = self._fh["extras"].tell()
+
+    def flush(self) -> None:
+        if self.directory is None:
+            return
+        with self._lock:
+            for fh in self._fh.values():
+                fh.flush()
+                os.fsync(fh.fileno())
+
+    def close(self) -> None:
+        if self.directory is None:
+            return
+        self.flush()
+        for fh in self._fh.values():
+            fh.close()
+        self._fh = {}
+
+    def _write(self, name: str, data: bytes) -> None:
+        if self.directory is None:
+            self._buf[name] += data
+        else:
+            self._fh[name].write(data)
+
+    def _read(self, name: str, offset: int, size: int) -> bytes:
+        if self.directory is None:
+            return bytes(self._buf[name][offset:offset + size])
+        return os.pread(self._fh[name].fileno(), size, offset)
+
+    def _read_line(self, offset: int) -> bytes:
+        size = 4096
+        while True:
+            chunk = self._read("extras", offset, size)
+            end = chunk.find(b"\n")
+            if end >= 0 or len(chunk) < size:
+                return chunk if end < 0 else chunk[:end]
+            size *= 4
+
+    def _read_column(self, name: str) -> bytes:
+        if self.directory is None:
+            return bytes(self._buf[name])
+        with open(self._path(name), "rb") as fh:
+            return fh.read(self._n * dict(COLUMNS)[name])
+
+    # ---------- digest lookup ----------
+
+    def _build_lookup(self) -> None:
+        raw = np.frombuffer(self._read_column("digests"), dtype=np.uint8).reshape(-1, DIGEST_SIZE)
+        prefixes = raw[:, :8].copy().view(">u8").ravel().astype(np.uint64)
+        order = np.argsort(prefixes, kind="stable")
+        self._sorted = prefixes[order]
+        self._sorted_rows = order.astype(np.int64)
+        self._tail = {}
+
+    def _find(self, digest: bytes) -> Optional[int]:
+        """Row holding `digest`, or None. Caller holds `_lock`."""
+        if self._sorted is None:
+            self._build_lookup()
+        prefix = int.from_bytes(digest[:8], "big")
+        i = int(np.searchsorted(self._sorted, np.uint64(prefix)))
+        if i < len(self._sorted) and int(self._sorted[i]) == prefix:
+            row = int(self._sorted_rows[i])
+        else:
+            row = self._tail.get(prefix)
+        if row is None:
+            return None
+        if self._read("digests", row * DIGEST_SIZE, DIGEST_SIZE) == digest:
+            return row
+        # 64-bit prefix collision: fall back to a full scan of the digests column
+        raw = np.frombuffer(self._read_column("digests"), dtype=np.uint8).reshape(-1, DIGEST_SIZE)
+        hits = np.flatnonzero(np.all(raw == np.frombuffer(digest, dtype=np.uint8), axis=1))
+        return int(hits[0]) if hits.size else None
+
+    # ---------- writes ----------
+
+    def put_many(self, rows: Sequence[Dict[str, Any]]) -> List[str]:
+        """
+        Store feature rows (duplicates are kept once) and return their hex digests.
+        The packing and hashing happen before the store lock is taken.
+        """
+        packed = [pack_features(features) for features in rows]
+        digests = [hashlib.sha256(encode_features_v2(*p)).digest() for p in packed]
+
+        with self._lock:
+            columns: Dict[str, List[bytes]] = {name: [] for name, _ in COLUMNS}
+            extras: List[bytes] = []
+            added = set()
+            n, extras_size, tail = self._n, self._extras_size, {}
+            for digest, (mask, values, extra) in zip(digests, packed):
+                if digest in added or self._find(digest) is not None:
+                    continue
+                added.add(digest)
+                offset = -1
+                if extra:
+                    offset = extras_size
+                    line = dumps_compact(extra) + b"\n"
+                    extras.append(line)
+                    extras_size += len(line)
+                columns["digests"].append(digest)
+                columns["mask"].append(mask)
+                columns["values"].append(values)
+                columns["extra_off"].append(offset.to_bytes(8, "little", signed=True))
+                tail[int.from_bytes(digest[:8], "big")] = n
+                n += 1
+
+            if columns["digests"]:
+                # extras first: a row is only visible once all of its columns are
+                self._write("extras", b"".join(extras))
+                for name, _ in COLUMNS:
+                    self._write(name, b"".join(columns[name]))
+                if self.directory is not None:
+                    for fh in self._fh.values():
+                        fh.flush()  # hand to the OS; fsync happens in flush()
+                # rows are counted (and findable) only once every column is written
+                self._tail.update(tail)
+                self._extras_size = extras_size
+                self._n = n
+                if len(self._tail) > DIGEST_TAIL_MAX:
+                    self._sorted = None
+        return [d.hex() for d in digests]
+
+    def put(self, features: Dict[str, Any]) -> str:
+        return self.put_many([features])[0]
+
+    # ---------- reads ----------
+
+    def __len__(self) -> int:
+        return self._n
+
+    def __contains__(self, digest: str) -> bool:
+        with self._lock:
+            return self._find(bytes.fromhex(digest)) is not None
+
+    def get(self, digest: str, verify: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        The feature row stored under hex `digest`, or None if unknown.
+        With `verify`, raises ValueError if the stored row no longer hashes to it.
+        """
+        try:
+            raw_digest = bytes.fromhex(digest)
+        except (TypeError, ValueError):
+            return None
+        with self._lock:
+            row = self._find(raw_digest)
+            if row is None:
+                return None
+            mask = self._read("mask", row * N_FEATURES, N_FEATURES)
+            values = self._read("values", row * 8 * N_FEATURES, 8 * N_FEATURES)
+            offset = int.from_bytes(self._read("extra_off", row * 8, 8), "little", signed=True)
+            extra = {}
+            if offset >= 0:
+                extra = json.loads(self._read_line(offset))
+
+        if verify and hashlib.sha256(encode_features_v2(mask, values, extra)).digest() != raw_digest:
+            raise ValueError(f"Feature row {digest[:16]}… does not match its digest (tampered?)")
+        return unpack_features(mask, values, extra)
+
+    def verify(self) -> Dict[str, Any]:
+        """
+        Re-hash every stored row against its digest:
+        {"rows", "ok", "first_bad_row"} (row position, None if all match).
+        Covers the rows present when it starts; rows are append-only, so only
+        that snapshot is taken under the lock and the re-hashing does not
+        block writers.
+        """
+        with self._lock:
+            n = self._n
+        for lo in range(0, n, VERIFY_CHUNK_ROWS):
+            k = min(VERIFY_CHUNK_ROWS, n - lo)
+            digests = self._read("digests", lo * DIGEST_SIZE, k * DIGEST_SIZE)
+            masks = self._read("mask", lo * N_FEATURES, k * N_FEATURES)
+            values = self._read("values", lo * 8 * N_FEATURES, k * 8 * N_FEATURES)
+            offsets = np.frombuffer(self._read("extra_off", lo * 8, k * 8), dtype="<i8")
+            for i in range(k):
+                offset = int(offsets[i])
+                try:
+                    extra = json.loads(self._read_line(offset)) if offset >= 0 else {}
+                    row = encode_features_v2(masks[i * N_FEATURES:(i + 1) * N_FEATURES],
+                                             values[i * 8 * N_FEATURES:(i + 1) * 8 * N_FEATURES], extra)
+                except ValueError:
+                    row = None
+                if row is None or hashlib.sha256(row).digest() != digests[i * DIGEST_SIZE:(i + 1) * DIGEST_SIZE]:
+                    return {"rows": n, "ok": False, "first_bad_row": lo + i}
+        return {"rows": n, "ok": True, "first_bad_row": None}
+
+    def get_many(self, digests: Sequence[str], verify: bool = True) -> List[Optional[Dict[str, Any]]]:
+        return [self.get(d, verify) for d in digests]
+
+    def stats(self) -> Dict[str, int]:
+        """Row count and bytes used by the packed columns plus extras."""
+        width = sum(w for _, w in COLUMNS)
+        with self._lock:
+            return {"rows": self._n, "bytes": self._n * width + self._extras_size}
@@ -0,0 +1,272 @@
+# latency_tiers.py
+"""
+SentinelSecure – Latency-tiered scoring with truncated tree ranges
+
+Under a traffic spike a slightly less accurate score on time beats falling
+behind. Every boosted member of the model can be evaluated on a PREFIX of its
+trees only:
+
+- XGBoost        predict_proba(X, iteration_range=(0, k))
+- LightGBM       predict_proba(X, num_iteration=k)
+- CatBoost       predict_proba(X, ntree_end=k)
+- StackingClassifier: each base model and the final estimator truncated
+  alike, meta-features rebuilt exactly as sklearn does
+
+TIERS name the fractions of trees used ("full" = the unmodified model). A
+TierPolicy picks the tier per batch: the most accurate tier whose cost fits
+the latency budget (ms per 1,000 flows), and never better than the queue
+depth allows (QUEUE_DEPTH_TIERS). Costs start from the up-front measurement
+and follow the latencies actually observed.
+
+The accuracy / recall impact of every tier is measured up front on labeled
+flows (measure_tiers, or `python latency_tiers.py labeled.csv`) and saved to
+latency_tiers.json with the model hash. Tiered results carry a `tier`
+column, which scoring.ledger_batch copies into every ledger entry.
+
+Usage:
+    python latency_tiers.py labeled_flows.csv
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import scoring
+
+# (tier name, fraction of boosted trees evaluated), most accurate first
+TIERS = (("full", 1.0), ("reduced", 0.5), ("minimal", 0.2))
+TIER_NAMES = tuple(name for name, _ in TIERS)
+TIER_FRACTIONS = dict(TIERS)
+
+TIERS_CONFIG = "latency_tiers.json"
+TIER_COLUMN = "tier"
+
+# Queued bulk jobs at which scoring drops to the 2nd, 3rd, ... tier
+QUEUE_DEPTH_TIERS = (2, 4)
+
+# Weight of the newest observed latency in a tier's running cost
+COST_SMOOTHING = 0.3
+
+
+# -------------------------------------------------------
+# Truncated evaluation
+# -------------------------------------------------------
+
+def boosted_rounds(estimator) -> Optional[int]:
+    """Number of boosting rounds of an XGBoost / LightGBM / CatBoost model, else None."""
+    if hasattr(estimator, "get_booster"):
+        return int(estimator.get_booster().num_boosted_rounds())
+    if hasattr(estimator, "booster_") and hasattr(estimator.booster_, "current_iteration"):
+        return int(estimator.booster_.current_iteration())
+    if hasattr(estimator, "tree_count_"):
+        return int(estimator.tree_count_)
+    return None
+
+
+def truncated_proba(model, X, fraction: float) -> np.ndarray:
+    """predict_proba of `model` using the first `fraction` of every boosted member's trees."""
+    if fraction >= 1.0:
+        return model.predict_proba(X)
+
+    if hasattr(model, "estimators_") and hasattr(model, "final_estimator_") and hasattr(model, "stack_method_"):
+        return truncated_proba(model.final_estimator_, _stack_features(model, X, fraction), fraction)
+
+    rounds = boosted_rounds(model)
+    if rounds is None:  # nothing to truncate
+        return model.predict_proba(X)
+    k = max(1, math.ceil(fraction * rounds))
+    if hasattr(model, "get_booster"):
+        return model.predict_proba(X, iteration_range=(0, k))
+    if hasattr(model, "booster_"):
+        return model.predict_proba(X, num_iteration=k)
+    return model.predict_proba(X, ntree_end=k)
+
+
+def _stack_features(stack, X, fraction: float) -> np.ndarray:
+    """StackingClassifier meta-features (cf. its transform()) from truncated base models."""
+    meta = []
+    for estimator, method in zip(stack.estimators_, stack.stack_method_):
+        if method == "predict_proba":
+            preds = truncated_proba(estimator, X, fraction)
+        else:
+            preds = getattr(estimator, method)(X)
+        preds = np.asarray(preds)
+        if preds.ndim == 1:
+            meta.append(preds.reshape(-1, 1))
+        elif method == "predict_proba" and len(stack.classes_) == 2:
+            meta.append(preds[:, 1:])  # binary: sklearn keeps only the positive column
+        else:
+            meta.append(preds)
+    if stack.passthrough:
+        meta.append(np.asarray(X))
+    return np.hstack(meta)
+
+
+class TieredModel:
+    """Classifier facade evaluating `model` at one tier; run_model_on_df records the tier."""
+
+    tier_names = TIER_NAMES
+
+    def __init__(self, model, tier: str = "full"):
+        if tier not in TIER_FRACTIONS:
+            raise ValueError(f"Unknown tier {tier!r} (choose from {list(TIER_NAMES)})")
+        self.model = model
+        self.tier = tier
+        self.fraction = TIER_FRACTIONS[tier]
+        self.classes_ = getattr(model, "classes_", None)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return truncated_proba(self.model, X, self.fraction)
+
+    def predict(self, X) -> np.ndarray:
+        return np.asarray(self.classes_)[self.predict_proba(X).argmax(axis=1)]
+
+
+# -------------------------------------------------------
+# Up-front measurement
+# -------------------------------------------------------
+
+def measure_tiers(model, df: pd.DataFrame, label_column: str = "label") -> List[Dict[str, Any]]:
+    """
+    Recall / precision / accuracy, agreement with the full model and cost
+    (ms per 1,000 flows) of every tier on labeled flows.
+    """
+    if label_column not in df.columns:
+        raise ValueError(f"Measuring tiers needs labeled flows: no {label_column!r} column")
+    y = df[label_column].map(scoring.normalize_label).eq("Intrusion").to_numpy()
+    X = scoring.prepare_feature_frame(df)
+    n = max(1, len(X))
+
+    rows, full_pred = [], None
+    for tier in TIER_NAMES:
+        tiered = TieredModel(model, tier)
+        tiered.predict_proba(X.head(16))  # warm-up
+        t0 = time.perf_counter()
+        p = scoring.intrusion_proba(tiered, X)
+        elapsed = time.perf_counter() - t0
+        pred = p > 0.5
+        if full_pred is None:
+            full_pred = pred
+        tp, positives, flagged = int((pred & y).sum()), int(y.sum()), int(pred.sum())
+        rows.append({
+            "tier": tier,
+            "trees": tiered.fraction,
+            "recall": round(tp / positives, 4) if positives else 1.0,
+            "precision": round(tp / flagged, 4) if flagged else 1.0,
+            "accuracy": round(float((pred == y).mean()), 4),
+            "agreement": round(float((pred == full_pred).mean()), 4),
+            "ms_per_1k": round(1e6 * elapsed / n, 3),
+        })
+    return rows
+
+
+def save_tiers(measurements: List[Dict[str, Any]], flows: int, path: str = TIERS_CONFIG,
+               model_path: str = scoring.MODEL_PATH) -> None:
+    config = {
+        "model": scoring.model_version(model_path),
+        "measured_at": time.time(),
+        "flows": flows,
+        "tiers": measurements,
+    }
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(config, fh, indent=2)
+    os.replace(tmp, path)
+
+
+def load_tiers(version: str, path: str = TIERS_CONFIG) -> Optional[Dict[str, Any]]:
+    """Saved measurements for the model with hash `version`, or None."""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            config = json.load(fh)
+        return config if config.get("model") == version else None
+    except (OSError, ValueError):
+        return None
+
+
+# -------------------------------------------------------
+# Tier selection
+# -------------------------------------------------------
+
+class TierPolicy:
+    """
+    Picks the tier for each batch from a latency budget and the current
+    queue depth. Thread-safe; learns each tier's cost from observed batches.
+    """
+
+    def __init__(self, budget_ms_per_1k: Optional[float] = None,
+                 queue_depth: Optional[Callable[[], int]] = None,
+                 measurements: Optional[List[Dict[str, Any]]] = None):
+        self.budget_ms_per_1k = budget_ms_per_1k
+        self.queue_depth = queue_depth
+        self._lock = threading.Lock()
+        self._cost: Dict[str, Optional[float]] = {name: None for name in TIER_NAMES}
+        for row in measurements or []:
+            if row.get("tier") in self._cost:
+                self._cost[row["tier"]] = row.get("ms_per_1k")
+
+    def floor(self) -> int:
+        """Lowest tier index the queue depth allows."""
+        depth = self.queue_depth() if self.queue_depth is not None else 0
+        return min(len(TIER_NAMES) - 1, sum(depth >= d for d in QUEUE_DEPTH_TIERS))
+
+    def choose(self) -> str:
+        start = self.floor()
+        if self.budget_ms_per_1k is None:
+            return TIER_NAMES[start]
+        with self._lock:
+            for name in TIER_NAMES[start:]:
+                cost = self._cost[name]
+                if cost is None or cost <= self.budget_ms_per_1k:
+                    return name
+        return TIER_NAMES[-1]  # nothing fits: the cheapest tier
+
+    def observe(self, tier: str, rows: int, seconds: float) -> None:
+        if rows <= 0:
+            return
+        cost = 1e6 * seconds / rows
+        with self._lock:
+            old = self._cost.get(tier)
+            self._cost[tier] = cost if old is None else (1 - COST_SMOOTHING) * old + COST_SMOOTHING * cost
+
+    def costs(self) -> Dict[str, Optional[float]]:
+        with self._lock:
+            return dict(self._cost)
+
+
+def run_tiered(model, df: pd.DataFrame, policy: TierPolicy, shadow=None) -> pd.DataFrame:
+    """run_model_on_df at the tier `policy` picks for this batch (adds a `tier` column)."""
+    tier = policy.choose()
+    t0 = time.perf_counter()
+    result = scoring.run_model_on_df(TieredModel(model, tier), df, shadow=shadow)
+    policy.observe(tier, len(df), time.perf_counter() - t0)
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Measure accuracy / recall / cost of every latency tier")
+    parser.add_argument("labeled", help="CSV of flows with a 'label' column")
+    parser.add_argument("--model", default=scoring.MODEL_PATH, help="model artifact (default: %(default)s)")
+    parser.add_argument("--config", default=TIERS_CONFIG, help="where to save the results (default: %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="report only, do not save")
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(args.labeled)
+    rows = measure_tiers(scoring.load_model(args.model), df)
+    print(pd.DataFrame(rows).to_string(index=False))
+    if not args.dry_run:
+        save_tiers(rows, len(df), args.config, args.model)
+        print(f"saved tier measurements to {args.config}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,22 +1,88 @@
 # ledger.py
 """
-SentinelSecure – Minimal In-Memory Threat Ledger
+SentinelSecure – Threat Ledger
 
 - Each security incident (intrusion + action) is turned into a log `entry` (dict)
 - Each entry lives inside a "block"
 - Each block is hashed with SHA-256 and linked to the previous block's hash
 - This gives you an append-only, tamper-evident chain you can verify
 
-This is purely in-memory (no real blockchain node) but perfect for a hackathon demo.
+Blocks are persisted through a storage backend (see ledger_store.py):
+- by default a durable, segmented append-only log under ./ledger_data
+  (override with the SENTINEL_LEDGER_DIR environment variable)
+- SENTINEL_LEDGER_BACKEND=sqlite stores that directory's chain in a SQLite
+  database (WAL mode) instead, for concurrent readers and plain-SQL queries
+- SENTINEL_LEDGER_DIR="" (or ":memory:") keeps the chain in process memory
+
+Only a small tip cache is held in memory; the segmented and in-memory stores
+also rotate the chain into sealed segments (see ledger_store.py).
+
+New blocks are hashed with the fast, versioned v2 encoding (block_codec.py);
+blocks written before it (no `enc` field) still verify under the legacy JSON one.
+
+Alongside the prev_hash chain, an incremental Merkle tree over all block hashes
+(merkle.py) gives a compact root to publish and O(log n) inclusion proofs for
+individual incidents.
+
+Columnar secondary indexes (ledger_index.py) on time, label, action,
+confidence and flow_index back `query_blocks()`, a paginated query that only
+reads the blocks on the requested page.
+
+Appends can be made idempotent: an entry carrying an `idempotency_key`
+(see `idempotency_key()`: flow digest + decision + model version) is only
+written once; repeating it returns the block already in the chain. The key
+is stored inside the block's data, so it is covered by the block hash.
+
+Flow feature rows are not embedded in blocks: each distinct row is stored
+once in a content-addressed feature store (feature_store.py) and the block
+carries its `features_digest`. `get_block_features()` returns the row again.
 """
 
 import hashlib
-import json
+import os
+import threading
 import time
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple, Union
+
+from block_codec import (
+    ENCODING_V2, block_encoding, block_header_v2, dumps_compact, encode_payload_v2,
+    features_digest, hash_core,
+)
+from feature_store import FeatureStore
+from ledger_index import LedgerIndex
+from ledger_audit import default_workers, plan_file_tasks, run_audit
+from ledger_store import MemoryStore, SegmentedFileStore, SQLiteStore
+from merkle import MerkleTree, proof_to_dict
+
+LEDGER_DIR_ENV = "SENTINEL_LEDGER_DIR"
+LEDGER_BACKEND_ENV = "SENTINEL_LEDGER_BACKEND"
+DEFAULT_LEDGER_DIR = "ledger_data"
+
+# Durable storage engines selectable for a ledger directory
+BACKENDS = ("segments", "sqlite")
+
+# Active storage backend (created lazily on first use)
+_store = None
 
-# Our in-memory chain
-_chain: List[Dict[str, Any]] = []
+# Merkle tree over block hashes, kept in step with the chain
+_merkle = None
+
+# Secondary indexes (time / label / action / confidence / flow_index), kept in step with the chain
+_index = None
+
+# Deduplicated flow feature rows referenced by block digests
+_features = None
+
+# Metadata key of the last trusted verification checkpoint
+CHECKPOINT_KEY = "verified_checkpoint"
+
+# Serializes appends (tip read -> link -> store append). Streamlit runs every
+# browser session on its own thread, so all writers go through this lock; the
+# expensive payload JSON encoding happens before it is taken.
+_append_lock = threading.Lock()
+
+# Guards lazy backend creation on first use
+_init_lock = threading.Lock()
 
 
 # -------------------------------------------------------
@@ -28,8 +94,7 @@ def _hash_block_core(block_core: Dict[str, Any]) -> str:
     Compute SHA-256 over the "core" fields of a block
     (everything except the final `hash` field).
     """
-    encoded = json.dumps(block_core, sort_keys=True, separators=(",", ":")).encode("utf-8")
-    return hashlib.sha256(encoded).hexdigest()
+    return hash_core(block_core)
 
 
 def _create_genesis_block() -> Dict[str, Any]:
@@ -48,22 +113,251 @@ def _create_genesis_block() -> Dict[str, Any]:
     return core
 
 
+def _block_hash_ok(block: Dict[str, Any]) -> bool:
+    """
+    True if the block's stored `hash` matches its recomputed core hash.
+    """
+    core = {
+        "index": block["index"],
+        "timestamp": block["timestamp"],
+        "event_type": block["event_type"],
+        "data": block["data"],
+        "prev_hash": block["prev_hash"],
+    }
+    return block.get("hash") == hash_core(core, block_encoding(block))
+
+
 def _ensure_chain_initialized() -> None:
     """
-    Lazily create the chain with a genesis block on first use.
+    Lazily open the storage backend and create a genesis block on first use.
+    """
+    if _store is None:
+        with _init_lock:
+            if _store is None:
+                configure_storage(
+                    os.environ.get(LEDGER_DIR_ENV, DEFAULT_LEDGER_DIR),
+                    backend=os.environ.get(LEDGER_BACKEND_ENV) or "segments",
+                )
+
+
+def _externalize_features(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Move each record's `features` dict into the feature store, replacing it
+    with `features_digest`. Done OUTSIDE the append lock, like the encoding.
+    """
+    with_features = [i for i, rec in enumerate(records) if isinstance(rec.get("features"), dict)]
+    if not with_features:
+        return records
+    digests = _features.put_many([records[i]["features"] for i in with_features])
+    records = list(records)
+    for i, digest in zip(with_features, digests):
+        rec = {k: v for k, v in records[i].items() if k != "features"}
+        rec["features_digest"] = digest
+        records[i] = rec
+    return records
+
+
+def _encode_payloads(records: List[Dict[str, Any]]) -> List[Tuple[bytes, bytes]]:
+    """
+    Per entry: (canonical v2 hash payload, JSON for the storage line).
+    Done OUTSIDE the append lock: it is the expensive part of building a
+    block and does not depend on the chain.
+    """
+    return [(encode_payload_v2(rec), dumps_compact(rec)) for rec in records]
+
+
+def _find_locked(key: str) -> Optional[Dict[str, Any]]:
+    """Block already carrying idempotency `key`, or None. Caller holds `_append_lock`."""
+    index = _index.find_key(key)
+    if index is None:
+        return None
+    block = _store.read_blocks([index])[0]
+    data = block.get("data")
+    if isinstance(data, dict) and data.get("idempotency_key") == key:
+        return block
+    return None  # 64-bit prefix collision: treat as new
+
+
+def _link_and_append(records: List[Dict[str, Any]], payloads: List[Tuple[bytes, bytes]],
+                     timestamp: Optional[float] = None, sync: bool = False) -> List[Dict[str, Any]]:
+    """
+    Chain pre-encoded payloads onto the tip and append them. Caller holds `_append_lock`.
+
+    Only the small v2 block header (index, timestamp, prev_hash) is built
+    here; the SHA-256 runs over header + pre-encoded payload.
     """
-    global _chain
-    if not _chain:
-        _chain.append(_create_genesis_block())
+    last_block = _store.tip()
+    index = last_block["index"]
+    prev_hash = last_block["hash"]
+    if timestamp is None:
+        timestamp = time.time()
+    ts_json = repr(timestamp).encode("ascii")
+    sha256 = hashlib.sha256
+
+    blocks = []
+    lines = []
+    for rec, (hash_payload, data_json) in zip(records, payloads):
+        index += 1
+        block_hash = sha256(
+            block_header_v2(index, timestamp, "intrusion_log", prev_hash) + hash_payload
+        ).hexdigest()
+        blocks.append({
+            "index": index,
+            "timestamp": timestamp,
+            "event_type": "intrusion_log",
+            "data": rec,
+            "prev_hash": prev_hash,
+            "hash": block_hash,
+            "enc": ENCODING_V2,
+        })
+        lines.append(
+            b'{"index":' + str(index).encode("ascii")
+            + b',"timestamp":' + ts_json
+            + b',"event_type":"intrusion_log","data":' + data_json
+            + b',"prev_hash":"' + prev_hash.encode("ascii")
+            + b'","hash":"' + block_hash.encode("ascii")
+            + b'","enc":%d}\n' % ENCODING_V2
+        )
+        prev_hash = block_hash
+
+    _store.append(blocks, lines)
+    if sync:
+        _store.flush()  # fsyncs the feature rows first
+    _merkle.append([b["hash"] for b in blocks])
+    _index.append(blocks)
+    return blocks
 
 
 # -------------------------------------------------------
 # Public API
 # -------------------------------------------------------
 
-def add_log(entry: Dict[str, Any]) -> Dict[str, Any]:
+def configure_storage(directory: Optional[str] = DEFAULT_LEDGER_DIR, backend: str = "segments",
+                      **store_options) -> None:
+    """
+    Select where the ledger lives.
+
+    - `directory` = path  -> durable ledger in that directory, stored by `backend`:
+        "segments" : segmented JSON-lines log (extra keyword options are passed
+                     to SegmentedFileStore, e.g. segment_max_blocks, fsync_batch,
+                     fsync_interval)
+        "sqlite"   : one SQLite database in WAL mode (options passed to
+                     SQLiteStore, e.g. fsync_batch)
+    - `directory` = None / "" / ":memory:" -> in-memory store (lost on restart;
+      accepts segment_max_blocks)
+
+    An existing chain in the chosen location is reopened (only its tip is
+    read); an empty one gets a fresh genesis block.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown ledger backend {backend!r} (expected one of {BACKENDS})")
+    global _store, _merkle, _index, _features
+    with _append_lock:
+        for derived in (_store, _merkle, _index, _features):
+            if derived is not None:
+                derived.close()
+
+        if not directory or directory == ":memory:":
+            store = MemoryStore(**store_options)
+            _merkle = MerkleTree(None)
+            _index = LedgerIndex(None)
+            _features = FeatureStore(None)
+        else:
+            # Feature rows are fsynced before every block fsync (see feature_store.py)
+            _features = FeatureStore(os.path.join(directory, "features"))
+            if backend == "sqlite":
+                store = SQLiteStore(directory, before_sync=_features.flush, **store_options)
+            else:
+                store = SegmentedFileStore(directory, before_sync=_features.flush, **store_options)
+            _merkle = MerkleTree(os.path.join(directory, "merkle"))
+            _index = LedgerIndex(os.path.join(directory, "index"))
+
+        if store.tip() is None:
+            store.append([_create_genesis_block()])
+            store.flush()
+
+        _sync_derived(store)
+        _store = store  # publish last, so lazy init never sees a half-built backend
+
+
+def _sync_derived(store) -> None:
+    """
+    Bring the Merkle tree and the secondary indexes in line with the chain
+    after (re)opening: drop entries for blocks lost to torn-write recovery,
+    add entries for blocks whose update never reached disk.
+    """
+    n_blocks = len(store)
+    for derived in (_merkle, _index):
+        if len(derived) > n_blocks:
+            derived.truncate(n_blocks)
+
+    start = min(len(_merkle), len(_index))
+    pending: List[Dict[str, Any]] = []
+
+    def apply(blocks: List[Dict[str, Any]]) -> None:
+        first = blocks[0]["index"] if blocks else n_blocks
+        if len(_merkle) < first + len(blocks):
+            _merkle.append([b["hash"] for b in blocks[len(_merkle) - first:]])
+        if len(_index) < first + len(blocks):
+            _index.append(blocks[len(_index) - first:])
+
+    for block in store.iter_blocks(start):
+        pending.append(block)
+        if len(pending) >= 10_000:
+            apply(pending)
+            pending = []
+    apply(pending)
+    _merkle.flush()
+    _index.flush()
+
+
+def flush() -> None:
+    """
+    Force any pending (group-committed) blocks to stable storage.
+    """
+    _ensure_chain_initialized()
+    _features.flush()
+    _store.flush()
+    _merkle.flush()
+    with _append_lock:
+        _index.flush()
+
+
+def idempotency_key(entry: Dict[str, Any], model_version: Optional[str] = None) -> str:
+    """
+    Content address of a scored flow: SHA-256 over the flow digest (feature
+    row + flow_index), the decision (label + recommended_action) and the
+    model version that made it. Confidence is deliberately left out, so
+    float noise between identical reruns does not defeat deduplication.
+    Works on entries with a `features` dict or an already stored `features_digest`.
+    """
+    digest = entry.get("features_digest")
+    if digest is None:
+        digest = features_digest(entry.get("features") or {})
+    parts = (
+        digest,
+        str(entry.get("flow_index")),
+        str(entry.get("label")),
+        str(entry.get("recommended_action")),
+        str(model_version or ""),
+    )
+    return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()
+
+
+def find_block(key: str) -> Optional[Dict[str, Any]]:
+    """
+    Block previously appended with idempotency `key`, or None.
+    A lookup in the secondary index plus one block read, not a chain scan.
+    """
+    _ensure_chain_initialized()
+    with _append_lock:
+        return _find_locked(key)
+
+
+def add_log(entry: Dict[str, Any], idempotency_key: Optional[str] = None) -> Dict[str, Any]:
     """
     Append a new *threat log* entry as a block in the chain.
+    A `features` dict is moved to the feature store; the block keeps its digest.
 
     `entry` is a dict describing the security incident, for example:
         {
@@ -74,68 +368,362 @@ def add_log(entry: Dict[str, Any]) -> Dict[str, Any]:
           "summary": "High-risk TCP SYN flood from 10.0.0.5"
         }
 
+    Safe to call from many threads (e.g. concurrent Streamlit sessions):
+    the entry is encoded before the append lock is taken, and only the
+    linking, hashing and buffered store write happen while holding it.
+
+    With an `idempotency_key` (see `idempotency_key()`), the key is stored in
+    the entry and an entry already logged under the same key is not
+    appended again: the existing block is returned instead.
+
     Returns the full block (including index, hash, prev_hash, timestamp).
     """
     _ensure_chain_initialized()
-    global _chain
 
-    last_block = _chain[-1]
+    if idempotency_key is not None:
+        entry = {**entry, "idempotency_key": idempotency_key}
+    entry = _externalize_features([entry])[0]
+    payloads = _encode_payloads([entry])
+    with _append_lock:
+        if idempotency_key is not None:
+            existing = _find_locked(idempotency_key)
+            if existing is not None:
+                return existing
+        return _link_and_append([entry], payloads)[0]
 
-    core = {
-        "index": last_block["index"] + 1,
-        "timestamp": time.time(),
-        "event_type": "intrusion_log",
-        "data": entry,
-        "prev_hash": last_block["hash"],
-    }
-    core["hash"] = _hash_block_core(core)
 
-    _chain.append(core)
-    return core
+def _entries_to_records(
+    entries: Union[Sequence[Dict[str, Any]], Mapping[str, Sequence[Any]], Any]
+) -> List[Dict[str, Any]]:
+    """
+    Normalise a batch into a list of entry dicts. Accepts:
+    - a list of entry dicts
+    - a columnar mapping {field: [values...]} (all columns the same length)
+    - a pandas DataFrame (one entry per row)
+    """
+    if hasattr(entries, "to_dict") and hasattr(entries, "columns"):
+        return entries.to_dict("records")
+    if isinstance(entries, Mapping):
+        keys = list(entries)
+        return [dict(zip(keys, values)) for values in zip(*(entries[k] for k in keys))]
+    return list(entries)
+
+
+def add_logs(
+    entries: Union[Sequence[Dict[str, Any]], Mapping[str, Sequence[Any]], Any],
+    idempotency_keys: Optional[Sequence[Optional[str]]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Append many *threat log* entries at once (e.g. every intrusion of a bulk analysis).
+
+    `entries` is a columnar batch such as
+        {
+          "flow_index": [3, 7, ...],
+          "label": ["Intrusion", "Intrusion", ...],
+          "recommended_action": ["BLOCK", "ALERT", ...],
+          "confidence": [0.97, 0.64, ...],
+          "features": [{...}, {...}, ...],
+        }
+    (a list of entry dicts or a DataFrame works too).
+
+    Payloads are JSON-encoded up front, outside the lock. Under the lock the
+    blocks are linked and hashed in one tight loop and handed to the storage
+    backend in a single append + flush. Every block shares the batch timestamp.
+    Blocks hash exactly like those from add_log(), so verification is unchanged.
+
+    `idempotency_keys` (one per entry, None = no key) makes the batch
+    idempotent like add_log(): entries whose key is already in the chain, or
+    repeats a key earlier in the same batch, are skipped.
+
+    Returns the list of appended blocks (skipped duplicates are not included).
+    """
+    _ensure_chain_initialized()
+
+    records = _entries_to_records(entries)
+    if not records:
+        return []
+    if idempotency_keys is not None:
+        keys = list(idempotency_keys)
+        if len(keys) != len(records):
+            raise ValueError(f"Expected {len(records)} idempotency keys, got {len(keys)}")
+        records = [
+            rec if key is None else {**rec, "idempotency_key": key}
+            for rec, key in zip(records, keys)
+        ]
+    else:
+        keys = None
+
+    records = _externalize_features(records)
+    payloads = _encode_payloads(records)
+    with _append_lock:
+        if keys is not None:
+            seen = set()
+            keep = []
+            for i, key in enumerate(keys):
+                if key is not None:
+                    if key in seen or _find_locked(key) is not None:
+                        continue
+                    seen.add(key)
+                keep.append(i)
+            if len(keep) < len(records):
+                records = [records[i] for i in keep]
+                payloads = [payloads[i] for i in keep]
+            if not records:
+                return []
+        return _link_and_append(records, payloads, sync=True)
+
+
+def _verify_from(start_block: Optional[Dict[str, Any]], start: int) -> Optional[Dict[str, Any]]:
+    """
+    Check every block with index >= `start`, linking the first one to
+    `start_block` (None = no predecessor check, i.e. the genesis block).
+
+    Returns the last verified block, or None if tampering was detected.
+    """
+    prev = start_block
+    for current in _store.iter_blocks(start):
+        if prev is not None:
+            if not _block_hash_ok(current):
+                return None
+
+            if current["prev_hash"] != prev["hash"] or current["index"] != prev["index"] + 1:
+                return None
+
+        prev = current
+
+    return prev
+
+
+def _save_checkpoint(block: Dict[str, Any]) -> None:
+    # Make sure everything up to the checkpoint is on disk before trusting it
+    _store.flush()
+    with _append_lock:
+        # Sessions verify concurrently: a slower verifier must not move it back
+        current = _store.get_meta(CHECKPOINT_KEY)
+        if current is None or current["index"] < block["index"]:
+            _store.put_meta(CHECKPOINT_KEY, {"index": block["index"], "hash": block["hash"]})
 
 
-def verify_chain() -> bool:
+def get_checkpoint() -> Optional[Dict[str, Any]]:
+    """
+    Last trusted verification checkpoint as {"index": ..., "hash": ...}
+    (None until the chain has been verified once).
+    """
+    _ensure_chain_initialized()
+    return _store.get_meta(CHECKPOINT_KEY)
+
+
+def verify_chain(full: bool = False) -> bool:
     """
     Verify that:
     - each block's stored `hash` matches the recomputed hash of its core data
     - each block's `prev_hash` matches the previous block's `hash`
 
+    Routine verification is incremental: only blocks appended since the last
+    trusted checkpoint (index + hash) are checked, after confirming that the
+    checkpoint block itself is still in place and still hashes to it. Pass `full=True` (or call
+    `audit_chain()`) to re-verify everything from genesis.
+
+    On success the checkpoint advances to the current tip.
     Returns True if the chain is consistent; False if tampering is detected.
     """
     _ensure_chain_initialized()
-    global _chain
-
-    # Chain with only genesis is always valid
-    if len(_chain) <= 1:
-        return True
-
-    for i in range(1, len(_chain)):
-        current = _chain[i]
-        prev = _chain[i - 1]
-
-        # Recompute hash over core fields
-        core = {
-            "index": current["index"],
-            "timestamp": current["timestamp"],
-            "event_type": current["event_type"],
-            "data": current["data"],
-            "prev_hash": current["prev_hash"],
-        }
-        recalculated = _hash_block_core(core)
 
-        if current["hash"] != recalculated:
-            return False
+    checkpoint = None if full else _store.get_meta(CHECKPOINT_KEY)
 
-        if current["prev_hash"] != prev["hash"]:
+    anchor = None
+    start = 0
+    if checkpoint is not None:
+        anchor = next(_store.iter_blocks(checkpoint["index"]), None)
+        if anchor is None or anchor["index"] != checkpoint["index"] or anchor["hash"] != checkpoint["hash"]:
             return False
+        # Its stored hash matching is not enough: the block's data must still produce it
+        if not _block_hash_ok(anchor):
+            return False
+        start = checkpoint["index"] + 1
+
+    last = _verify_from(anchor, start)
+    if last is None:
+        return False
 
+    if checkpoint is None or last["index"] != checkpoint["index"]:
+        _save_checkpoint(last)
     return True
 
 
+def audit_report(workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Full audit of every block from genesis, ignoring the checkpoint, with
+    block re-hashing spread over `workers` processes (default: all cores;
+    small chains are audited in-process). See ledger_audit.py.
+
+    Covers the chain as it was when the audit started; concurrent appends
+    are not blocked while workers run. Sealed segments are also checked
+    against their seal records, and every feature-store row is re-hashed
+    against its digest. A row swapped together with its digest is not caught
+    here (the block citing the old digest then finds no row). Returns
+    {"ok", "blocks", "first_bad_index", "workers", "elapsed_s", "blocks_per_s",
+     "sealed_segments", "seals_ok", "feature_rows", "features_ok", "first_bad_feature_row"};
+    on success the checkpoint advances to the audited tip.
+    """
+    _ensure_chain_initialized()
+
+    with _append_lock:
+        tip = _store.tip()
+        if isinstance(_store, SegmentedFileStore):
+            tasks = plan_file_tasks(_store.segment_files())
+        elif isinstance(_store, SQLiteStore):
+            tasks = _store.audit_tasks(tip["index"] + 1)
+        else:
+            tasks = _store.segment_payloads()
+
+    report = run_audit(tasks, tip["index"] + 1, workers or default_workers())
+    seals = _store.verify_seals()
+    report["sealed_segments"] = seals["sealed_segments"]
+    report["seals_ok"] = seals["ok"]
+    features = _features.verify()
+    report["feature_rows"] = features["rows"]
+    report["features_ok"] = features["ok"]
+    report["first_bad_feature_row"] = features["first_bad_row"]
+    report["ok"] = report["ok"] and seals["ok"] and features["ok"]
+    if report["ok"]:
+        _save_checkpoint(tip)
+    return report
+
+
+def audit_chain(workers: Optional[int] = None) -> bool:
+    """
+    Full audit: re-verify every block from genesis, ignoring the checkpoint.
+    """
+    return audit_report(workers)["ok"]
+
+
 def get_chain_as_list() -> List[Dict[str, Any]]:
     """
-    Return the whole chain as a list of blocks.
-    Useful for displaying in Streamlit or exporting as JSON.
+    Return the whole chain as a list of blocks. This materializes every
+    block; large ledgers should use `iter_blocks()` or `query_blocks()`.
+    """
+    _ensure_chain_initialized()
+    return list(_store.iter_blocks(0))  # fresh list so callers don't modify the store
+
+
+def iter_blocks(start: int = 0) -> Iterator[Dict[str, Any]]:
+    """
+    Stream blocks with index >= `start`, oldest first, one segment at a time.
+    """
+    _ensure_chain_initialized()
+    return _store.iter_blocks(start)
+
+
+def query_blocks(
+    page: int = 0,
+    page_size: int = 50,
+    newest_first: bool = True,
+    start_time: Optional[float] = None,
+    end_time: Optional[float] = None,
+    labels: Optional[Sequence[str]] = None,
+    actions: Optional[Sequence[str]] = None,
+    event_types: Optional[Sequence[str]] = None,
+    min_confidence: Optional[float] = None,
+    max_confidence: Optional[float] = None,
+    flow_index: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Paginated ledger query over the secondary indexes.
+
+    Filters are combined with AND (None = no filter): inclusive time range
+    (epoch seconds), label / recommended_action / event_type value lists,
+    inclusive confidence band and an exact flow_index. Only the blocks on
+    the requested page are read from storage.
+
+    Returns {"total", "page", "page_size", "pages", "blocks"}.
+    """
+    _ensure_chain_initialized()
+    page_size = max(1, int(page_size))
+    with _append_lock:
+        matches = _index.query(
+            start_time=start_time, end_time=end_time,
+            labels=labels, actions=actions, event_types=event_types,
+            min_confidence=min_confidence, max_confidence=max_confidence,
+            flow_index=flow_index,
+        )
+
+    total = len(matches)
+    pages = max(1, -(-total // page_size))
+    page = min(max(0, int(page)), pages - 1)
+    if newest_first:
+        hi = total - page * page_size
+        selected = matches[max(0, hi - page_size):hi][::-1]
+    else:
+        selected = matches[page * page_size:(page + 1) * page_size]
+
+    return {
+        "total": total,
+        "page": page,
+        "page_size": page_size,
+        "pages": pages,
+        "blocks": _store.read_blocks([int(i) for i in selected]),
+    }
+
+
+def ledger_facets() -> Dict[str, Any]:
+    """
+    Values seen so far in the indexed fields, for building query filters:
+    {"blocks", "labels", "actions", "event_types", "first_timestamp", "last_timestamp",
+    "feature_rows"}.
+    """
+    _ensure_chain_initialized()
+    with _append_lock:
+        first_ts, last_ts = _index.time_bounds()
+        return {
+            "blocks": len(_index),
+            "labels": _index.vocabulary("label"),
+            "actions": _index.vocabulary("action"),
+            "event_types": _index.vocabulary("event_type"),
+            "first_timestamp": first_ts,
+            "last_timestamp": last_ts,
+            "feature_rows": len(_features),
+        }
+
+
+def get_block_features(block: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Full feature row of a block: embedded `features` (blocks written before
+    the feature store) or the row stored under its `features_digest`.
+    None if the block has neither; ValueError if the stored row was tampered with.
+    """
+    _ensure_chain_initialized()
+    data = block.get("data")
+    if not isinstance(data, dict):
+        return None
+    if isinstance(data.get("features"), dict):
+        return data["features"]
+    digest = data.get("features_digest")
+    return _features.get(digest) if isinstance(digest, str) else None
+
+
+def get_merkle_root() -> Dict[str, Any]:
+    """
+    Compact commitment to the whole ledger, suitable for periodic publishing:
+    {"tree_size": number of blocks covered, "root": hex Merkle root}.
+    """
+    _ensure_chain_initialized()
+    with _append_lock:
+        size = len(_merkle)
+        return {"tree_size": size, "root": _merkle.root(size).hex()}
+
+
+def get_inclusion_proof(index: int) -> Dict[str, Any]:
+    """
+    O(log n) proof that block `index` is part of the ledger:
+    {"index", "tree_size", "block_hash", "path" (hex, leaf-to-root), "root"}.
+
+    Check it with `merkle.verify_inclusion(index, tree_size, block_hash, path, root)`
+    against a published root – no need to fetch or rehash the rest of the chain.
     """
     _ensure_chain_initialized()
-    return list(_chain)  # return a shallow copy so callers don't modify in place
+    block = _store.read_blocks([index])[0]
+    if block["index"] != index:
+        raise IndexError(f"No block with index {index} in the ledger")
+    with _append_lock:
+        return proof_to_dict(_merkle, index, block["hash"])
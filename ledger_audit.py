@@ -0,0 +1,236 @@
+# ledger_audit.py
+"""
+SentinelSecure – Parallel full-chain audit for the threat ledger
+
+A full audit has two very different parts:
+
+- re-hashing every block: CPU bound, independent per block -> spread over a
+  process pool, each worker parsing and hashing its own slice of the chain
+  (a byte range of a segment file, an index range of a SQLite ledger, or
+  one in-memory segment's JSON lines)
+- checking the prev_hash links and the index sequence: cheap once every hash
+  is known -> one vectorized NumPy pass over (n, 32) digest arrays in the parent
+
+Workers only send back compact arrays (indices, 32-byte hash / prev_hash
+digests, indices whose recomputed hash did not match), never parsed blocks.
+The report names the FIRST tampered block index, not just pass/fail.
+"""
+
+import json
+import os
+import sqlite3
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from block_codec import block_encoding, hash_core
+
+DIGEST_SIZE = 32
+_ZERO_DIGEST = bytes(DIGEST_SIZE)
+
+# Target slice size per worker task (segment files are split on line boundaries)
+CHUNK_BYTES = 8 * 1024 * 1024
+
+# Below this many blocks a process pool costs more than it saves
+PARALLEL_MIN_BLOCKS = 50_000
+
+
+# -------------------------------------------------------
+# Worker side (runs in child processes)
+# -------------------------------------------------------
+
+def _digest(hex_hash: Any) -> Optional[bytes]:
+    try:
+        raw = bytes.fromhex(hex_hash)
+    except (TypeError, ValueError):
+        return None
+    return raw if len(raw) == DIGEST_SIZE else None
+
+
+def _audit_blocks(blocks: Iterable[Dict[str, Any]]) -> Tuple[bytes, bytes, bytes, List[int]]:
+    """
+    Recompute the hash of every block in `blocks`.
+
+    Returns (int64 indices, stored hash digests, prev_hash digests, bad indices)
+    where a block is "bad" if its hash does not match its core or a digest
+    field is malformed. The genesis block (index 0) is not re-hashed, matching
+    the sequential verifier.
+    """
+    indices: List[int] = []
+    hashes: List[bytes] = []
+    prevs: List[bytes] = []
+    bad: List[int] = []
+    for block in blocks:
+        index = block.get("index") if isinstance(block, dict) else None
+        if not isinstance(index, int):
+            break  # unreadable block: the parent sees a gap in the index sequence here
+        indices.append(index)
+        digest = _digest(block.get("hash"))
+        hashes.append(digest or _ZERO_DIGEST)
+        if index == 0:
+            prevs.append(_ZERO_DIGEST)
+            if digest is None:
+                bad.append(index)
+            continue
+
+        prev = _digest(block.get("prev_hash"))
+        prevs.append(prev or _ZERO_DIGEST)
+        try:
+            core = {
+                "index": index,
+                "timestamp": block["timestamp"],
+                "event_type": block["event_type"],
+                "data": block["data"],
+                "prev_hash": block["prev_hash"],
+            }
+            ok = digest is not None and prev is not None and \
+                block["hash"] == hash_core(core, block_encoding(block))
+        except (KeyError, TypeError, ValueError):
+            ok = False
+        if not ok:
+            bad.append(index)
+    return np.asarray(indices, dtype=np.int64).tobytes(), b"".join(hashes), b"".join(prevs), bad
+
+
+def _iter_line_range(path: str, start: int, end: int) -> Iterable[Dict[str, Any]]:
+    """
+    Blocks whose line STARTS in [start, end) of a JSON-lines segment file.
+    Stops at the first unparsable line (reported by the parent as a sequence gap).
+    """
+    with open(path, "rb") as fh:
+        if start > 0:
+            fh.seek(start - 1)
+            if fh.read(1) != b"\n":
+                fh.readline()  # finish the line that belongs to the previous slice
+        pos = fh.tell()
+        while pos < end:
+            line = fh.readline()
+            if not line.endswith(b"\n"):
+                return
+            pos += len(line)
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
+
+
+def _iter_sqlite_range(path: str, start: int, end: int) -> Iterable[Dict[str, Any]]:
+    """Blocks with start <= index < end of a SQLite ledger (read-only connection)."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        for (line,) in conn.execute(
+            "SELECT line FROM blocks WHERE idx >= ? AND idx < ? ORDER BY idx", (start, end)
+        ):
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
+    finally:
+        conn.close()
+
+
+def _iter_lines(data: bytes) -> Iterable[Dict[str, Any]]:
+    for line in data.splitlines():
+        try:
+            yield json.loads(line)
+        except ValueError:
+            return
+
+
+def _audit_task(task: Tuple[Any, ...]):
+    """
+    One unit of audit work:
+    - ("file", path, start, end): line-aligned byte range of a segment file
+    - ("sqlite", path, start, end): block index range of a SQLite ledger
+    - ("zlib", data) / ("lines", data): an in-memory segment's (compressed) JSON lines
+    """
+    kind = task[0]
+    if kind == "file":
+        return _audit_blocks(_iter_line_range(*task[1:]))
+    if kind == "sqlite":
+        return _audit_blocks(_iter_sqlite_range(*task[1:]))
+    data = zlib.decompress(task[1]) if kind == "zlib" else task[1]
+    return _audit_blocks(_iter_lines(data))
+
+
+# -------------------------------------------------------
+# Parent side
+# -------------------------------------------------------
+
+def plan_file_tasks(segments: Sequence[Tuple[str, int]], chunk_bytes: int = CHUNK_BYTES
+                    ) -> List[Tuple[str, str, int, int]]:
+    """Split (segment path, size in bytes) snapshots into line-aligned byte-range tasks."""
+    tasks = []
+    for path, size in segments:
+        for start in range(0, size, chunk_bytes):
+            tasks.append(("file", path, start, min(start + chunk_bytes, size)))
+    return tasks
+
+
+def _first_bad_index(parts: List[Tuple[bytes, bytes, bytes, List[int]]], n_expected: int) -> Optional[int]:
+    """Vectorized linkage/sequence check over all worker results."""
+    indices = np.frombuffer(b"".join(p[0] for p in parts), dtype=np.int64)
+    hashes = np.frombuffer(b"".join(p[1] for p in parts), dtype=np.uint8).reshape(-1, DIGEST_SIZE)
+    prevs = np.frombuffer(b"".join(p[2] for p in parts), dtype=np.uint8).reshape(-1, DIGEST_SIZE)
+
+    candidates = [min(p[3]) for p in parts if p[3]]
+
+    # Index sequence must be exactly 0..n-1 (no gaps, forks or duplicates)
+    n = min(len(indices), n_expected)
+    seq_bad = np.flatnonzero(indices[:n] != np.arange(n, dtype=np.int64))
+    if seq_bad.size:
+        candidates.append(int(seq_bad[0]))
+    elif len(indices) != n_expected:
+        candidates.append(n)
+
+    # Block i must point at block i-1's hash
+    if len(indices) > 1:
+        link_bad = np.flatnonzero(~np.all(prevs[1:] == hashes[:-1], axis=1))
+        if link_bad.size:
+            candidates.append(int(indices[link_bad[0] + 1]))
+
+    return min(candidates) if candidates else None
+
+
+def run_audit(tasks: Sequence[Tuple[Any, ...]], n_expected: int, workers: int) -> Dict[str, Any]:
+    """
+    Audit a chain given its worker tasks, in chain order (see `_audit_task`).
+
+    `workers <= 1` (or a small chain) runs in-process with the same code path,
+    as does any environment where worker processes cannot start. Workers are
+    spawned, so scripts calling this need the usual `if __name__ == "__main__":` guard.
+    Returns {"ok", "blocks", "first_bad_index", "workers", "elapsed_s", "blocks_per_s"}.
+    """
+    t0 = time.perf_counter()
+    parts = None
+    if workers > 1 and n_expected >= PARALLEL_MIN_BLOCKS and len(tasks) > 1:
+        workers = min(workers, len(tasks))
+        try:
+            # spawn: the parent has live writer/fsync threads that must not be forked
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn")) as pool:
+                parts = list(pool.map(_audit_task, tasks))
+        except (BrokenProcessPool, OSError):
+            parts = None
+    if parts is None:
+        workers = 1
+        parts = [_audit_task(t) for t in tasks]
+
+    first_bad = _first_bad_index(parts, n_expected)
+    elapsed = time.perf_counter() - t0
+    return {
+        "ok": first_bad is None,
+        "blocks": n_expected,
+        "first_bad_index": first_bad,
+        "workers": workers,
+        "elapsed_s": round(elapsed, 3),
+        "blocks_per_s": round(n_expected / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def default_workers() -> int:
+    return os.cpu_count() or 1
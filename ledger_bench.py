@@ -0,0 +1,135 @@
+# ledger_bench.py
+"""
+SentinelSecure – Micro-benchmarks for the threat ledger
+
+Measures, on a realistic intrusion block (full 40-feature flow + decision fields):
+
+- per-block hashing cost: legacy sorted-key JSON vs the v2 canonical encoding,
+  and for a block that references its feature row by digest (feature_store.py)
+- verification throughput over a chain of N blocks
+- append throughput for add_log / add_logs
+- full audit throughput, sequential vs the parallel process-pool audit
+
+Usage:
+    python ledger_bench.py              # default 20k blocks
+    python ledger_bench.py --blocks 100000
+    python ledger_bench.py --blocks 200000 --workers 8
+    python ledger_bench.py --backend sqlite
+"""
+
+import argparse
+import random
+import tempfile
+import time
+import timeit
+
+import block_codec
+import ledger
+import ledger_audit
+
+
+def _sample_entry(i: int) -> dict:
+    rnd = random.Random(i)
+    features = {name: float(rnd.randint(0, 5000)) for name in block_codec.FEATURE_SCHEMA_V2}
+    features["num_outbound_cmds"] = 0
+    return {
+        "flow_index": i,
+        "label": "Intrusion",
+        "recommended_action": "BLOCK",
+        "confidence": round(rnd.random(), 3),
+        "features": features,
+    }
+
+
+def _sample_core(i: int) -> dict:
+    return {
+        "index": i,
+        "timestamp": time.time(),
+        "event_type": "intrusion_log",
+        "data": _sample_entry(i),
+        "prev_hash": "ab" * 32,
+    }
+
+
+def bench_hashing(repeat: int = 20000) -> dict:
+    core = _sample_core(1)
+    legacy = min(timeit.repeat(
+        lambda: block_codec.hash_core(core, block_codec.ENCODING_LEGACY), number=repeat, repeat=5
+    ))
+    v2 = min(timeit.repeat(
+        lambda: block_codec.hash_core(core, block_codec.ENCODING_V2), number=repeat, repeat=5
+    ))
+    # What ledger blocks actually carry now: the feature row's digest, not the row
+    ref_core = dict(core, data={k: v for k, v in core["data"].items() if k != "features"})
+    ref_core["data"]["features_digest"] = block_codec.features_digest(core["data"]["features"])
+    ref = min(timeit.repeat(
+        lambda: block_codec.hash_core(ref_core, block_codec.ENCODING_V2), number=repeat, repeat=5
+    ))
+    return {
+        "legacy_us_per_block": legacy / repeat * 1e6,
+        "v2_us_per_block": v2 / repeat * 1e6,
+        "speedup": legacy / v2,
+        "v2_digest_ref_us_per_block": ref / repeat * 1e6,
+        "embedded_bytes_per_block": len(block_codec.dumps_compact(core)),
+        "digest_ref_bytes_per_block": len(block_codec.dumps_compact(ref_core)),
+    }
+
+
+def bench_ledger(n_blocks: int, workers: int = None, backend: str = "segments") -> dict:
+    entries = [_sample_entry(i) for i in range(n_blocks)]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="sentinel-ledger-bench-") as tmp:
+        ledger.configure_storage(tmp, backend=backend)
+
+        t0 = time.perf_counter()
+        for entry in entries[: n_blocks // 2]:
+            ledger.add_log(entry)
+        ledger.flush()
+        results["add_log_blocks_per_s"] = (n_blocks // 2) / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        ledger.add_logs(entries[n_blocks // 2:])
+        results["add_logs_blocks_per_s"] = (n_blocks - n_blocks // 2) / (time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        ok = ledger.verify_chain(full=True)
+        results["sequential_audit_blocks_per_s"] = n_blocks / (time.perf_counter() - t0)
+        results["sequential_audit_ok"] = ok
+
+        workers = workers or ledger_audit.default_workers()
+        report = ledger.audit_report(workers=1)
+        results["vectorized_audit_blocks_per_s"] = report["blocks_per_s"]
+        report = ledger.audit_report(workers=workers)
+        results["parallel_audit_blocks_per_s"] = report["blocks_per_s"]
+        results["parallel_audit_workers"] = report["workers"]
+        results["parallel_audit_ok"] = report["ok"]
+
+        ledger.add_logs(entries[:100])
+        t0 = time.perf_counter()
+        ledger.verify_chain()
+        results["incremental_verify_100_new_ms"] = (time.perf_counter() - t0) * 1000
+
+        ledger.configure_storage(None)
+    return results
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Threat ledger micro-benchmarks")
+    parser.add_argument("--blocks", type=int, default=20000, help="blocks in the benchmark chain")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes for the parallel audit (default: all cores)")
+    parser.add_argument("--backend", choices=ledger.BACKENDS, default="segments",
+                        help="storage engine for the benchmark ledger")
+    args = parser.parse_args(argv)
+
+    print("== per-block hashing (40-feature intrusion block) ==")
+    for key, value in bench_hashing().items():
+        print(f"{key:>32}: {value:,.2f}")
+
+    print(f"== ledger ({args.blocks:,} blocks, on-disk {args.backend} store) ==")
+    for key, value in bench_ledger(args.blocks, args.workers, args.backend).items():
+        print(f"{key:>32}: {value:,.2f}" if isinstance(value, float) else f"{key:>32}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+# ledger_index.py
+"""
+SentinelSecure – Columnar secondary indexes over the threat ledger
+
+One compact row per block, kept in step with the chain by ledger.py:
+
+- timestamp      float64   (range queries; binary search while timestamps are ordered)
+- label          int16     code into a small vocabulary (-1 = missing)
+- action         int16     code for recommended_action (-1 = missing)
+- event_type     int16     code for the block's event_type
+- confidence     float32   (NaN = missing)
+- flow_index     int64     (-1 = missing)
+- idem           uint64    first 64 bits of the block's idempotency key (0 = none)
+
+Queries are vectorized NumPy masks over these columns and return matching
+block indices, so a filtered page of a million-block ledger only touches
+~30 bytes per block here plus the few blocks actually displayed.
+
+The idem column backs `find_key()`: a sorted copy of the non-zero keys is
+binary searched, and keys appended since the last rebuild sit in a small
+dict, so a duplicate check costs O(log n) instead of a chain scan.
+
+Like the Merkle tree, the index is derivable from the chain: for durable
+ledgers each column is an append-only file under <ledger>/index/ (never
+fsynced) and ledger.py re-syncs it with the chain on open.
+"""
+
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ("timestamp", "<f8"),
+    ("label", "<i2"),
+    ("action", "<i2"),
+    ("event_type", "<i2"),
+    ("confidence", "<f4"),
+    ("flow_index", "<i8"),
+    ("idem", "<u8"),
+)
+CATEGORICAL = ("label", "action", "event_type")
+VOCAB_FILE = "vocab.json"
+
+# Keys appended since the last sorted rebuild are looked up in a dict;
+# past this many the sorted array is rebuilt
+KEY_TAIL_MAX = 50_000
+
+
+def key_prefix(key: Any) -> int:
+    """First 64 bits of a hex idempotency key (0 = no / malformed key)."""
+    if not isinstance(key, str) or len(key) < 16:
+        return 0
+    try:
+        return int(key[:16], 16) or 1
+    except ValueError:
+        return 0
+
+
+def _row(block: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Raw index values of one block (strings are encoded by the caller)."""
+    data = block.get("data")
+    if not isinstance(data, dict):
+        data = {}
+    conf = data.get("confidence")
+    flow = data.get("flow_index")
+    return (
+        float(block["timestamp"]),
+        data.get("label"),
+        data.get("recommended_action"),
+        block.get("event_type"),
+        float(conf) if isinstance(conf, (int, float)) and not isinstance(conf, bool) else np.nan,
+        int(flow) if isinstance(flow, (int, np.integer)) and not isinstance(flow, bool) else -1,
+        key_prefix(data.get("idempotency_key")),
+    )
+
+
+class LedgerIndex:
+    """
+    Append-only columnar index. `directory=None` keeps everything in memory.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        self._n = 0
+        self._saved = 0
+        self._cols: Dict[str, np.ndarray] = {name: np.zeros(1024, dtype=dt) for name, dt in COLUMNS}
+        self._vocab: Dict[str, List[str]] = {name: [] for name in CATEGORICAL}
+        self._codes: Dict[str, Dict[str, int]] = {name: {} for name in CATEGORICAL}
+        self._vocab_dirty = False
+        self._ts_sorted = True
+        # idem lookup: sorted (prefix, block index) arrays + dict of keys appended since
+        self._keys_sorted: Optional[np.ndarray] = None
+        self._keys_pos: Optional[np.ndarray] = None
+        self._keys_tail: Dict[int, int] = {}
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    # ---------- persistence ----------
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def _load(self) -> None:
+        try:
+            with open(os.path.join(self.directory, VOCAB_FILE), "r", encoding="utf-8") as fh:
+                vocab = json.load(fh)
+        except (OSError, ValueError):
+            vocab = None
+
+        loaded = {}
+        if vocab is not None:
+            for name, dt in COLUMNS:
+                try:
+                    loaded[name] = np.fromfile(self._path(name), dtype=dt)
+                except (OSError, ValueError):
+                    loaded[name] = np.zeros(0, dtype=dt)
+        n = min((len(a) for a in loaded.values()), default=0)
+
+        if n:
+            for name in CATEGORICAL:
+                self._vocab[name] = list(vocab.get(name, []))
+                self._codes[name] = {v: i for i, v in enumerate(self._vocab[name])}
+            self._grow(n)
+            for name, _ in COLUMNS:
+                self._cols[name][:n] = loaded[name][:n]
+            self._n = n
+            ts = self._cols["timestamp"][:n]
+            self._ts_sorted = bool(np.all(ts[1:] >= ts[:-1]))
+
+        # Drop rows past the common length (or everything, without a vocabulary)
+        for name, dt in COLUMNS:
+            with open(self._path(name), "ab") as fh:
+                fh.truncate(n * np.dtype(dt).itemsize)
+        self._saved = n
+
+    def flush(self) -> None:
+        if self.directory is None:
+            return
+        if self._vocab_dirty:
+            path = os.path.join(self.directory, VOCAB_FILE)
+            with open(path + ".tmp", "w", encoding="utf-8") as fh:
+                json.dump(self._vocab, fh)
+            os.replace(path + ".tmp", path)
+            self._vocab_dirty = False
+        if self._saved < self._n:
+            for name, _ in COLUMNS:
+                with open(self._path(name), "ab") as fh:
+                    fh.write(self._cols[name][self._saved:self._n].tobytes())
+            self._saved = self._n
+
+    def close(self) -> None:
+        self.flush()
+
+    # ---------- maintenance ----------
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _grow(self, need: int) -> None:
+        cap = len(self._cols["timestamp"])
+        if need <= cap:
+            return
+        cap = max(need, 2 * cap)
+        for name, dt in COLUMNS:
+            grown = np.zeros(cap, dtype=dt)
+            grown[:self._n] = self._cols[name][:self._n]
+            self._cols[name] = grown
+
+    def _code(self, column: str, value: Any) -> int:
+        if value is None:
+            return -1
+        value = str(value)
+        code = self._codes[column].get(value)
+        if code is None:
+            code = len(self._vocab[column])
+            self._vocab[column].append(value)
+            self._codes[column][value] = code
+            self._vocab_dirty = True
+        return code
+
+    def append(self, blocks: Sequence[Dict[str, Any]]) -> None:
+        if not blocks:
+            return
+        if len(blocks) <= 16:
+            self._append_rows(blocks)
+            return
+        ts, labels, actions, events, conf, flow, idem = zip(*map(_row, blocks))
+        start, end = self._n, self._n + len(blocks)
+        if self._ts_sorted:
+            prev = self._cols["timestamp"][start - 1] if start else -np.inf
+            self._ts_sorted = all(a <= b for a, b in zip((prev,) + ts[:-1], ts))
+        self._grow(end)
+        cols = self._cols
+        cols["timestamp"][start:end] = ts
+        cols["label"][start:end] = [self._code("label", v) for v in labels]
+        cols["action"][start:end] = [self._code("action", v) for v in actions]
+        cols["event_type"][start:end] = [self._code("event_type", v) for v in events]
+        cols["confidence"][start:end] = conf
+        cols["flow_index"][start:end] = flow
+        cols["idem"][start:end] = idem
+        self._n = end
+        self._note_keys(start, idem)
+
+    def _append_rows(self, blocks: Sequence[Dict[str, Any]]) -> None:
+        """Row-at-a-time path for small appends (single add_log calls)."""
+        self._grow(self._n + len(blocks))
+        cols = self._cols
+        for block in blocks:
+            ts, label, action, event, conf, flow, idem = _row(block)
+            i = self._n
+            if self._ts_sorted and i and ts < cols["timestamp"][i - 1]:
+                self._ts_sorted = False
+            cols["timestamp"][i] = ts
+            cols["label"][i] = self._code("label", label)
+            cols["action"][i] = self._code("action", action)
+            cols["event_type"][i] = self._code("event_type", event)
+            cols["confidence"][i] = conf
+            cols["flow_index"][i] = flow
+            cols["idem"][i] = idem
+            self._n = i + 1
+            self._note_keys(i, (idem,))
+
+    def truncate(self, size: int) -> None:
+        """Forget rows >= size (blocks lost to torn-write recovery)."""
+        if size >= self._n:
+            return
+        self._n = size
+        self._keys_sorted = None
+        self._keys_tail = {}
+        if self.directory is not None and self._saved > size:
+            for name, dt in COLUMNS:
+                with open(self._path(name), "ab") as fh:
+                    fh.truncate(size * np.dtype(dt).itemsize)
+            self._saved = size
+
+    # ---------- idempotency keys ----------
+
+    def _note_keys(self, start: int, prefixes: Sequence[int]) -> None:
+        if self._keys_sorted is None:
+            return  # lookup structure not built yet; built from the column on first use
+        tail = self._keys_tail
+        for offset, prefix in enumerate(prefixes):
+            if prefix:
+                tail.setdefault(prefix, start + offset)
+        if len(tail) > KEY_TAIL_MAX:
+            self._keys_sorted = None
+
+    def _build_keys(self) -> None:
+        idem = self._cols["idem"][:self._n]
+        pos = np.flatnonzero(idem)
+        # stable sort: among equal prefixes the earliest block comes first
+        order = np.argsort(idem[pos], kind="stable")
+        self._keys_sorted = idem[pos][order]
+        self._keys_pos = pos[order]
+        self._keys_tail = {}
+
+    def find_key(self, key: str) -> Optional[int]:
+        """
+        Index of the earliest block whose idempotency key starts with the same
+        64 bits as `key`, or None. Callers confirm the full key on the block.
+        """
+        prefix = key_prefix(key)
+        if not prefix:
+            return None
+        if self._keys_sorted is None:
+            self._build_keys()
+        sorted_keys = self._keys_sorted
+        i = int(np.searchsorted(sorted_keys, np.uint64(prefix)))
+        if i < len(sorted_keys) and int(sorted_keys[i]) == prefix:
+            return int(self._keys_pos[i])
+        return self._keys_tail.get(prefix)
+
+    # ---------- queries ----------
+
+    def vocabulary(self, column: str) -> List[str]:
+        return list(self._vocab[column])
+
+    def time_bounds(self) -> Tuple[Optional[float], Optional[float]]:
+        if not self._n:
+            return None, None
+        ts = self._cols["timestamp"][:self._n]
+        return float(ts.min()), float(ts.max())
+
+    def _codes_for(self, column: str, values: Sequence[str]) -> List[int]:
+        return [self._codes[column][v] for v in map(str, values) if v in self._codes[column]]
+
+    def query(
+        self,
+        start_time: Optional[float] = None,
+        end_time: Optional[float] = None,
+        labels: Optional[Sequence[str]] = None,
+        actions: Optional[Sequence[str]] = None,
+        event_types: Optional[Sequence[str]] = None,
+        min_confidence: Optional[float] = None,
+        max_confidence: Optional[float] = None,
+        flow_index: Optional[int] = None,
+    ) -> np.ndarray:
+        """
+        Ascending block indices matching ALL given filters (None = no filter).
+        Time bounds are inclusive; list filters match any of the given values.
+        """
+        lo, hi = 0, self._n
+        ts = self._cols["timestamp"][:self._n]
+        if self._ts_sorted:
+            # Narrow to the time window by binary search before masking
+            if start_time is not None:
+                lo = int(np.searchsorted(ts, start_time, side="left"))
+            if end_time is not None:
+                hi = int(np.searchsorted(ts, end_time, side="right"))
+            if lo >= hi:
+                return np.zeros(0, dtype=np.int64)
+
+        mask = np.ones(hi - lo, dtype=bool)
+        if not self._ts_sorted:
+            if start_time is not None:
+                mask &= ts[lo:hi] >= start_time
+            if end_time is not None:
+                mask &= ts[lo:hi] <= end_time
+        for column, wanted in (("label", labels), ("action", actions), ("event_type", event_types)):
+            if wanted is not None:
+                mask &= np.isin(self._cols[column][lo:hi], self._codes_for(column, wanted))
+        conf = self._cols["confidence"][lo:hi]
+        if min_confidence is not None:
+            mask &= conf >= min_confidence
+        if max_confidence is not None:
+            mask &= conf <= max_confidence
+        if flow_index is not None:
+            mask &= self._cols["flow_index"][lo:hi] == flow_index
+        return np.flatnonzero(mask).astype(np.int64) + lo
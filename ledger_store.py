@@ -0,0 +1,942 @@
+# ledger_store.py
+"""
+SentinelSecure – Storage backends for the threat ledger
+
+ledger.py owns the chain logic (hashing, linking, verification); this module
+only decides WHERE blocks live:
+
+- MemoryStore          : in-process segments (the original demo behaviour, lost on restart)
+- SegmentedFileStore   : durable, append-only JSON-lines segments on disk
+- SQLiteStore          : durable, one SQLite database in WAL mode (see its docstring)
+
+The first two rotate the chain into fixed-size segments and keep a bounded working set:
+only the ACTIVE segment and a small cache of the newest blocks stay in memory.
+When the active segment reaches `segment_max_blocks` it is SEALED:
+
+- a seal record is written for it:
+    {"first_index", "last_index", "bytes", "sha256" (of the segment bytes),
+     "last_hash" (hash of its last block), "prev_seal", "seal"}
+  where `seal` is SHA-256 over the other fields, so segment heads form their
+  own hash chain and `verify_seals()` checks a sealed segment with one
+  sequential hash of its bytes, without parsing a single block
+- the byte offset of every block in it is stored next to it (int64 array)
+- it is never written again; reads go through memory-mapped files (disk) or
+  its zlib-compressed bytes (memory), opened on demand, a few at a time
+
+Segmented file layout (one directory per ledger):
+
+    ledger_data/
+      segment-000000000000.jsonl   <- blocks 0 .. N-1, one JSON block per line
+      segment-000000000000.idx     <- int64 byte offset of each block (sealed segments)
+      segment-000000000000.seal    <- seal record (sealed segments)
+      segment-000000100000.jsonl   <- file name = index of its first block (active)
+      ...
+
+- Appends go to the active segment through a buffered file handle
+- fsync is batched (group commit): many appends share one fsync, triggered by
+  a block count, a time interval (background flusher) or an explicit flush()
+- On startup only the active segment is read to rebuild the tip; a torn final
+  write (partial line / unparsable JSON) is truncated away. Complete lines that
+  parse are always kept, even if their hash is wrong: that is tampering for
+  the chain audit to report, not a torn write. An unparsable line followed by
+  readable blocks is refused with an error rather than cut off with them.
+  Full segments left unsealed (crash mid-rotation, older ledgers) are sealed then.
+"""
+
+import atexit
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from block_codec import json_default
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+SEAL_SUFFIX = ".seal"
+INDEX_SUFFIX = ".idx"
+META_FILE = "meta.json"
+LEGACY_OFFSETS_FILE = "offsets.bin"
+
+# Newest blocks kept as parsed dicts (tip, checkpoint anchor, first page of the browser)
+TIP_CACHE_BLOCKS = 256
+
+# Sealed segments kept open (memory-mapped / decompressed) at once
+OPEN_SEGMENTS = 8
+
+# Bytes read at a time when hashing segments or scanning them for newlines
+_SCAN_BYTES = 16 * 1024 * 1024
+
+
+def encode_block_line(block: Dict[str, Any]) -> bytes:
+    """One block -> one newline-terminated JSON line."""
+    return (json.dumps(block, separators=(",", ":"), default=json_default) + "\n").encode("utf-8")
+
+
+def make_seal(first_index: int, last_index: int, n_bytes: int, sha256: str,
+              last_hash: str, prev_seal: Optional[str]) -> Dict[str, Any]:
+    """Seal record of a full segment; `seal` commits to every other field."""
+    record = {
+        "first_index": first_index,
+        "last_index": last_index,
+        "bytes": n_bytes,
+        "sha256": sha256,
+        "last_hash": last_hash,
+        "prev_seal": prev_seal,
+    }
+    record["seal"] = hashlib.sha256(
+        json.dumps(record, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+    return record
+
+
+def check_seal_chain(sealed: Sequence[Tuple[int, Dict[str, Any], str]], next_start: int) -> Optional[int]:
+    """
+    Check (segment start, seal record, recomputed sha256 of its bytes) triples
+    in order: each record is self-consistent, covers exactly its segment,
+    links to the previous seal and matches the bytes on record.
+    Returns the start of the first bad segment, or None.
+    """
+    prev_seal = None
+    for pos, (start, seal, sha) in enumerate(sealed):
+        seg_end = sealed[pos + 1][0] if pos + 1 < len(sealed) else next_start
+        expected = make_seal(seal.get("first_index"), seal.get("last_index"), seal.get("bytes"),
+                             seal.get("sha256"), seal.get("last_hash"), seal.get("prev_seal"))
+        if (
+            expected["seal"] != seal.get("seal")
+            or seal.get("first_index") != start
+            or seal.get("last_index") != seg_end - 1
+            or seal.get("prev_seal") != prev_seal
+            or seal.get("sha256") != sha
+        ):
+            return start
+        prev_seal = seal["seal"]
+    return None
+
+
+def _line_offsets(lines: Sequence[bytes], base: int = 0) -> List[int]:
+    """Start offset of each line when `lines` are concatenated after `base` bytes."""
+    offsets = []
+    for line in lines:
+        offsets.append(base)
+        base += len(line)
+    return offsets
+
+
+def _has_block_line(data: bytes, pos: int) -> bool:
+    """True if a complete, parsable JSON line starts at or after byte `pos` of `data`."""
+    while True:
+        nl = data.find(b"\n", pos)
+        if nl == -1:
+            return False
+        try:
+            json.loads(data[pos:nl])
+            return True
+        except ValueError:
+            pos = nl + 1
+
+
+def _sha256_file(path: str) -> str:
+    sha = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(_SCAN_BYTES), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+# -------------------------------------------------------
+# In-memory store
+# -------------------------------------------------------
+
+class MemoryStore:
+    """
+    Keeps the chain in process memory (lost on restart).
+
+    The active segment is held as encoded JSON lines; sealed segments as
+    zlib-compressed bytes + block offsets, decompressed on demand (a few at
+    a time). Parsed block dicts are only kept for the newest blocks.
+    """
+
+    def __init__(self, segment_max_blocks: int = 10_000):
+        self.segment_max_blocks = segment_max_blocks
+        self._lock = threading.Lock()
+        self._sealed: List[Dict[str, Any]] = []   # {"start", "data" (zlib), "offsets", "seal"}
+        self._starts: List[int] = []               # start of each sealed segment
+        self._active_start = 0
+        self._active_lines: List[bytes] = []
+        self._recent: deque = deque(maxlen=TIP_CACHE_BLOCKS)
+        self._open: "OrderedDict[int, bytes]" = OrderedDict()
+        self._meta: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return self._active_start + len(self._active_lines)
+
+    def tip(self) -> Optional[Dict[str, Any]]:
+        return self._recent[-1] if self._recent else None
+
+    def _seal_active(self) -> None:
+        data = b"".join(self._active_lines)
+        last = self._recent[-1]
+        seal = make_seal(
+            self._active_start, last["index"], len(data), hashlib.sha256(data).hexdigest(),
+            last["hash"], self._sealed[-1]["seal"]["seal"] if self._sealed else None,
+        )
+        self._sealed.append({
+            "start": self._active_start,
+            "data": zlib.compress(data, 1),
+            "offsets": np.asarray(_line_offsets(self._active_lines), dtype=np.int64),
+            "seal": seal,
+        })
+        self._starts.append(self._active_start)
+        self._active_start = last["index"] + 1
+        self._active_lines = []
+
+    def append(self, blocks: List[Dict[str, Any]], lines: Optional[List[bytes]] = None) -> None:
+        if not blocks:
+            return
+        if lines is None:
+            lines = [encode_block_line(b) for b in blocks]
+        with self._lock:
+            i = 0
+            while i < len(blocks):
+                if len(self._active_lines) >= self.segment_max_blocks:
+                    self._seal_active()
+                n = min(self.segment_max_blocks - len(self._active_lines), len(blocks) - i)
+                self._active_lines.extend(lines[i:i + n])
+                self._recent.extend(blocks[i:i + n][-TIP_CACHE_BLOCKS:])
+                i += n
+
+    def _segment_bytes(self, seg: Dict[str, Any]) -> bytes:
+        """Decompressed bytes of a sealed segment. Caller holds `_lock`."""
+        data = self._open.get(seg["start"])
+        if data is None:
+            data = zlib.decompress(seg["data"])
+            self._open[seg["start"]] = data
+            if len(self._open) > OPEN_SEGMENTS:
+                self._open.popitem(last=False)
+        else:
+            self._open.move_to_end(seg["start"])
+        return data
+
+    def read_blocks(self, indices: Sequence[int]) -> List[Dict[str, Any]]:
+        with self._lock:
+            n = len(self)
+            recent_from = n - len(self._recent)
+            blocks = []
+            for i in indices:
+                if not 0 <= i < n:
+                    raise IndexError(f"No block with index {i} in the ledger")
+                if i >= recent_from:
+                    blocks.append(self._recent[i - recent_from])
+                elif i >= self._active_start:
+                    blocks.append(json.loads(self._active_lines[i - self._active_start]))
+                else:
+                    seg = self._sealed[bisect.bisect_right(self._starts, i) - 1]
+                    data = self._segment_bytes(seg)
+                    off = int(seg["offsets"][i - seg["start"]])
+                    blocks.append(json.loads(data[off:data.index(b"\n", off)]))
+            return blocks
+
+    def iter_blocks(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        start = max(0, start)
+        with self._lock:
+            sealed = self._sealed[max(0, bisect.bisect_right(self._starts, start) - 1):]
+            active = self._active_lines[max(0, start - self._active_start):]
+        for seg in sealed:
+            with self._lock:
+                data = self._segment_bytes(seg)
+            offsets = seg["offsets"]
+            for k in range(max(0, start - seg["start"]), len(offsets)):
+                off = int(offsets[k])
+                yield json.loads(data[off:data.index(b"\n", off)])
+        for line in active:
+            yield json.loads(line)
+
+    def segment_payloads(self) -> List[Tuple[str, bytes]]:
+        """Audit tasks: ("zlib", bytes) per sealed segment, ("lines", bytes) for the active one."""
+        with self._lock:
+            tasks = [("zlib", seg["data"]) for seg in self._sealed]
+            tasks.append(("lines", b"".join(self._active_lines)))
+            return tasks
+
+    def verify_seals(self) -> Dict[str, Any]:
+        """Re-hash every sealed segment and check the seal chain."""
+        with self._lock:
+            sealed = list(self._sealed)
+            next_start = self._active_start
+        checked = [
+            (seg["start"], seg["seal"], hashlib.sha256(zlib.decompress(seg["data"])).hexdigest())
+            for seg in sealed
+        ]
+        bad = check_seal_chain(checked, next_start)
+        return {"sealed_segments": len(sealed), "ok": bad is None, "first_bad_segment": bad}
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        return self._meta.get(key, default)
+
+    def put_meta(self, key: str, value: Any) -> None:
+        self._meta[key] = value
+
+    def flush(self, sync: bool = True) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+# -------------------------------------------------------
+# Segmented on-disk store
+# -------------------------------------------------------
+
+class SegmentedFileStore:
+    """
+    Durable append-only store made of JSON-lines segment files.
+
+    - `segment_max_blocks`: blocks per segment before it is sealed and a new one starts
+    - `fsync_batch`: fsync once this many blocks are pending (group commit)
+    - `fsync_interval`: seconds after which a background thread fsyncs any
+      pending tail, so an idle ledger is never left unsynced for long
+    - `before_sync`: optional callable run before every fsync of the blocks
+      (the ledger fsyncs its feature store there, see feature_store.py)
+
+    Small ledger metadata (e.g. the verification checkpoint) lives next to
+    the segments in meta.json, replaced atomically on every update.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_max_blocks: int = 100_000,
+        fsync_batch: int = 512,
+        fsync_interval: float = 0.05,
+        before_sync: Optional[Callable[[], None]] = None,
+    ):
+        self.directory = directory
+        self.segment_max_blocks = segment_max_blocks
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+        self._before_sync = before_sync
+
+        self._lock = threading.Lock()
+        self._file = None
+        self._starts: List[int] = []   # first block index of every segment, ascending
+        self._active_start = 0         # index of the first block in the active segment
+        self._active_bytes = 0         # bytes in the active segment
+        self._active_sha = hashlib.sha256()
+        self._offsets = np.zeros(1024, dtype=np.int64)  # byte offset of each active-segment block
+        self._n_offsets = 0
+        self._recent: deque = deque(maxlen=TIP_CACHE_BLOCKS)
+        self._mapped: "OrderedDict[int, Tuple[mmap.mmap, np.ndarray]]" = OrderedDict()
+        self._last_seal: Optional[str] = None
+        self._pending = 0              # blocks written but not yet fsynced
+        self._last_sync = time.monotonic()
+        self.truncated_bytes = 0       # bytes dropped by torn-write recovery
+
+        os.makedirs(directory, exist_ok=True)
+        self._meta = self._load_meta()
+        self._recover()
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="ledger-fsync", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    # ---------- segment bookkeeping ----------
+
+    def _segment_path(self, start: int, suffix: str = SEGMENT_SUFFIX) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{start:012d}{suffix}")
+
+    def segment_starts(self) -> List[int]:
+        starts = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    starts.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(starts)
+
+    def segment_files(self) -> List[Tuple[str, int]]:
+        """
+        (path, size in bytes) of every segment, oldest first, after pushing
+        buffered appends to the OS. Callers that need a stable snapshot hold
+        the ledger's append lock while calling this.
+        """
+        self.flush(sync=False)
+        return [(self._segment_path(s), os.path.getsize(self._segment_path(s)))
+                for s in self.segment_starts()]
+
+    def _segment_of(self, index: int) -> int:
+        return self._starts[bisect.bisect_right(self._starts, index) - 1]
+
+    def _recover(self) -> None:
+        """
+        Rebuild the tip, block offsets and running hash from the active
+        (last) segment only, truncating a torn tail; seal full segments
+        that were left unsealed.
+        """
+        legacy = os.path.join(self.directory, LEGACY_OFFSETS_FILE)
+        if os.path.exists(legacy):
+            os.remove(legacy)  # superseded by per-segment .idx files
+
+        self._starts = self.segment_starts()
+        if not self._starts:
+            self._open_segment(0)
+            return
+
+        start = self._starts[-1]
+        path = self._segment_path(start)
+        with open(path, "rb") as fh:
+            data = fh.read()
+
+        good_end = 0
+        offsets = []
+        pos = 0
+        while pos < len(data):
+            nl = data.find(b"\n", pos)
+            if nl == -1:
+                break  # partial last line (no newline) -> torn write
+            try:
+                block = json.loads(data[pos:nl])
+            except ValueError:
+                if _has_block_line(data, nl + 1):
+                    raise ValueError(
+                        f"{path}: unreadable block at byte {pos} followed by further blocks "
+                        "(corruption, not a torn write) – refusing to truncate"
+                    )
+                break
+            self._recent.append(block)
+            offsets.append(pos)
+            pos = nl + 1
+            good_end = pos
+
+        if good_end < len(data):
+            self.truncated_bytes = len(data) - good_end
+            with open(path, "r+b") as fh:
+                fh.truncate(good_end)
+                fh.flush()
+                os.fsync(fh.fileno())
+
+        if not offsets and len(self._starts) > 1:
+            # Active segment was empty/torn entirely: continue right after the previous one
+            os.remove(path)
+            self._starts.pop()
+            self._seal_missing(self._starts)
+            prev = self._starts[-1]
+            mm, prev_offsets = self._mapped_segment(prev)
+            off = int(prev_offsets[-1])
+            self._recent.append(json.loads(mm[off:mm.find(b"\n", off)]))
+            self._open_segment(self._recent[-1]["index"] + 1)
+            return
+
+        self._seal_missing(self._starts[:-1])
+        self._active_start = start
+        self._active_bytes = good_end
+        self._active_sha.update(data[:good_end])
+        self._push_offsets(offsets)
+        self._file = open(path, "ab")
+
+    def _open_segment(self, start: int) -> None:
+        """Start a new, empty active segment."""
+        if self._file is not None:
+            self._sync_locked()
+            self._file.close()
+        self._active_start = start
+        self._active_bytes = 0
+        self._active_sha = hashlib.sha256()
+        self._n_offsets = 0
+        self._file = open(self._segment_path(start), "ab")
+        if not self._starts or self._starts[-1] != start:
+            self._starts.append(start)
+
+    # ---------- sealing ----------
+
+    def _seal_for(self, start: int) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._segment_path(start, SEAL_SUFFIX), "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_atomic(path: str, payload: bytes) -> None:
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(payload)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+
+    def _write_seal(self, start: int, offsets: np.ndarray, n_bytes: int, sha256: str,
+                    last_block: Dict[str, Any]) -> None:
+        """Offsets first, then the seal record: a segment with a seal is complete."""
+        self._write_atomic(self._segment_path(start, INDEX_SUFFIX), offsets.astype("<i8").tobytes())
+        seal = make_seal(start, last_block["index"], n_bytes, sha256, last_block["hash"], self._last_seal)
+        self._write_atomic(self._segment_path(start, SEAL_SUFFIX), json.dumps(seal).encode("utf-8"))
+        self._last_seal = seal["seal"]
+
+    def _seal_missing(self, starts: Sequence[int]) -> None:
+        """Seal full segments that have no seal yet (crash mid-rotation / older ledgers)."""
+        for start in starts:
+            seal = self._seal_for(start)
+            if seal is not None and os.path.exists(self._segment_path(start, INDEX_SUFFIX)):
+                self._last_seal = seal.get("seal")
+                continue
+            path = self._segment_path(start)
+            offsets = self._scan_offsets(path)
+            if not len(offsets):
+                continue
+            with open(path, "rb") as fh:
+                fh.seek(int(offsets[-1]))
+                last = json.loads(fh.readline())
+            self._write_seal(start, offsets, os.path.getsize(path), _sha256_file(path), last)
+
+    def _seal_active_locked(self) -> None:
+        """Seal the full active segment and start the next one. Caller holds `_lock`."""
+        self._sync_locked()
+        last = self._recent[-1]
+        self._write_seal(self._active_start, self._offsets[:self._n_offsets], self._active_bytes,
+                         self._active_sha.hexdigest(), last)
+        self._open_segment(last["index"] + 1)
+
+    @staticmethod
+    def _scan_offsets(path: str) -> np.ndarray:
+        """Offsets of every complete line of a segment, from newline positions (no JSON parsing)."""
+        found = []
+        pos = 0
+        with open(path, "rb") as fh:
+            while True:
+                fh.seek(pos)
+                chunk = fh.read(_SCAN_BYTES)
+                ends = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 0x0A)
+                if not len(ends):
+                    break
+                found.append(np.concatenate(([0], ends[:-1] + 1)) + pos)
+                pos += int(ends[-1]) + 1
+        return np.concatenate(found).astype(np.int64) if found else np.zeros(0, dtype=np.int64)
+
+    def verify_seals(self) -> Dict[str, Any]:
+        """
+        Re-hash every sealed segment file and check the seal chain.
+        Returns {"sealed_segments", "ok", "first_bad_segment"}.
+        """
+        with self._lock:
+            sealed = self._starts[:-1]
+            next_start = self._active_start
+        checked = [
+            (start, self._seal_for(start) or {}, _sha256_file(self._segment_path(start)))
+            for start in sealed
+        ]
+        bad = check_seal_chain(checked, next_start)
+        return {"sealed_segments": len(sealed), "ok": bad is None, "first_bad_segment": bad}
+
+    def _mapped_segment(self, start: int) -> Tuple[mmap.mmap, np.ndarray]:
+        """
+        Memory-mapped bytes + block offsets of a sealed segment (a few kept
+        open). Evicted maps are just dropped; a reader still holding one
+        keeps it alive until it is done.
+        """
+        with self._lock:
+            entry = self._mapped.get(start)
+            if entry is not None:
+                self._mapped.move_to_end(start)
+                return entry
+        with open(self._segment_path(start), "rb") as fh:
+            mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        offsets = np.fromfile(self._segment_path(start, INDEX_SUFFIX), dtype="<i8")
+        with self._lock:
+            self._mapped[start] = (mm, offsets)
+            if len(self._mapped) > OPEN_SEGMENTS:
+                self._mapped.popitem(last=False)
+        return mm, offsets
+
+    # ---------- active segment offsets ----------
+
+    def _push_offsets(self, offsets: Sequence[int]) -> None:
+        need = self._n_offsets + len(offsets)
+        if need > len(self._offsets):
+            grown = np.zeros(max(need, 2 * len(self._offsets)), dtype=np.int64)
+            grown[:self._n_offsets] = self._offsets[:self._n_offsets]
+            self._offsets = grown
+        if len(offsets) == 1:
+            self._offsets[self._n_offsets] = offsets[0]  # single add_log: skip array conversion
+        else:
+            self._offsets[self._n_offsets:need] = offsets
+        self._n_offsets = need
+
+    # ---------- metadata ----------
+
+    def _load_meta(self) -> Dict[str, Any]:
+        path = os.path.join(self.directory, META_FILE)
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+        except (OSError, ValueError):
+            return {}
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        return self._meta.get(key, default)
+
+    def put_meta(self, key: str, value: Any) -> None:
+        """Update one metadata key; the file is rewritten via write-temp + rename."""
+        with self._lock:  # one writer of meta.json.tmp at a time
+            self._meta[key] = value
+            self._write_atomic(
+                os.path.join(self.directory, META_FILE),
+                json.dumps(self._meta, default=json_default).encode("utf-8"),
+            )
+
+    # ---------- group commit ----------
+
+    def _sync_locked(self) -> None:
+        if self._file is None:
+            return
+        self._file.flush()
+        if self._pending:
+            if self._before_sync is not None:
+                self._before_sync()
+            os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def _flush_loop(self) -> None:
+        while not self._stop.wait(self.fsync_interval):
+            with self._lock:
+                if self._pending and time.monotonic() - self._last_sync >= self.fsync_interval:
+                    self._sync_locked()
+
+    def flush(self, sync: bool = True) -> None:
+        """Push buffered blocks to the OS; with `sync`, also fsync them."""
+        with self._lock:
+            if sync:
+                self._sync_locked()
+            elif self._file is not None:
+                self._file.flush()
+
+    def close(self) -> None:
+        self._stop.set()
+        with self._lock:
+            if self._file is not None:
+                self._sync_locked()
+                self._file.close()
+                self._file = None
+            self._mapped.clear()
+
+    # ---------- store API ----------
+
+    def __len__(self) -> int:
+        return self._recent[-1]["index"] + 1 if self._recent else 0
+
+    def tip(self) -> Optional[Dict[str, Any]]:
+        return self._recent[-1] if self._recent else None
+
+    def append(self, blocks: List[Dict[str, Any]], lines: Optional[List[bytes]] = None) -> None:
+        """
+        Append `blocks` (already hashed and linked by ledger.py). `lines` may
+        carry their pre-encoded JSON lines so blocks are not encoded twice.
+        """
+        if not blocks:
+            return
+        if lines is None:
+            lines = [encode_block_line(b) for b in blocks]
+        with self._lock:
+            i = 0
+            while i < len(blocks):
+                if self._n_offsets >= self.segment_max_blocks:
+                    self._seal_active_locked()
+                n = min(self.segment_max_blocks - self._n_offsets, len(blocks) - i)
+                chunk = b"".join(lines[i:i + n])
+                self._push_offsets(_line_offsets(lines[i:i + n], self._active_bytes))
+                self._file.write(chunk)
+                self._active_sha.update(chunk)
+                self._active_bytes += len(chunk)
+                self._recent.extend(blocks[i:i + n][-TIP_CACHE_BLOCKS:])
+                self._pending += n
+                i += n
+
+            if self._pending >= self.fsync_batch:
+                self._sync_locked()
+
+    def _iter_active(self, path: str, offset: int = 0) -> Iterator[Dict[str, Any]]:
+        with open(path, "rb") as fh:
+            fh.seek(offset)
+            for line in fh:
+                if not line.endswith(b"\n"):
+                    break
+                yield json.loads(line)
+
+    def iter_blocks(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """Stream blocks with index >= `start`, oldest first."""
+        start = max(0, start)
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            if start >= len(self):
+                return
+            starts = self._starts[bisect.bisect_right(self._starts, start) - 1:]
+            active_start = self._active_start
+            active_offset = int(self._offsets[start - active_start]) if start >= active_start else 0
+
+        for seg in starts:
+            if seg == active_start:
+                yield from self._iter_active(self._segment_path(seg), active_offset)
+                continue
+            mm, offsets = self._mapped_segment(seg)
+            for k in range(max(0, start - seg), len(offsets)):
+                off = int(offsets[k])
+                yield json.loads(mm[off:mm.find(b"\n", off)])
+
+    def read_blocks(self, indices: Sequence[int]) -> List[Dict[str, Any]]:
+        """Random access: tip cache, else one seek (active) or one mmap slice (sealed) per block."""
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+            n = len(self)
+            recent_from = n - len(self._recent)
+            active_start = self._active_start
+            plan = []
+            for i in indices:
+                if not 0 <= i < n:
+                    raise IndexError(f"No block with index {i} in the ledger")
+                if i >= recent_from:
+                    plan.append(("recent", self._recent[i - recent_from]))
+                elif i >= active_start:
+                    plan.append(("active", int(self._offsets[i - active_start])))
+                else:
+                    plan.append(("sealed", i))
+
+        blocks = []
+        active_fh = None
+        try:
+            for kind, ref in plan:
+                if kind == "recent":
+                    blocks.append(ref)
+                elif kind == "active":
+                    if active_fh is None:
+                        active_fh = open(self._segment_path(active_start), "rb")
+                    active_fh.seek(ref)
+                    blocks.append(json.loads(active_fh.readline()))
+                else:
+                    seg = self._segment_of(ref)
+                    mm, offsets = self._mapped_segment(seg)
+                    off = int(offsets[ref - seg])
+                    blocks.append(json.loads(mm[off:mm.find(b"\n", off)]))
+        finally:
+            if active_fh is not None:
+                active_fh.close()
+        return blocks
+
+
+# -------------------------------------------------------
+# SQLite (WAL) store
+# -------------------------------------------------------
+
+SQLITE_FILE = "ledger.sqlite3"
+
+# Blocks fetched per query when streaming (keyset pagination, no long-lived cursor)
+SQLITE_PAGE_BLOCKS = 2_000
+
+# Blocks per audit task (each worker reads its own index range)
+SQLITE_AUDIT_BLOCKS = 50_000
+
+_SQLITE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS blocks ("
+    " idx INTEGER PRIMARY KEY,"
+    " timestamp REAL NOT NULL,"
+    " event_type TEXT NOT NULL,"
+    " line BLOB NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS blocks_timestamp ON blocks (timestamp)",
+    "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)",
+)
+
+
+class SQLiteStore:
+    """
+    Durable store in a single SQLite database running in WAL mode.
+
+    - one row per block: (idx PRIMARY KEY, timestamp [indexed], event_type,
+      line = the block's JSON line), so the incident history can also be
+      queried with plain SQL
+    - every append() is ONE transaction over a prepared INSERT (a bulk batch
+      commits once); with synchronous=NORMAL a commit does not fsync, so
+      `fsync_batch` / flush() checkpoint the WAL to make blocks durable
+    - WAL lets any number of readers run while the writer appends: each
+      reading thread gets its own connection and only sees committed blocks,
+      and streaming reads page by index instead of holding a cursor open
+    - `before_sync`: optional callable run before every WAL checkpoint
+
+    Transactions are atomic, so there is no torn tail to recover on open.
+    """
+
+    def __init__(self, directory: str, fsync_batch: int = 512, timeout: float = 30.0,
+                 before_sync: Optional[Callable[[], None]] = None):
+        self.directory = directory
+        self.path = os.path.join(directory, SQLITE_FILE)
+        self.fsync_batch = fsync_batch
+        self.timeout = timeout
+        self._before_sync = before_sync
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[Any] = []
+        self._recent: deque = deque(maxlen=TIP_CACHE_BLOCKS)
+        self._pending = 0              # blocks committed since the last WAL checkpoint
+
+        os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=timeout, check_same_thread=False,
+                                   isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        for statement in _SQLITE_SCHEMA:
+            self._db.execute(statement)
+
+        rows = self._db.execute(
+            "SELECT line FROM blocks ORDER BY idx DESC LIMIT ?", (TIP_CACHE_BLOCKS,)
+        ).fetchall()
+        self._recent.extend(json.loads(line) for (line,) in reversed(rows))
+        atexit.register(self.close)
+
+    def _reader(self):
+        """This thread's read connection (WAL: readers never block the writer)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False)
+            self._local.conn = conn
+            with self._lock:
+                self._readers.append(conn)
+        return conn
+
+    # ---------- metadata ----------
+
+    def get_meta(self, key: str, default: Any = None) -> Any:
+        row = self._reader().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def put_meta(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (key, json.dumps(value, default=json_default)),
+            )
+
+    # ---------- durability ----------
+
+    def _checkpoint_locked(self) -> None:
+        if self._pending:
+            if self._before_sync is not None:
+                self._before_sync()
+            self._db.execute("PRAGMA wal_checkpoint(PASSIVE)")
+            self._pending = 0
+
+    def flush(self, sync: bool = True) -> None:
+        """Commits are already visible to readers; with `sync`, also checkpoint (fsync) the WAL."""
+        if sync:
+            with self._lock:
+                if self._db is not None:
+                    self._checkpoint_locked()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._checkpoint_locked()
+                self._db.close()
+                self._db = None
+            for conn in self._readers:
+                conn.close()
+            self._readers = []
+        self._local = threading.local()
+
+    # ---------- store API ----------
+
+    def __len__(self) -> int:
+        return self._recent[-1]["index"] + 1 if self._recent else 0
+
+    def tip(self) -> Optional[Dict[str, Any]]:
+        return self._recent[-1] if self._recent else None
+
+    def append(self, blocks: List[Dict[str, Any]], lines: Optional[List[bytes]] = None) -> None:
+        """Append `blocks` in one transaction (`lines` = their pre-encoded JSON lines)."""
+        if not blocks:
+            return
+        if lines is None:
+            lines = [encode_block_line(b) for b in blocks]
+        rows = [(b["index"], b["timestamp"], b["event_type"], line) for b, line in zip(blocks, lines)]
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.executemany(
+                    "INSERT INTO blocks (idx, timestamp, event_type, line) VALUES (?, ?, ?, ?)", rows
+                )
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            self._recent.extend(blocks[-TIP_CACHE_BLOCKS:])
+            self._pending += len(blocks)
+            if self._pending >= self.fsync_batch:
+                self._checkpoint_locked()
+
+    def iter_blocks(self, start: int = 0) -> Iterator[Dict[str, Any]]:
+        """Stream blocks with index >= `start`, oldest first, one page query at a time."""
+        start = max(0, start)
+        end = len(self)
+        conn = self._reader()
+        while start < end:
+            rows = conn.execute(
+                "SELECT idx, line FROM blocks WHERE idx >= ? AND idx < ? ORDER BY idx LIMIT ?",
+                (start, end, SQLITE_PAGE_BLOCKS),
+            ).fetchall()
+            if not rows:
+                return
+            for _, line in rows:
+                yield json.loads(line)
+            start = rows[-1][0] + 1
+
+    def read_blocks(self, indices: Sequence[int]) -> List[Dict[str, Any]]:
+        """Random access: tip cache, else primary-key lookups batched into IN (...) queries."""
+        n = len(self)
+        recent = list(self._recent)
+        recent_from = n - len(recent)
+        found: Dict[int, Dict[str, Any]] = {}
+        wanted = []
+        for i in indices:
+            if not 0 <= i < n:
+                raise IndexError(f"No block with index {i} in the ledger")
+            if i >= recent_from:
+                found[i] = recent[i - recent_from]
+            else:
+                wanted.append(int(i))
+
+        conn = self._reader()
+        for k in range(0, len(wanted), 500):
+            chunk = wanted[k:k + 500]
+            rows = conn.execute(
+                f"SELECT idx, line FROM blocks WHERE idx IN ({','.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            found.update((idx, json.loads(line)) for idx, line in rows)
+        missing = [i for i in wanted if i not in found]
+        if missing:
+            raise IndexError(f"No block with index {missing[0]} in the ledger")
+        return [found[i] for i in indices]
+
+    def audit_tasks(self, n_blocks: int, chunk_blocks: int = SQLITE_AUDIT_BLOCKS
+                    ) -> List[Tuple[str, str, int, int]]:
+        """Audit work split into ("sqlite", path, first index, end index) ranges."""
+        return [("sqlite", self.path, lo, min(lo + chunk_blocks, n_blocks))
+                for lo in range(0, n_blocks, chunk_blocks)]
+
+    def verify_seals(self) -> Dict[str, Any]:
+        """
+        This backend has no seals (and SQLite keeps no page checksums unless
+        the cksumvfs extension is loaded): its integrity rests solely on the
+        hash-chain audit.
+        """
+        return {"sealed_segments": 0, "ok": True, "first_bad_segment": None}
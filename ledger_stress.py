@@ -0,0 +1,170 @@
+# ledger_stress.py
+"""
+SentinelSecure – Concurrent-writer stress test for the threat ledger
+
+Spawns many writer threads (like many analysts committing from their own
+Streamlit sessions) that append to ONE ledger at the same time, then checks
+that the result is still a single valid chain:
+
+- the new blocks' indices are contiguous and unique (no forks / duplicates);
+  only they are streamed back, so an existing large ledger is never loaded whole
+- every block links to its predecessor and hashes correctly (full audit)
+- every submitted entry landed exactly once
+- optional reader threads page through the ledger meanwhile without errors
+
+Usage:
+    python ledger_stress.py --writers 16 --blocks 2000
+    python ledger_stress.py --writers 8 --blocks 500 --batch 100 --dir /tmp/ledger_stress
+    python ledger_stress.py --writers 1 --readers 8 --backend sqlite
+
+Exits with status 1 if the chain is not valid.
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import ledger
+
+
+def _writer(writer_id: int, n_blocks: int, batch: int, barrier: threading.Barrier,
+            latencies: list) -> None:
+    barrier.wait()
+    features = {f"f{i}": float(i) for i in range(40)}
+    sent = 0
+    while sent < n_blocks:
+        size = min(batch, n_blocks - sent)
+        entries = [
+            {
+                "writer": writer_id,
+                "seq": sent + j,
+                "label": "Intrusion",
+                "recommended_action": "BLOCK",
+                "confidence": 0.97,
+                "features": features,
+            }
+            for j in range(size)
+        ]
+        t0 = time.perf_counter()
+        if batch == 1:
+            ledger.add_log(entries[0])
+        else:
+            ledger.add_logs(entries)
+        latencies.append(time.perf_counter() - t0)
+        sent += size
+
+
+def _reader(stop: threading.Event, barrier: threading.Barrier, counts: list, errors: list) -> None:
+    """Page through the newest blocks and stream the tip until the writers are done."""
+    barrier.wait()
+    while not stop.is_set():
+        try:
+            page = ledger.query_blocks(page=1, page_size=50, newest_first=True)
+            indices = [b["index"] for b in page["blocks"]]
+            if indices != sorted(indices, reverse=True):
+                raise AssertionError(f"page out of order: {indices[:5]}")
+            tip = indices[0] if indices else 0
+            streamed = sum(1 for _ in ledger.iter_blocks(max(0, tip - 200)))
+            counts.append(len(indices) + streamed)
+        except Exception as e:  # noqa: BLE001  (reported, not raised: keep reading)
+            errors.append(repr(e))
+
+
+def run_stress(writers: int, blocks_per_writer: int, batch: int = 1, directory: str = None,
+               readers: int = 0, backend: str = "segments") -> dict:
+    """
+    Run the stress test and return a report dict (throughput + validity checks).
+    `directory=None` uses a throwaway on-disk ledger; ":memory:" uses the in-memory one.
+    `readers` threads query the ledger while the writers append.
+    """
+    cleanup = directory is None
+    if directory is None:
+        directory = tempfile.mkdtemp(prefix="sentinel-ledger-stress-")
+    ledger.configure_storage(directory, backend=backend)
+    start = ledger.query_blocks(page_size=1)["total"]  # index of the first block this run appends
+
+    barrier = threading.Barrier(writers + readers + 1)
+    stop = threading.Event()
+    latencies = [[] for _ in range(writers)]
+    read_counts: list = []
+    read_errors: list = []
+    threads = [
+        threading.Thread(target=_writer, args=(w, blocks_per_writer, batch, barrier, latencies[w]))
+        for w in range(writers)
+    ]
+    reader_threads = [
+        threading.Thread(target=_reader, args=(stop, barrier, read_counts, read_errors))
+        for _ in range(readers)
+    ]
+    for t in threads + reader_threads:
+        t.start()
+    barrier.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    ledger.flush()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    for t in reader_threads:
+        t.join()
+
+    # Stream only this run's blocks: an existing ledger may be far larger than memory
+    appended = 0
+    contiguous = True
+    seen = set()
+    for block in ledger.iter_blocks(start):
+        contiguous = contiguous and block["index"] == start + appended
+        seen.add((block["data"]["writer"], block["data"]["seq"]))
+        appended += 1
+    all_lat = sorted(x for lat in latencies for x in lat)
+
+    report = {
+        "writers": writers,
+        "blocks_per_writer": blocks_per_writer,
+        "batch": batch,
+        "appended": appended,
+        "elapsed_s": round(elapsed, 3),
+        "blocks_per_s": round(appended / elapsed, 1) if elapsed > 0 else None,
+        "p50_call_ms": round(all_lat[len(all_lat) // 2] * 1000, 3) if all_lat else None,
+        "p99_call_ms": round(all_lat[int(len(all_lat) * 0.99) - 1] * 1000, 3) if all_lat else None,
+        "indices_contiguous": contiguous,
+        "all_entries_once": len(seen) == appended == writers * blocks_per_writer,
+        "chain_valid": ledger.audit_chain(),
+    }
+    if readers:
+        report["reader_blocks_read"] = sum(read_counts)
+        report["reader_errors"] = len(read_errors)
+    report["ok"] = (report["indices_contiguous"] and report["all_entries_once"]
+                    and report["chain_valid"] and not read_errors)
+
+    if cleanup:
+        ledger.configure_storage(None)
+        shutil.rmtree(directory, ignore_errors=True)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent-writer stress test for ledger.py")
+    parser.add_argument("--writers", type=int, default=16, help="number of concurrent writer threads")
+    parser.add_argument("--blocks", type=int, default=1000, help="blocks appended by each writer")
+    parser.add_argument("--batch", type=int, default=1,
+                        help="entries per call (1 = add_log, >1 = add_logs)")
+    parser.add_argument("--dir", default=None,
+                        help="ledger directory (default: temporary dir; ':memory:' for in-memory)")
+    parser.add_argument("--readers", type=int, default=0,
+                        help="reader threads paging through the ledger during the writes")
+    parser.add_argument("--backend", choices=ledger.BACKENDS, default="segments",
+                        help="storage engine for on-disk ledgers")
+    args = parser.parse_args(argv)
+
+    report = run_stress(args.writers, args.blocks, args.batch, args.dir, args.readers, args.backend)
+    for key, value in report.items():
+        print(f"{key:>20}: {value}")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,662 @@
+# load_test.py
+"""
+SentinelSecure – Concurrent-session load test
+
+One console process serves every analyst: the model, the threat ledger, the
+bulk job runner and the upload caches are shared by all sessions. This tool
+drives many simulated sessions through the same code at the same time and
+reports, per page:
+
+- latency p50 / p95 / p99 (and max) per operation
+- throughput: operations and flows per second over the whole run
+- memory growth: process RSS change around each operation (approximate
+  while pages overlap) plus the process start / peak / end RSS
+- lock contention: how often the shared locks (ledger append, bulk job
+  table, feature store, ledger storage, shadow / tier / model-manager
+  state) were already held when a page needed them, and the time spent waiting
+
+Pages, run in the given order every iteration of every session:
+
+- bulk        upload the CSV and wait for the background scoring job
+- ledger      commit the bulk results' intrusions (idempotent: after the first
+              session, mostly the duplicate check)
+- playground  score and explain one random flow
+- simulator   100 x 100 sensitivity sweep around one flow
+
+Drivers:
+
+- app (default): every session is a streamlit.testing AppTest running app.py
+  in this process, so sessions share the model, ledger, job runner and caches
+  exactly as under `streamlit run`; every page visit uploads the CSV anew.
+- direct: sessions call the code behind those pages (scoring, a shared
+  bulk_jobs.JobRunner, the sweep grid, ledger.add_logs) without Streamlit –
+  far less overhead, so many more sessions.
+
+The ledger is a throwaway directory unless --ledger-dir is given.
+
+Usage:
+    python load_test.py flows.csv --sessions 20 --iterations 3
+    python load_test.py flows.csv --driver direct --sessions 50 --pages bulk,ledger
+    python load_test.py flows.csv --sessions 8 --think 2 --json load_report.json
+
+Exits with status 1 if any operation failed.
+"""
+
+import argparse
+import collections
+import json
+import os
+import random
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+import bulk_jobs
+import feature_store
+import latency_tiers
+import ledger
+import ledger_store
+import model_manager
+import scoring
+import shadow
+
+PAGES = ("bulk", "ledger", "playground", "simulator")
+DRIVERS = ("app", "direct")
+
+# Sidebar page each simulated page runs on (app driver)
+APP_PAGES = {
+    "bulk": "Bulk Analysis",
+    "ledger": "Bulk Analysis",
+    "playground": "Attack Playground",
+    "simulator": "Attack Simulator (what-if)",
+}
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+COMMIT_BUTTON = "Commit all detected intrusions to ledger"
+SWEEP_BUTTON = "Run sensitivity sweep"
+
+# Points per axis of the simulator sweep (the page's default resolution)
+SWEEP_RESOLUTION = 100
+
+# Seconds between checks of a running bulk job, and per AppTest script run
+POLL_S = 0.25
+APP_TIMEOUT_S = 600.0
+
+# Seconds between RSS samples for the peak
+MEMORY_SAMPLE_S = 0.2
+
+# Module-level locks shared by every session: (module, attribute)
+SHARED_LOCKS = (
+    (ledger, "_append_lock"),
+    (ledger, "_init_lock"),
+)
+
+# Per-instance locks of the process-wide objects: (class, attribute)
+SHARED_INSTANCE_LOCKS = (
+    (bulk_jobs.JobRunner, "_lock"),
+    (feature_store.FeatureStore, "_lock"),
+    (ledger_store.MemoryStore, "_lock"),
+    (ledger_store.SegmentedFileStore, "_lock"),
+    (ledger_store.SQLiteStore, "_lock"),
+    (model_manager.ModelManager, "_lock"),
+    (model_manager.ModelManager, "_reloading"),
+    (shadow.ShadowScorer, "_lock"),
+    (latency_tiers.TierPolicy, "_lock"),
+)
+
+# The page the current thread works for (lock waits are charged to it)
+_local = threading.local()
+
+
+# -------------------------------------------------------
+# Lock contention
+# -------------------------------------------------------
+
+def current_page() -> str:
+    return getattr(_local, "page", None) or "(background)"
+
+
+class LockStats:
+    """Acquisitions / contended acquisitions / wait time per (lock, page)."""
+
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._stats: Dict[tuple, List[float]] = {}
+
+    def record(self, lock: str, page: str, contended: bool, waited_s: float) -> None:
+        with self._guard:
+            row = self._stats.setdefault((lock, page), [0, 0, 0.0, 0.0])
+            row[0] += 1
+            if contended:
+                row[1] += 1
+                row[2] += waited_s
+                row[3] = max(row[3], waited_s)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        with self._guard:
+            items = sorted(self._stats.items())
+        return [
+            {"lock": lock, "page": page, "acquisitions": int(n), "contended": int(c),
+             "wait_ms": round(1000 * wait, 3), "max_wait_ms": round(1000 * worst, 3)}
+            for (lock, page), (n, c, wait, worst) in items
+        ]
+
+
+class TimedLock:
+    """
+    Stand-in for a threading.Lock that records, per page, whether it was
+    already held and how long the acquirer waited for it.
+    """
+
+    def __init__(self, lock, name: str, stats: LockStats):
+        self._lock = lock
+        self.name = name
+        self._stats = stats
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        if self._lock.acquire(False):
+            self._stats.record(self.name, current_page(), False, 0.0)
+            return True
+        if not blocking:
+            self._stats.record(self.name, current_page(), True, 0.0)
+            return False
+        t0 = time.perf_counter()
+        acquired = self._lock.acquire(True, timeout)
+        self._stats.record(self.name, current_page(), True, time.perf_counter() - t0)
+        return acquired
+
+    def release(self) -> None:
+        self._lock.release()
+
+    def locked(self) -> bool:
+        return self._lock.locked()
+
+    def __enter__(self) -> bool:
+        return self.acquire()
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+def instrument_locks(stats: LockStats):
+    """
+    Swap the shared locks for TimedLocks (objects created from now on get
+    them too). Returns a function undoing the patch; objects created in
+    between keep their TimedLocks.
+    """
+    module_locks = [(module, attr, getattr(module, attr)) for module, attr in SHARED_LOCKS]
+    for module, attr, lock in module_locks:
+        setattr(module, attr, TimedLock(lock, f"{module.__name__}.{attr}", stats))
+
+    originals = []
+    for cls, attr in SHARED_INSTANCE_LOCKS:
+        init = cls.__init__
+
+        def timed_init(self, *args, _init=init, _attr=attr, _name=f"{cls.__name__}.{attr}", **kwargs):
+            _init(self, *args, **kwargs)
+            setattr(self, _attr, TimedLock(getattr(self, _attr), _name, stats))
+
+        originals.append((cls, init))
+        cls.__init__ = timed_init
+
+    def restore() -> None:
+        for cls, init in reversed(originals):
+            cls.__init__ = init
+        for module, attr, lock in module_locks:
+            setattr(module, attr, lock)
+
+    return restore
+
+
+# -------------------------------------------------------
+# Memory
+# -------------------------------------------------------
+
+def rss_mb() -> float:
+    """Resident set size of this process in MiB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+        except ImportError:
+            return 0.0
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 1024
+
+
+class MemorySampler:
+    """Background thread tracking the peak RSS while the load runs."""
+
+    def __init__(self, interval_s: float = MEMORY_SAMPLE_S):
+        self.interval_s = interval_s
+        self.start_mb = self.peak_mb = rss_mb()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="load-test-memory", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_s):
+            self.peak_mb = max(self.peak_mb, rss_mb())
+
+    def stop(self) -> float:
+        self._stop.set()
+        self._thread.join()
+        end = rss_mb()
+        self.peak_mb = max(self.peak_mb, end)
+        return end
+
+
+# -------------------------------------------------------
+# Direct driver (no Streamlit)
+# -------------------------------------------------------
+
+class DirectContext:
+    """The process-wide objects the dashboard shares, built once for all sessions."""
+
+    def __init__(self, df: pd.DataFrame, model_path: str):
+        import explain
+
+        self.df = df
+        self.model = scoring.load_model(model_path)
+        self.version = scoring.model_version(model_path)
+        self.runner = bulk_jobs.JobRunner()
+        explain.set_model(self.model)
+        self.explain_flow = explain.explain_flow
+
+        numeric = list(scoring.prepare_feature_frame(df.head(1)).columns)
+        preferred = [c for c in ("src_bytes", "serror_rate") if c in numeric]
+        self.sweep_features = preferred if len(preferred) == 2 else numeric[:2]
+
+
+class DirectSession:
+    """One simulated analyst calling the functions behind each page."""
+
+    def __init__(self, ctx: DirectContext, session_id: int, rng: random.Random):
+        self.ctx = ctx
+        self.session_id = session_id
+        self.rng = rng
+        self.uploads = 0
+        self.results: Optional[pd.DataFrame] = None
+
+    def warm_up(self) -> None:
+        pass
+
+    def bulk(self) -> int:
+        self.uploads += 1
+        model = self.ctx.model
+
+        def score(chunk: pd.DataFrame) -> pd.DataFrame:
+            _local.page = "bulk"  # runs on a job-runner thread
+            return scoring.run_model_on_df(model, chunk)
+
+        job = self.ctx.runner.submit(self.ctx.df, score, key=f"load-{self.session_id}-{self.uploads}")
+        while job.active:
+            time.sleep(POLL_S / 5)
+        if job.error:
+            raise RuntimeError(job.error)
+        self.results = job.result
+        return len(self.ctx.df)
+
+    def ledger(self) -> int:
+        if self.results is None:
+            raise RuntimeError("no bulk results to commit")
+        intrusions = self.results[self.results["label"] == "Intrusion"]
+        if not intrusions.empty:
+            batch, keys = scoring.ledger_batch(intrusions, ledger.idempotency_key, self.ctx.version)
+            ledger.add_logs(batch, idempotency_keys=keys)
+        return len(intrusions)
+
+    def playground(self) -> int:
+        row = self.ctx.df.iloc[[self.rng.randrange(len(self.ctx.df))]]
+        scoring.run_model_on_df(self.ctx.model, row)
+        self.ctx.explain_flow(row.iloc[0].to_dict(), top_n=5)
+        return 1
+
+    def simulator(self) -> int:
+        base = self.ctx.df.iloc[self.rng.randrange(len(self.ctx.df))]
+        sweep = {
+            name: np.linspace(0.0, 1.0 if name.endswith("_rate") else max(1.0, float(self.ctx.df[name].max())),
+                              SWEEP_RESOLUTION)
+            for name in self.ctx.sweep_features
+        }
+        grid = scoring.build_sweep_grid(base, sweep)
+        scoring.score_features(self.ctx.model, scoring.prepare_feature_frame(grid))
+        return len(grid)
+
+
+# -------------------------------------------------------
+# App driver (streamlit.testing AppTest)
+# -------------------------------------------------------
+
+def _app_script(session):
+    # AppTest script: charge this run to the session's page, then run the dashboard
+    import runpy
+
+    session.enter()
+    runpy.run_path(session.app_path, run_name="__main__")
+
+
+class AppSession:
+    """One simulated analyst: an AppTest session clicking through app.py."""
+
+    def __init__(self, data: bytes, rows: int, session_id: int, rng: random.Random):
+        self.data = data
+        self.rows = rows
+        self.session_id = session_id
+        self.rng = rng
+        self.app_path = APP_PATH
+        self.page: Optional[str] = None
+        self.at = None
+        self.recover()
+
+    def recover(self) -> None:
+        """Start over in a new browser session (after a failed operation)."""
+        from streamlit.testing.v1 import AppTest
+
+        self.page = None
+        self.at = AppTest.from_function(_app_script, args=(self,), default_timeout=APP_TIMEOUT_S)
+        self.at.session_state["authenticated"] = True
+
+    def enter(self) -> None:
+        """Called first thing in every script run, on the script thread."""
+        _local.page = self.page
+
+    def _check(self) -> None:
+        errors = [e.value for e in self.at.exception]
+        if errors:
+            raise RuntimeError(str(errors[0]).splitlines()[0])
+
+    def _run(self, page: str, upload: bool = True) -> None:
+        """Open `page` and (a new upload every time, as after a page switch) upload the CSV."""
+        self.page = page
+        self.at.sidebar.radio[0].set_value(APP_PAGES[page])
+        self.at.run()
+        self._check()
+        if upload:
+            self.at.file_uploader[0].set_value(("load_test.csv", self.data, "text/csv"))
+            self.at.run()
+            self._check()
+
+    def _click(self, label: str) -> None:
+        buttons = [b for b in self.at.button if label in b.label]
+        if not buttons:
+            raise RuntimeError(f"no {label!r} button on the page")
+        buttons[0].click().run()
+        self._check()
+
+    def warm_up(self) -> None:
+        self.at.run()  # login + landing page, not measured
+        self._check()
+
+    def _wait_for_job(self) -> None:
+        while self.at.get("progress"):
+            time.sleep(POLL_S)
+            self.at.run()
+            self._check()
+
+    def bulk(self) -> int:
+        self._run("bulk")
+        self._wait_for_job()
+        return self.rows
+
+    def ledger(self) -> int:
+        self._run("ledger", upload=False)  # still showing this session's bulk results
+        self._wait_for_job()  # rescoring if the job runner has evicted them meanwhile
+        self._click(COMMIT_BUTTON)
+        # Intrusions submitted = committed + skipped as duplicates
+        messages = [m.value for m in self.at.success] + [c.value for c in self.at.caption]
+        counts = [re.search(r"Committed (\d+)|(\d+) already-recorded", m) for m in messages]
+        return sum(int(m.group(1) or m.group(2)) for m in counts if m)
+
+    def playground(self) -> int:
+        self._run("playground")
+        self.at.number_input(key="row_index_input").set_value(self.rng.randrange(self.rows)).run()
+        self._check()
+        return 1
+
+    def simulator(self) -> int:
+        self._run("simulator")
+        self._click(SWEEP_BUTTON)
+        resolution = self.at.slider(key="sweep_res").value
+        return resolution * (resolution if self.at.selectbox(key="sweep_y").value != "(none)" else 1)
+
+
+def _share_test_runtime():
+    """
+    AppTest installs a mock Streamlit runtime for each run and clears it when
+    the run ends – under another session's feet when runs overlap. Keep
+    serving the last mock runtime instead. Returns a function undoing this.
+    """
+    from streamlit.runtime import Runtime
+
+    original = Runtime.__dict__["instance"]
+    last = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last[:] = [cls._instance]
+            return cls._instance
+        if last:
+            return last[0]
+        return original.__func__(cls)
+
+    Runtime.instance = classmethod(instance)
+
+    def restore() -> None:
+        Runtime.instance = original
+
+    return restore
+
+
+# -------------------------------------------------------
+# Load run
+# -------------------------------------------------------
+
+def _percentile_ms(latencies: np.ndarray, q: float) -> Optional[float]:
+    return round(1000 * float(np.percentile(latencies, q)), 1) if latencies.size else None
+
+
+def _session_loop(session, pages: Sequence[str], iterations: int, barrier: threading.Barrier,
+                  delay_s: float, think_s: float, ops: Dict[str, list], setup_errors: list) -> None:
+    try:
+        session.warm_up()
+    except Exception as e:  # noqa: BLE001
+        setup_errors.append(f"warm-up: {type(e).__name__}: {e}")
+        return
+    finally:
+        barrier.wait()
+    time.sleep(delay_s)  # ramp-up
+    for _ in range(iterations):
+        for page in pages:
+            _local.page = page
+            rss0, t0 = rss_mb(), time.perf_counter()
+            try:
+                flows, error = getattr(session, page)(), None
+            except Exception as e:  # noqa: BLE001  (counted per page, the session carries on)
+                flows, error = 0, f"{type(e).__name__}: {e}"
+            ops[page].append((time.perf_counter() - t0, flows, rss_mb() - rss0, error))
+            if error is not None and hasattr(session, "recover"):
+                try:
+                    session.recover()
+                    session.warm_up()
+                except Exception as e:  # noqa: BLE001
+                    setup_errors.append(f"recovery: {type(e).__name__}: {e}")
+                    return
+            if think_s > 0:
+                time.sleep(session.rng.uniform(0, think_s))
+
+
+def run_load_test(
+    csv_path: str,
+    sessions: int = 8,
+    iterations: int = 2,
+    pages: Sequence[str] = PAGES,
+    driver: str = "app",
+    ledger_dir: Optional[str] = None,
+    model_path: str = scoring.MODEL_PATH,
+    think_s: float = 0.0,
+    ramp_s: float = 0.0,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """
+    Run `sessions` concurrent sessions, each going through `pages`
+    `iterations` times, and return the report dict (summary, per-page and
+    per-lock rows, sample errors).
+    """
+    if "ledger" in pages and ("bulk" not in pages or list(pages).index("ledger") < list(pages).index("bulk")):
+        raise ValueError("the ledger page commits bulk results: list 'bulk' before 'ledger'")
+    df = pd.read_csv(csv_path)
+    if df.empty:
+        raise ValueError(f"{csv_path} has no rows")
+
+    cleanup = ledger_dir is None
+    if ledger_dir is None:
+        ledger_dir = tempfile.mkdtemp(prefix="sentinel-load-test-")
+    stats = LockStats()
+    restore_locks = instrument_locks(stats)
+    restore_runtime = None
+    ledger.configure_storage(ledger_dir, backend=os.environ.get(ledger.LEDGER_BACKEND_ENV) or "segments")
+    start_blocks = ledger.query_blocks(page_size=1)["total"]
+
+    try:
+        if driver == "app":
+            restore_runtime = _share_test_runtime()
+            with open(csv_path, "rb") as fh:
+                data = fh.read()
+            make_session = lambda i, rng: AppSession(data, len(df), i, rng)  # noqa: E731
+        else:
+            ctx = DirectContext(df, model_path)
+            make_session = lambda i, rng: DirectSession(ctx, i, rng)  # noqa: E731
+
+        ops: Dict[str, list] = {page: [] for page in pages}
+        setup_errors: list = []
+        barrier = threading.Barrier(sessions + 1)
+        threads = []
+        for i in range(sessions):
+            session = make_session(i, random.Random(seed + i))
+            delay = ramp_s * i / sessions
+            threads.append(threading.Thread(
+                target=_session_loop, name=f"load-session-{i}",
+                args=(session, pages, iterations, barrier, delay, think_s, ops, setup_errors),
+            ))
+        for t in threads:
+            t.start()
+        barrier.wait()  # every session logged in
+
+        memory = MemorySampler()
+        t0 = time.perf_counter()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+        end_mb = memory.stop()
+        ledger.flush()
+        appended = ledger.query_blocks(page_size=1)["total"] - start_blocks
+    finally:
+        if restore_runtime is not None:
+            restore_runtime()
+        restore_locks()
+        if cleanup:
+            ledger.configure_storage(None)
+            shutil.rmtree(ledger_dir, ignore_errors=True)
+
+    locks = stats.rows()
+    page_rows, errors = [], list(setup_errors)
+    for page in pages:
+        page_ops = ops[page]
+        latencies = np.asarray([lat for lat, _, _, _ in page_ops])
+        failed = [err for _, _, _, err in page_ops if err]
+        errors.extend(f"{page}: {err}" for err in failed)
+        waits = [row for row in locks if row["page"] == page]
+        page_rows.append({
+            "page": page,
+            "ops": len(page_ops),
+            "errors": len(failed),
+            "p50_ms": _percentile_ms(latencies, 50),
+            "p95_ms": _percentile_ms(latencies, 95),
+            "p99_ms": _percentile_ms(latencies, 99),
+            "max_ms": round(1000 * float(latencies.max()), 1) if latencies.size else None,
+            "ops_per_s": round(len(page_ops) / elapsed, 3) if elapsed > 0 else None,
+            "flows_per_s": round(sum(f for _, f, _, _ in page_ops) / elapsed, 1) if elapsed > 0 else None,
+            "rss_delta_mb": round(sum(d for _, _, d, _ in page_ops), 1),
+            "lock_waits": sum(row["contended"] for row in waits),
+            "lock_wait_ms": round(sum(row["wait_ms"] for row in waits), 1),
+        })
+
+    return {
+        "summary": {
+            "driver": driver,
+            "sessions": sessions,
+            "iterations": iterations,
+            "pages": list(pages),
+            "flows_in_csv": len(df),
+            "elapsed_s": round(elapsed, 3),
+            "operations": sum(row["ops"] for row in page_rows),
+            "errors": len(errors),
+            "rss_start_mb": round(memory.start_mb, 1),
+            "rss_peak_mb": round(memory.peak_mb, 1),
+            "rss_end_mb": round(end_mb, 1),
+            "rss_growth_mb": round(end_mb - memory.start_mb, 1),
+            "ledger_appended": appended,
+        },
+        "pages": page_rows,
+        "locks": locks,
+        "error_samples": [e for e, _ in collections.Counter(errors).most_common(5)],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for the SentinelSecure console")
+    parser.add_argument("csv", help="flows CSV every simulated session uploads")
+    parser.add_argument("--sessions", type=int, default=8, help="concurrent simulated analysts")
+    parser.add_argument("--iterations", type=int, default=2, help="passes over the pages per session")
+    parser.add_argument("--pages", default=",".join(PAGES),
+                        help="comma-separated pages in visiting order (default: %(default)s)")
+    parser.add_argument("--driver", choices=DRIVERS, default="app",
+                        help="app = AppTest sessions running app.py, direct = scoring functions only")
+    parser.add_argument("--think", type=float, default=0.0, metavar="SECONDS",
+                        help="random pause of up to this long after each page")
+    parser.add_argument("--ramp", type=float, default=0.0, metavar="SECONDS",
+                        help="spread the session starts over this long")
+    parser.add_argument("--model", default=scoring.MODEL_PATH, help="model artifact for --driver direct")
+    parser.add_argument("--ledger-dir", default=None, help="ledger directory (default: temporary dir)")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random flow choices")
+    parser.add_argument("--json", default=None, help="also write the full report here")
+    args = parser.parse_args(argv)
+
+    pages = [p.strip() for p in args.pages.split(",") if p.strip()]
+    unknown = sorted(set(pages) - set(PAGES))
+    if unknown or not pages:
+        parser.error(f"unknown pages {unknown} (choose from {', '.join(PAGES)})")
+    try:
+        report = run_load_test(
+            args.csv, max(1, args.sessions), max(1, args.iterations), pages, args.driver,
+            args.ledger_dir, args.model, args.think, args.ramp, args.seed,
+        )
+    except ValueError as e:
+        parser.error(str(e))
+
+    for key, value in report["summary"].items():
+        print(f"{key:>16}: {value}")
+    print()
+    print(pd.DataFrame(report["pages"]).to_string(index=False))
+    contended = [row for row in report["locks"] if row["contended"]]
+    print()
+    print(pd.DataFrame(contended).to_string(index=False) if contended else "no lock contention")
+    for error in report["error_samples"]:
+        print(f"error: {error}", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 1 if report["summary"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+# merkle.py
+"""
+SentinelSecure – Incremental Merkle tree over ledger block hashes
+
+- Leaf i is the hash of ledger block i (RFC 6962 style: leaf = SHA-256(0x00 || block_hash),
+  node = SHA-256(0x01 || left || right))
+- Every complete (power-of-two aligned) subtree node is stored once, level by level,
+  so appends are O(1) amortized and any inclusion proof needs only O(log n) node reads
+- The tree root is a compact 32-byte commitment to the whole ledger that can be
+  published; auditors check a single incident with `verify_inclusion` against it,
+  without downloading or rehashing the rest of the chain
+
+Levels live in memory (bytearray) or, for durable ledgers, in append-only files
+`level-00.bin`, `level-01.bin`, ... (32 bytes per node). The tree is derivable from
+the block hashes, so it is not fsynced; ledger.py re-syncs it with the chain on open.
+"""
+
+import hashlib
+import os
+from typing import Dict, List, Optional
+
+NODE_SIZE = 32
+
+# Buffered node bytes per level before they are written to the level file
+_FLUSH_BYTES = 64 * 1024
+
+
+def leaf_hash(block_hash: str) -> bytes:
+    """Merkle leaf for a block's hex SHA-256 hash."""
+    return hashlib.sha256(b"\x00" + bytes.fromhex(block_hash)).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(b"\x01" + left + right).digest()
+
+
+def _largest_pow2_below(n: int) -> int:
+    """Largest power of two strictly smaller than n (n >= 2)."""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+class _Level:
+    """One tree level: flushed nodes on disk (or none) + an in-memory tail."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.disk_count = 0
+        self.tail = bytearray()
+        self._fd = None
+        if path is not None:
+            self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            size = os.fstat(self._fd).st_size
+            self.disk_count = size // NODE_SIZE
+            if size % NODE_SIZE:
+                os.ftruncate(self._fd, self.disk_count * NODE_SIZE)  # torn node write
+
+    def __len__(self) -> int:
+        return self.disk_count + len(self.tail) // NODE_SIZE
+
+    def get(self, pos: int) -> bytes:
+        if pos >= self.disk_count:
+            off = (pos - self.disk_count) * NODE_SIZE
+            return bytes(self.tail[off:off + NODE_SIZE])
+        return os.pread(self._fd, NODE_SIZE, pos * NODE_SIZE)
+
+    def append(self, node: bytes) -> None:
+        self.tail += node
+        if self._fd is not None and len(self.tail) >= _FLUSH_BYTES:
+            self.flush()
+
+    def truncate(self, count: int) -> None:
+        if count >= len(self):
+            return
+        if count >= self.disk_count:
+            del self.tail[(count - self.disk_count) * NODE_SIZE:]
+            return
+        self.tail = bytearray()
+        os.ftruncate(self._fd, count * NODE_SIZE)
+        self.disk_count = count
+
+    def flush(self) -> None:
+        if self._fd is None or not self.tail:
+            return
+        os.pwrite(self._fd, bytes(self.tail), self.disk_count * NODE_SIZE)
+        self.disk_count += len(self.tail) // NODE_SIZE
+        self.tail = bytearray()
+
+    def close(self) -> None:
+        self.flush()
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class MerkleTree:
+    """
+    Append-only Merkle tree. `directory=None` keeps everything in memory.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+        self.levels: List[_Level] = []
+        self._open_level(0)
+        # Reopen any higher levels that exist on disk
+        while directory is not None and os.path.exists(self._level_path(len(self.levels))):
+            self._open_level(len(self.levels))
+        self._repair()
+
+    def _level_path(self, level: int) -> Optional[str]:
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, f"level-{level:02d}.bin")
+
+    def _open_level(self, level: int) -> _Level:
+        lvl = _Level(self._level_path(level))
+        self.levels.append(lvl)
+        return lvl
+
+    def _repair(self) -> None:
+        """Make every level consistent with the leaf count (after a crash mid-append)."""
+        self.truncate(len(self))
+        # Rebuild parents that were lost (level k must hold size >> k nodes)
+        level = 0
+        while level < len(self.levels):
+            lvl = self.levels[level]
+            level += 1
+            expected = len(lvl) // 2
+            if expected == 0:
+                continue
+            if level == len(self.levels):
+                self._open_level(level)
+            parent = self.levels[level]
+            for pos in range(len(parent), expected):
+                parent.append(node_hash(lvl.get(2 * pos), lvl.get(2 * pos + 1)))
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def truncate(self, size: int) -> None:
+        """Drop leaves >= size (and the parents that covered them)."""
+        for level, lvl in enumerate(self.levels):
+            lvl.truncate(size >> level)
+
+    def append(self, block_hashes: List[str]) -> None:
+        """Add one leaf per block hash, completing parent nodes as pairs fill up."""
+        for block_hash in block_hashes:
+            node = leaf_hash(block_hash)
+            level = 0
+            while True:
+                lvl = self.levels[level]
+                lvl.append(node)
+                pos = len(lvl) - 1
+                if pos % 2 == 0:
+                    break
+                node = node_hash(lvl.get(pos - 1), node)
+                level += 1
+                if level == len(self.levels):
+                    self._open_level(level)
+
+    def flush(self) -> None:
+        for lvl in self.levels:
+            lvl.flush()
+
+    def close(self) -> None:
+        for lvl in self.levels:
+            lvl.close()
+
+    # ---------- hashes / proofs ----------
+
+    def _subtree(self, start: int, end: int) -> bytes:
+        """MTH(D[start:end]) using stored aligned nodes wherever possible."""
+        n = end - start
+        if n & (n - 1) == 0 and start % n == 0:
+            level = n.bit_length() - 1
+            return self.levels[level].get(start >> level)
+        k = _largest_pow2_below(n)
+        return node_hash(self._subtree(start, start + k), self._subtree(start + k, end))
+
+    def root(self, size: Optional[int] = None) -> Optional[bytes]:
+        """Root of the first `size` leaves (default: whole tree)."""
+        size = len(self) if size is None else size
+        if size == 0:
+            return None
+        return self._subtree(0, size)
+
+    def inclusion_path(self, index: int, size: Optional[int] = None) -> List[bytes]:
+        """Audit path for leaf `index` in the tree of the first `size` leaves."""
+        size = len(self) if size is None else size
+        if not 0 <= index < size:
+            raise IndexError(f"leaf {index} not in tree of size {size}")
+
+        path: List[bytes] = []
+        lo, hi = 0, size
+        while hi - lo > 1:
+            k = _largest_pow2_below(hi - lo)
+            if index < lo + k:
+                path.append(self._subtree(lo + k, hi))
+                hi = lo + k
+            else:
+                path.append(self._subtree(lo, lo + k))
+                lo = lo + k
+        path.reverse()  # leaf-to-root order
+        return path
+
+
+def verify_inclusion(index: int, tree_size: int, block_hash: str,
+                     path: List[str], root: str) -> bool:
+    """
+    Auditor-side check (RFC 9162 §2.1.3.2): does `block_hash` sit at leaf
+    `index` of the tree of `tree_size` leaves whose root is `root`?
+    `path` and `root` are hex strings as returned by ledger.get_inclusion_proof().
+    """
+    if not 0 <= index < tree_size:
+        return False
+    fn, sn = index, tree_size - 1
+    r = leaf_hash(block_hash)
+    for p_hex in path:
+        p = bytes.fromhex(p_hex)
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = node_hash(p, r)
+            if not fn & 1:
+                while not fn & 1 and fn != 0:
+                    fn >>= 1
+                    sn >>= 1
+        else:
+            r = node_hash(r, p)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and r.hex() == root
+
+
+def proof_to_dict(tree: MerkleTree, index: int, block_hash: str) -> Dict[str, object]:
+    """Serializable inclusion proof for the current tree size."""
+    size = len(tree)
+    return {
+        "index": index,
+        "tree_size": size,
+        "block_hash": block_hash,
+        "path": [p.hex() for p in tree.inclusion_path(index, size)],
+        "root": tree.root(size).hex(),
+    }
@@ -0,0 +1,246 @@
+# model_manager.py
+"""
+SentinelSecure – Hot model reload
+
+The model used to be loaded once per process (@st.cache_resource), and
+explain.py kept its own copy, so replacing best_threshold.pkl meant a
+restart. A ModelManager owns the live model instead:
+
+- reload(): load the artifact on a background thread, WARM it and VALIDATE it
+  on a canary batch (probabilities finite / in [0, 1] / summing to 1, same
+  classes as the live model; optionally a minimum label agreement with it)
+- a passing model is swapped in with a single reference assignment, so every
+  session's next request sees the new version; a failing one is rejected and
+  the live model keeps serving
+- callers take ONE snapshot (`manager.current`) per request / job and use it
+  throughout, so in-flight work finishes on the version it started with
+- watch(): a daemon thread polls the artifact's size / mtime and reloads once
+  a change has been stable for one poll interval (no half-written files)
+- listeners are called with each new snapshot (the app re-points explain.py)
+
+The canary batch is a CSV given as `canary_path`, else the first production
+batch of at least CANARY_ROWS flows (note_batch; single-flow scoring such as
+the Attack Playground never qualifies), else synthetic rows over the model's
+feature names.
+"""
+
+import collections
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import scoring
+
+CANARY_ENV = "SENTINEL_CANARY_CSV"
+CANARY_ROWS = 256
+
+# Seconds between artifact checks when watching
+DEFAULT_POLL_S = 5.0
+
+
+class LoadedModel:
+    """Immutable snapshot of one live model version."""
+
+    def __init__(self, model, path: str, version: str, validation: Dict[str, Any]):
+        self.model = model
+        self.path = path
+        self.version = version
+        self.validation = validation
+        self.loaded_at = time.time()
+
+
+def validate_model(model, canary: pd.DataFrame, reference=None,
+                   min_agreement: Optional[float] = None) -> Dict[str, Any]:
+    """
+    Score `canary` with `model` (which also warms it) and sanity-check the
+    output; with a `reference` model also require the same classes and report
+    label agreement. Returns {"ok", "rows", "latency_ms", "agreement", "error"}.
+    """
+    report: Dict[str, Any] = {"ok": False, "rows": len(canary), "latency_ms": None,
+                              "agreement": None, "error": None}
+    try:
+        t0 = time.perf_counter()
+        proba = np.asarray(model.predict_proba(canary), dtype=np.float64)
+        report["latency_ms"] = round(1000 * (time.perf_counter() - t0), 2)
+
+        classes = list(getattr(model, "classes_", []))
+        labels = {scoring.normalize_label(c) for c in classes}
+        if labels != {"Intrusion", "Benign"}:
+            raise ValueError(f"classes {classes} do not map to Benign / Intrusion")
+        if proba.shape != (len(canary), len(classes)):
+            raise ValueError(f"predict_proba returned shape {proba.shape}")
+        if not np.isfinite(proba).all() or (proba < 0).any() or (proba > 1).any():
+            raise ValueError("probabilities outside [0, 1]")
+        if not np.allclose(proba.sum(axis=1), 1.0, atol=1e-3):
+            raise ValueError("probabilities do not sum to 1")
+
+        if reference is not None:
+            ref_classes = list(getattr(reference, "classes_", []))
+            if [str(c) for c in classes] != [str(c) for c in ref_classes]:
+                raise ValueError(f"classes {classes} differ from the live model's {ref_classes}")
+            new = np.asarray(classes)[proba.argmax(axis=1)]
+            old = np.asarray(ref_classes)[np.asarray(reference.predict_proba(canary)).argmax(axis=1)]
+            report["agreement"] = round(float((new == old).mean()), 4) if len(canary) else 1.0
+            if min_agreement is not None and report["agreement"] < min_agreement:
+                raise ValueError(
+                    f"agrees with the live model on {report['agreement']:.1%} of the canary "
+                    f"(minimum {min_agreement:.1%})"
+                )
+        report["ok"] = True
+    except Exception as e:  # noqa: BLE001  (any failure rejects the candidate)
+        report["error"] = f"{type(e).__name__}: {e}"
+    return report
+
+
+class ModelManager:
+    """
+    Owner of the live model. `current` is always a complete, validated
+    LoadedModel; reading it needs no lock.
+    """
+
+    def __init__(self, path: str = scoring.MODEL_PATH, canary_path: Optional[str] = None,
+                 min_agreement: Optional[float] = None):
+        self.path = path
+        self.canary_path = canary_path or os.environ.get(CANARY_ENV)
+        self.min_agreement = min_agreement
+        self._lock = threading.Lock()
+        self._reloading = threading.Lock()  # one reload at a time
+        self._canary: Optional[pd.DataFrame] = None
+        self._listeners: List[Callable[[LoadedModel], None]] = []
+        self._events = collections.deque(maxlen=50)
+        self._watcher: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._stat = self._artifact_stat()
+
+        # The first model only needs to load; there is nothing to compare it with
+        model = scoring.load_model(path)
+        validation = validate_model(model, self.canary(model))
+        self.current = LoadedModel(model, path, scoring.model_version(path), validation)
+        self._event("loaded", self.current.version, validation)
+
+    # ---------- canary ----------
+
+    def note_batch(self, df: pd.DataFrame) -> None:
+        """
+        Remember the first production batch of at least CANARY_ROWS flows as
+        the canary (if none is configured); smaller batches are ignored.
+        """
+        if self._canary is None and self.canary_path is None and len(df) >= CANARY_ROWS:
+            self._canary = scoring.prepare_feature_frame(df.head(CANARY_ROWS)).copy()
+
+    def canary(self, model=None) -> pd.DataFrame:
+        if self._canary is not None:
+            return self._canary
+        if self.canary_path is not None:
+            self._canary = scoring.prepare_feature_frame(pd.read_csv(self.canary_path, nrows=CANARY_ROWS))
+            return self._canary
+        # Synthetic rows over the model's own feature names (not kept: a real batch replaces them)
+        model = model if model is not None else self.current.model
+        names = list(getattr(model, "feature_names_in_", []))
+        rng = np.random.default_rng(0)
+        return pd.DataFrame(rng.integers(0, 3, size=(32, len(names))).astype(np.float64), columns=names)
+
+    # ---------- reload ----------
+
+    def add_listener(self, fn: Callable[[LoadedModel], None]) -> None:
+        """Call `fn(snapshot)` after every swap (and once now with the live model)."""
+        self._listeners.append(fn)
+        fn(self.current)
+
+    def reload(self, wait: bool = False, force: bool = False) -> Optional[Dict[str, Any]]:
+        """
+        Load, warm, validate and swap in the artifact at `path` on a background
+        thread (returns immediately; `wait=True` returns the outcome event).
+        An unchanged artifact is skipped unless `force` is set.
+        """
+        if wait:
+            return self._reload(force)
+        threading.Thread(target=self._reload, args=(force,), name="model-reload", daemon=True).start()
+        return None
+
+    def _reload(self, force: bool) -> Dict[str, Any]:
+        with self._reloading:
+            self._stat = self._artifact_stat()
+            version = None
+            try:
+                version = scoring.model_version(self.path)
+                if version == self.current.version and not force:
+                    return self._event("unchanged", version)
+                model = scoring.load_model(self.path)
+            except Exception as e:  # noqa: BLE001
+                return self._event("rejected", version, {"error": f"{type(e).__name__}: {e}"})
+
+            live = self.current
+            validation = validate_model(model, self.canary(live.model), live.model, self.min_agreement)
+            if not validation["ok"]:
+                return self._event("rejected", version, validation)
+
+            # Atomic swap: requests that already hold `live` keep using it
+            self.current = LoadedModel(model, self.path, version, validation)
+            for fn in list(self._listeners):
+                try:
+                    fn(self.current)
+                except Exception:  # noqa: BLE001  (a listener must not undo the swap)
+                    pass
+            return self._event("swapped", version, validation)
+
+    # ---------- watching ----------
+
+    def _artifact_stat(self):
+        try:
+            st = os.stat(self.path)
+            return st.st_size, st.st_mtime_ns
+        except OSError:
+            return None
+
+    def watch(self, poll_s: float = DEFAULT_POLL_S) -> None:
+        """Reload automatically when the artifact changes (idempotent)."""
+        if self._watcher is not None:
+            return
+        self._watcher = threading.Thread(target=self._watch, args=(poll_s,), name="model-watch", daemon=True)
+        self._watcher.start()
+
+    def _watch(self, poll_s: float) -> None:
+        seen = self._stat
+        while not self._stop.wait(poll_s):
+            stat = self._artifact_stat()
+            if stat is None or stat == self._stat:
+                seen = stat
+                continue
+            if stat == seen:  # changed, and unchanged for a whole interval since
+                self._reload(force=False)
+            seen = stat
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # ---------- status ----------
+
+    def _event(self, kind: str, version: Optional[str], detail: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        event = {"time": time.time(), "event": kind, "version": version}
+        if detail:
+            event.update({k: detail.get(k) for k in ("error", "agreement", "latency_ms") if k in detail})
+        with self._lock:
+            self._events.append(event)
+        return event
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Load / swap / rejection history, newest first."""
+        with self._lock:
+            return list(reversed(self._events))
+
+    def status(self) -> Dict[str, Any]:
+        live = self.current
+        return {
+            "path": live.path,
+            "version": live.version,
+            "loaded_at": live.loaded_at,
+            "canary_rows": live.validation.get("rows"),
+            "canary_latency_ms": live.validation.get("latency_ms"),
+            "watching": self._watcher is not None and not self._stop.is_set(),
+            "reloading": self._reloading.locked(),
+        }
@@ -0,0 +1,161 @@
+# results_export.py
+"""
+SentinelSecure – Streaming export of Bulk Analysis results
+
+The results frame is never turned into one big CSV string. An export walks
+the frame in row chunks and streams each chunk through the chosen writer:
+
+- "csv"      plain CSV
+- "csv.gz"   gzip-compressed CSV (standard library)
+- "csv.zst"  zstd-compressed CSV (needs the optional `zstandard` package)
+- "parquet"  Parquet, one row group per chunk (needs the optional `pyarrow`)
+
+so the frame is never encoded in one piece. An "intrusions only" export
+filters each chunk as it goes. Formats whose optional package is missing
+are simply not offered.
+
+Streamlit's download button needs the whole payload as one bytes object,
+which it keeps for the download: export_bytes() encodes into a spooled
+temporary file (on disk past EXPORT_SPOOL_BYTES) and reads it back once,
+so peak memory is the frame plus ONE encoded copy plus one chunk. The
+batch scorer writes straight to its output file and holds no copy.
+"""
+
+import gzip
+import tempfile
+from typing import BinaryIO, Dict, Iterator, Optional
+
+import pandas as pd
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional
+    pyarrow = None
+
+# Rows per streamed chunk
+EXPORT_CHUNK_ROWS = 50_000
+
+# export_bytes() output kept in memory up to this size, then spooled to disk
+EXPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+EXPORT_FORMATS: Dict[str, Dict[str, str]] = {
+    "csv": {"label": "CSV", "mime": "text/csv"},
+    "csv.gz": {"label": "CSV (gzip)", "mime": "application/gzip"},
+    "csv.zst": {"label": "CSV (zstd)", "mime": "application/zstd"},
+    "parquet": {"label": "Parquet", "mime": "application/vnd.apache.parquet"},
+}
+
+
+def available_formats() -> Dict[str, Dict[str, str]]:
+    """Export formats usable in this environment (optional packages installed)."""
+    formats = dict(EXPORT_FORMATS)
+    if zstandard is None:
+        formats.pop("csv.zst")
+    if pyarrow is None:
+        formats.pop("parquet")
+    return formats
+
+
+def iter_chunks(results: pd.DataFrame, intrusions_only: bool = False,
+                chunk_rows: int = EXPORT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """Row chunks of `results` (views where possible), optionally only intrusion rows."""
+    for start in range(0, len(results), chunk_rows):
+        chunk = results.iloc[start:start + chunk_rows]
+        if intrusions_only and "label" in chunk.columns:
+            chunk = chunk[chunk["label"] == "Intrusion"]
+        yield chunk
+
+
+class ExportWriter:
+    """
+    Incremental writer for one export: feed it result chunks with `write()`
+    (e.g. as they are scored) and `close()` it – or use it as a context manager.
+    `template` gives the Parquet schema if no chunk is ever written.
+    """
+
+    def __init__(self, fmt: str, out: BinaryIO, template: Optional[pd.DataFrame] = None):
+        if fmt not in available_formats():
+            raise ValueError(f"Export format {fmt!r} is not available (choose from {list(available_formats())})")
+        self.fmt = fmt
+        self.out = out
+        self.template = template
+        self.rows = 0
+        self._header = True
+        self._parquet = None
+        self._stream = None
+        if fmt == "csv.gz":
+            self._stream = gzip.GzipFile(fileobj=out, mode="wb", compresslevel=1)
+        elif fmt == "csv.zst":
+            self._stream = zstandard.ZstdCompressor(level=3).stream_writer(out, closefd=False)
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.fmt == "parquet":
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pyarrow.parquet.ParquetWriter(self.out, table.schema)
+            elif table.schema != self._parquet.schema:
+                table = table.cast(self._parquet.schema)
+            self._parquet.write_table(table)
+        elif not (chunk.empty and not self._header):
+            sink = self._stream or self.out
+            sink.write(chunk.to_csv(index=False, header=self._header).encode("utf-8"))
+            self._header = False
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        if self.fmt == "parquet":
+            if self._parquet is None and self.template is not None:  # still a valid (empty) file
+                self._parquet = pyarrow.parquet.ParquetWriter(
+                    self.out, pyarrow.Schema.from_pandas(self.template, preserve_index=False)
+                )
+            if self._parquet is not None:
+                self._parquet.close()
+                self._parquet = None
+        elif self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def __enter__(self) -> "ExportWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_export(results: pd.DataFrame, fmt: str, out: BinaryIO, intrusions_only: bool = False,
+                 chunk_rows: int = EXPORT_CHUNK_ROWS) -> None:
+    """Stream `results` to the binary file object `out` in format `fmt`."""
+    with ExportWriter(fmt, out, template=results) as writer:
+        for chunk in iter_chunks(results, intrusions_only, chunk_rows):
+            writer.write(chunk)
+
+
+def export_bytes(results: pd.DataFrame, fmt: str, intrusions_only: bool = False,
+                 chunk_rows: int = EXPORT_CHUNK_ROWS) -> bytes:
+    """The whole export as bytes, read back once from a spooled temporary file."""
+    with tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_BYTES) as fh:
+        write_export(results, fmt, fh, intrusions_only, chunk_rows)
+        fh.seek(0)
+        return fh.read()
+
+
+def export_file_name(fmt: str, intrusions_only: bool = False, stem: str = "sentinelsecure_bulk_results") -> str:
+    return f"{stem}{'_intrusions' if intrusions_only else ''}.{fmt}"
+
+
+def export_mime(fmt: str) -> Optional[str]:
+    return EXPORT_FORMATS.get(fmt, {}).get("mime")
+
+
+def format_for_path(path: str) -> str:
+    """Export format named by a file's extension (e.g. 'out.csv.gz' -> 'csv.gz'); CSV if unknown."""
+    for fmt in sorted(EXPORT_FORMATS, key=len, reverse=True):
+        if path.lower().endswith("." + fmt):
+            return fmt
+    return "csv"
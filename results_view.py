@@ -0,0 +1,149 @@
+# results_view.py
+"""
+SentinelSecure – Server-side filter / sort / pagination over bulk results
+
+The Detailed Results table used to ship the whole results frame to the
+browser on every rerun. A ResultsView keeps the frame on the server and
+answers page queries instead:
+
+- label / recommended_action are small integer codes (the categorical
+  codes scoring already stores, else factorized once), score a float
+  array, so filters are vectorized NumPy masks; coded columns sort in
+  category order (actions by severity)
+- sort orders are argsorts computed on first use per (column, direction)
+  and reused for every later page, filter change or rerun
+- a query returns only the requested page of rows (an .iloc gather)
+
+Rows with a missing sort value (NaN) always sort last.
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+CATEGORICAL_COLUMNS = ("label", "recommended_action")
+
+
+class ResultsView:
+    """
+    Read-only view over one scored results frame (treat the frame as immutable).
+    """
+
+    def __init__(self, results: pd.DataFrame):
+        self.results = results
+        self._codes: Dict[str, np.ndarray] = {}
+        self._vocab: Dict[str, List[str]] = {}
+        self._present: Dict[str, np.ndarray] = {}
+        for column in results.columns:
+            values = results[column]
+            if isinstance(values.dtype, pd.CategoricalDtype):  # already coded, nothing to factorize
+                codes, vocab = values.cat.codes.to_numpy(), [str(c) for c in values.cat.categories]
+            elif column in CATEGORICAL_COLUMNS:
+                codes, uniques = pd.factorize(values, sort=True)
+                vocab = [str(u) for u in uniques]
+            else:
+                continue
+            self._codes[column] = codes
+            self._vocab[column] = vocab
+            self._present[column] = np.bincount(codes[codes >= 0], minlength=len(vocab)) > 0
+        self._score = (
+            results["score"].to_numpy(dtype=np.float64, na_value=np.nan)
+            if "score" in results.columns else None
+        )
+        self._orders: Dict[Tuple[str, bool], np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def vocabulary(self, column: str) -> List[str]:
+        """Values of a coded column that occur in the results."""
+        vocab, present = self._vocab.get(column, []), self._present.get(column, ())
+        return [v for v, seen in zip(vocab, present) if seen]
+
+    def sortable_columns(self) -> List[str]:
+        numeric = self.results.select_dtypes(include=["number", "bool"]).columns
+        return [c for c in self.results.columns if c in numeric or c in self._codes]
+
+    def score_bounds(self) -> Tuple[float, float]:
+        if self._score is None or not np.isfinite(self._score).any():
+            return 0.0, 1.0
+        return float(np.nanmin(self._score)), float(np.nanmax(self._score))
+
+    # ---------- sorting ----------
+
+    def sort_order(self, column: str, descending: bool = False) -> np.ndarray:
+        """Row positions ordered by `column` (stable, NaN last); cached per direction."""
+        cached = self._orders.get((column, descending))
+        if cached is not None:
+            return cached
+        if column in self._codes:
+            key = self._codes[column].astype(np.float64)
+            key[key < 0] = np.nan  # missing category
+        else:
+            key = self.results[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        # -NaN is still NaN, so negating keeps missing values at the end
+        order = np.argsort(-key if descending else key, kind="stable")
+        self._orders[(column, descending)] = order
+        return order
+
+    # ---------- queries ----------
+
+    def _mask(self, labels: Optional[Sequence[str]], actions: Optional[Sequence[str]],
+              min_score: Optional[float], max_score: Optional[float]) -> Optional[np.ndarray]:
+        mask = None
+
+        def both(m: np.ndarray) -> np.ndarray:
+            return m if mask is None else mask & m
+
+        for column, wanted in (("label", labels), ("recommended_action", actions)):
+            if wanted is None or column not in self._codes:
+                continue
+            vocab = self._vocab[column]
+            codes = [vocab.index(str(v)) for v in wanted if str(v) in vocab]
+            mask = both(np.isin(self._codes[column], codes))
+        if self._score is not None:
+            if min_score is not None:
+                mask = both(self._score >= min_score)
+            if max_score is not None:
+                mask = both(self._score <= max_score)
+        return mask
+
+    def query(
+        self,
+        labels: Optional[Sequence[str]] = None,
+        actions: Optional[Sequence[str]] = None,
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        sort_by: Optional[str] = None,
+        descending: bool = False,
+        page: int = 0,
+        page_size: int = 50,
+    ) -> Dict[str, Any]:
+        """
+        One page of matching rows (None = no filter / original order).
+        Returns {"total", "page", "page_size", "pages", "rows"}; `page` is
+        0-based and clamped to the last page.
+        """
+        mask = self._mask(labels, actions, min_score, max_score)
+        if sort_by is not None:
+            order = self.sort_order(sort_by, descending)
+            selected = order if mask is None else order[mask[order]]
+        elif mask is not None:
+            selected = np.flatnonzero(mask)
+        else:
+            selected = None
+
+        total = len(self.results) if selected is None else len(selected)
+        page_size = max(1, int(page_size))
+        pages = max(1, -(-total // page_size))
+        page = min(max(0, int(page)), pages - 1)
+        lo, hi = page * page_size, min(total, (page + 1) * page_size)
+        positions = np.arange(lo, hi) if selected is None else selected[lo:hi]
+        return {
+            "total": total,
+            "page": page,
+            "page_size": page_size,
+            "pages": pages,
+            "rows": self.results.iloc[positions],
+        }
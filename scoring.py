@@ -0,0 +1,298 @@
+# scoring.py
+"""
+SentinelSecure – Model scoring helpers (no Streamlit)
+
+Everything needed to turn a frame of flows into decisions, shared by the
+dashboard (app.py) and the headless batch scorer (batch_score.py) so both
+produce identical labels, scores and actions:
+
+- load_model / model_version: the trained artifact and a short content hash of it
+- prepare_feature_frame: the feature handling the model was trained with
+- build_sweep_grid: the what-if simulator's grid of variations of one flow
+- normalize_label / recommend_action: 'Intrusion' / 'Benign' and the
+  BLOCK / QUARANTINE / ALERT / ALLOW response tiers
+- intrusion_proba / score_features / run_model_on_df: batched scoring of a DataFrame
+  (outputs attached to the input without copying it; label / action /
+  stage / tier as int8-coded categoricals, float32 scores)
+- ledger_batch: the columnar threat-ledger batch (plus idempotency keys)
+  for a frame of scored intrusions
+"""
+
+import hashlib
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import joblib
+import numpy as np
+import pandas as pd
+
+MODEL_PATH = "best_threshold.pkl"
+
+# Columns run_model_on_df adds next to the input features
+RESULT_COLUMNS = ("prediction_raw", "label", "score", "recommended_action", "scored_by", "tier")
+
+# Categories of the coded result columns (int8 codes; strings only when displayed)
+LABELS = ("Benign", "Intrusion")
+ACTIONS = ("BLOCK", "QUARANTINE", "ALERT", "ALLOW (monitor)", "ALLOW")
+STAGES = ("fast", "full")
+
+# Columns never fed to the model
+NON_FEATURE_COLUMNS = ("label", "num_outbound_cmds")
+
+
+def load_model(path: str = MODEL_PATH):
+    """Load the trained model artifact."""
+    return joblib.load(path)
+
+
+def model_version(path: str = MODEL_PATH) -> str:
+    """
+    Short content hash of the model file. Part of every ledger idempotency
+    key, so the same flow scored by a retrained model is a new incident.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def normalize_label(raw_label):
+    """
+    Convert whatever the model outputs into either:
+    - 'Intrusion'
+    - 'Benign'
+
+    Handles:
+    - 0 / 1
+    - strings like 'normal', 'attack', etc.
+    """
+    # Numeric
+    if isinstance(raw_label, (int, float, np.integer, np.floating)):
+        return "Intrusion" if int(raw_label) == 1 else "Benign"
+
+    s = str(raw_label).strip().lower()
+    if s in ["1", "attack", "intrusion", "malicious", "anomaly", "bad"]:
+        return "Intrusion"
+    if s in ["0", "normal", "benign", "good"]:
+        return "Benign"
+
+    # Fallback: treat unknown as Benign (safer for demo)
+    return "Benign"
+
+
+def recommend_action(label, score=None):
+    """
+    Given:
+      - label: 'Intrusion' or 'Benign'
+      - score: confidence (0–1) if available
+    Returns: text like BLOCK / QUARANTINE / ALERT / ALLOW
+    """
+    if label == "Intrusion":
+        if score is not None:
+            if score >= 0.9:
+                return "BLOCK"
+            elif score >= 0.7:
+                return "QUARANTINE"
+            else:
+                return "ALERT"
+        else:
+            return "BLOCK"
+    else:  # Benign
+        if score is not None and score >= 0.9:
+            return "ALLOW"
+        else:
+            return "ALLOW (monitor)"
+
+
+def prepare_feature_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Build the feature-only DataFrame the model expects:
+    - Drops the training 'label' column and 'num_outbound_cmds' (model was trained without it)
+    - Keeps only numeric columns – model is fully numerical
+
+    One column selection (`df` itself if every column is a feature), so the
+    feature data is not copied again.
+    """
+    features = [
+        col for col, dtype in df.dtypes.items()
+        if col not in NON_FEATURE_COLUMNS
+        and pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    ]
+    return df if len(features) == len(df.columns) else df[features]
+
+
+def build_sweep_grid(base_row: pd.Series, sweep: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Build a dense what-if grid around `base_row`.
+
+    `sweep` maps one or two feature names to 1-D arrays of values. The grid is
+    the cartesian product of those values (one row per point); every other
+    column keeps the base flow's value.
+    """
+    names = list(sweep)
+    mesh = np.meshgrid(*[np.asarray(sweep[n]) for n in names], indexing="ij")
+    n_points = mesh[0].size
+
+    grid = {col: np.full(n_points, base_row[col]) for col in base_row.index}
+    for name, values in zip(names, mesh):
+        grid[name] = values.ravel()
+    return pd.DataFrame(grid, columns=list(base_row.index))
+
+
+def intrusion_proba(model, feature_df: pd.DataFrame) -> np.ndarray:
+    """
+    Probability of the 'Intrusion' class for every row of a prepared feature frame,
+    computed with ONE predict_proba call.
+    """
+    proba = model.predict_proba(feature_df)
+    classes = list(getattr(model, "classes_", range(proba.shape[1])))
+    intrusion_cols = [i for i, c in enumerate(classes) if normalize_label(c) == "Intrusion"]
+    col = intrusion_cols[0] if intrusion_cols else proba.shape[1] - 1
+    return proba[:, col]
+
+
+def action_codes(intrusion: np.ndarray, scores: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    recommend_action for whole arrays: ACTIONS codes (int8) from a boolean
+    intrusion mask and the confidence scores (None = no probabilities).
+    """
+    code = {action: i for i, action in enumerate(ACTIONS)}
+    if scores is None:
+        return np.where(intrusion, code["BLOCK"], code["ALLOW (monitor)"]).astype(np.int8)
+    # Compare in the scores' own dtype, as recommend_action does with a NumPy
+    # scalar (NEP 50): widening a float32 0.9 to float64 gives 0.8999999762
+    s = np.asarray(scores)
+    if not np.issubdtype(s.dtype, np.floating):
+        s = s.astype(np.float64)
+    high, mid = s.dtype.type(0.9), s.dtype.type(0.7)
+    return np.select(
+        [intrusion & (s >= high), intrusion & (s >= mid), intrusion, s >= high],
+        [code["BLOCK"], code["QUARANTINE"], code["ALERT"], code["ALLOW"]],
+        default=code["ALLOW (monitor)"],
+    ).astype(np.int8)
+
+
+def score_features(model, feature_df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Decisions for a prepared feature frame, one entry per row:
+    prediction_raw, label, recommended_action and scored_by (None unless the
+    model is a cascade) as categoricals, score as float32 (None if the model
+    has no predict_proba).
+    """
+    # --- Probability / confidence (if available) ---
+    # A cascade (cascade.py) also reports which stage decided each flow
+    proba = forwarded = None
+    try:
+        staged = getattr(model, "predict_proba_staged", None)
+        if staged is not None:
+            proba, forwarded = staged(feature_df)
+        else:
+            proba = model.predict_proba(feature_df)
+    except Exception:
+        pass
+
+    # --- Prediction ---
+    # For these classifiers predict() is the argmax of predict_proba, so reuse it
+    classes = getattr(model, "classes_", None)
+    if proba is not None and classes is not None:
+        preds = pd.Categorical.from_codes(proba.argmax(axis=1), categories=pd.Index(classes))
+    else:
+        preds = pd.Categorical(np.asarray(model.predict(feature_df)))
+
+    # --- Normalize labels to 'Intrusion' / 'Benign' (once per class) + recommended action ---
+    is_intrusion = np.array([normalize_label(c) == "Intrusion" for c in preds.categories], dtype=bool)
+    intrusion = is_intrusion[preds.codes] if len(is_intrusion) else np.zeros(len(preds), dtype=bool)
+    scores = proba.max(axis=1).round(3) if proba is not None else None
+
+    return {
+        "prediction_raw": preds,
+        "score": scores.astype(np.float32, copy=False) if scores is not None else None,
+        "label": pd.Categorical.from_codes(intrusion.astype(np.int8), categories=LABELS),
+        "recommended_action": pd.Categorical.from_codes(action_codes(intrusion, scores), categories=ACTIONS),
+        "scored_by": (
+            pd.Categorical.from_codes(np.asarray(forwarded).astype(np.int8), categories=STAGES)
+            if forwarded is not None else None
+        ),
+    }
+
+
+def run_model_on_df(model, df: pd.DataFrame, shadow=None) -> pd.DataFrame:
+    """
+    Core function:
+    - Takes a DataFrame with (optionally) a 'label' column from training
+    - Drops non-feature columns like 'label' and 'num_outbound_cmds'
+    - Runs model.predict_proba once (model.predict if probabilities are unavailable)
+    - Adds columns: prediction_raw, label, score, recommended_action
+      (+ scored_by for a cascade, tier for a latency-tiered model)
+
+    The result shares the input's columns (a shallow copy with the outputs
+    attached), so the input must be treated as read-only – as uploads are.
+
+    With a `shadow` scorer (shadow.py) a candidate model scores the same
+    feature matrix in the background and is compared against these results.
+    """
+    # Shallow: the feature data is shared with `df`, only the new columns are allocated
+    result = df.copy(deep=False)
+
+    # Build feature-only DataFrame for the model
+    feature_df = prepare_feature_frame(df)
+
+    pending = shadow.start(feature_df) if shadow is not None else None
+    t0 = time.perf_counter()
+    scored = score_features(model, feature_df)
+    elapsed = time.perf_counter() - t0
+    if pending is not None:
+        shadow.finish(pending, scored, elapsed)
+
+    for column in ("prediction_raw", "score", "label", "recommended_action", "scored_by"):
+        if scored[column] is not None:
+            result[column] = scored[column]
+    tier = getattr(model, "tier", None)  # latency_tiers.TieredModel
+    if tier is not None:
+        names = list(getattr(model, "tier_names", [tier]))  # same categories for every tier's chunks
+        result["tier"] = pd.Categorical.from_codes(
+            np.full(len(df), names.index(tier), dtype=np.int8), categories=names,
+        )
+    return result
+
+
+def ledger_batch(
+    intrusions: pd.DataFrame,
+    key_fn: Optional[Callable[[Dict[str, Any], Optional[str]], str]] = None,
+    version: Optional[str] = None,
+) -> Tuple[Dict[str, List[Any]], Optional[List[str]]]:
+    """
+    Columnar ledger.add_logs batch for scored intrusion rows (flow_index is
+    the row's index label), and – given ledger.idempotency_key as `key_fn` –
+    one idempotency key per row so re-committing the same results is a no-op.
+    """
+    features_only = intrusions.drop(
+        columns=[c for c in RESULT_COLUMNS if c in intrusions.columns]
+    )
+    batch = {
+        "flow_index": [int(i) for i in intrusions.index],
+        "label": intrusions["label"].tolist(),
+        "recommended_action": intrusions["recommended_action"].tolist(),
+        "confidence": (
+            # float32 scores widened to float64 would store 0.8999999761581421 for 0.9
+            intrusions["score"].to_numpy(dtype=np.float64).round(3).tolist()
+            if "score" in intrusions.columns
+            else [None] * len(intrusions)
+        ),
+        "features": features_only.to_dict("records"),
+    }
+    if "tier" in intrusions.columns:  # latency tier that produced the decision
+        batch["tier"] = intrusions["tier"].tolist()
+    if key_fn is None:
+        return batch, None
+    keys = [
+        key_fn(
+            {"flow_index": i, "label": lbl, "recommended_action": act, "features": feats},
+            version,
+        )
+        for i, lbl, act, feats in zip(
+            batch["flow_index"], batch["label"], batch["recommended_action"], batch["features"],
+        )
+    ]
+    return batch, keys
@@ -0,0 +1,186 @@
+# shadow.py
+"""
+SentinelSecure – Shadow scoring of a candidate model
+
+To roll out a new artifact (cybersecure_xgb_binary.pkl, or a retrained
+model) without risk, a ShadowScorer scores every batch the production model
+scores – the SAME prepared feature matrix, no second feature build – and
+compares the two:
+
+- the candidate runs on its own background thread, started before the
+  production model so both overlap; the production path never waits for it
+- label disagreements, split into candidate misses (production: Intrusion,
+  candidate: Benign) and extra alerts (the reverse)
+- recommended-action flips, counted per (production -> candidate) pair
+- latency of both models per batch (ms per 1k flows, batch p50 / p95)
+
+If the candidate falls behind (more than `max_pending` batches waiting) new
+batches are skipped and counted rather than queued, so shadowing never grows
+memory or delays users. Results never reach the analyst: they only feed
+report(), shown on the Model & Evaluation page.
+"""
+
+import collections
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import scoring
+
+SHADOW_MODEL_ENV = "SENTINEL_SHADOW_MODEL"
+DEFAULT_SHADOW_MODEL = "cybersecure_xgb_binary.pkl"
+
+# Per-batch latency samples kept for percentiles
+LATENCY_HISTORY = 500
+
+
+class ShadowScorer:
+    """
+    Candidate model shadowing production scoring. Thread-safe; one instance
+    is shared by all sessions and bulk jobs. `enabled` is the on/off switch
+    read by callers.
+    """
+
+    def __init__(self, candidate, name: str = "candidate", max_pending: int = 2, enabled: bool = False):
+        self.candidate = candidate
+        self.name = name
+        self.max_pending = max_pending
+        self.enabled = enabled
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._batches = 0
+            self._flows = 0
+            self._skipped = 0
+            self._errors = 0
+            self._disagree = 0
+            self._misses = 0
+            self._extra = 0
+            self._score_delta = 0.0
+            self._flips: Dict[tuple, int] = collections.Counter()
+            self._prod_s = 0.0
+            self._cand_s = 0.0
+            self._prod_ms = collections.deque(maxlen=LATENCY_HISTORY)
+            self._cand_ms = collections.deque(maxlen=LATENCY_HISTORY)
+            self._since = time.time()
+
+    # ---------- scoring hooks (called by scoring.run_model_on_df) ----------
+
+    def start(self, feature_df: pd.DataFrame) -> Optional[Future]:
+        """Start scoring `feature_df` with the candidate; None if the batch is skipped."""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._skipped += 1
+                return None
+            self._pending += 1
+        return self._pool.submit(self._score, feature_df)
+
+    def _score(self, feature_df: pd.DataFrame):
+        t0 = time.perf_counter()
+        scored = scoring.score_features(self.candidate, feature_df)
+        return scored, time.perf_counter() - t0
+
+    def finish(self, pending: Optional[Future], production: Dict[str, Any], production_s: float) -> None:
+        """Compare against the production decisions once the candidate is done (never blocks)."""
+        if pending is not None:
+            pending.add_done_callback(lambda f: self._record(f, production, production_s))
+
+    def _record(self, future: Future, production: Dict[str, Any], production_s: float) -> None:
+        try:
+            candidate, candidate_s = future.result()
+        except Exception:  # noqa: BLE001  (a broken candidate must not affect production)
+            with self._lock:
+                self._pending -= 1
+                self._errors += 1
+            return
+
+        prod_label = np.asarray(production["label"])
+        cand_label = np.asarray(candidate["label"])
+        prod_action = np.asarray(production["recommended_action"])
+        cand_action = np.asarray(candidate["recommended_action"])
+        disagree = prod_label != cand_label
+        misses = int((disagree & (prod_label == "Intrusion")).sum())
+        flipped = prod_action != cand_action
+        flips = collections.Counter(zip(prod_action[flipped].tolist(), cand_action[flipped].tolist()))
+        delta = 0.0
+        if production["score"] is not None and candidate["score"] is not None:
+            delta = float(np.abs(np.asarray(production["score"], dtype=np.float64)
+                                 - np.asarray(candidate["score"], dtype=np.float64)).sum())
+
+        n = len(prod_label)
+        with self._lock:
+            self._pending -= 1
+            self._batches += 1
+            self._flows += n
+            self._disagree += int(disagree.sum())
+            self._misses += misses
+            self._extra += int(disagree.sum()) - misses
+            self._score_delta += delta
+            self._flips.update(flips)
+            self._prod_s += production_s
+            self._cand_s += candidate_s
+            if n:
+                self._prod_ms.append(1e6 * production_s / n)
+                self._cand_ms.append(1e6 * candidate_s / n)
+
+    # ---------- reporting ----------
+
+    def report(self) -> Dict[str, Any]:
+        """Cumulative comparison since the last reset()."""
+        with self._lock:
+            flows = self._flows
+
+            def rate(count: int) -> float:
+                return count / flows if flows else 0.0
+
+            def latency(total_s: float, samples) -> Dict[str, Optional[float]]:
+                per_1k = np.asarray(samples, dtype=np.float64)
+                return {
+                    "ms_per_1k": round(1e6 * total_s / flows, 3) if flows else None,
+                    "p50_ms_per_1k": round(float(np.percentile(per_1k, 50)), 3) if per_1k.size else None,
+                    "p95_ms_per_1k": round(float(np.percentile(per_1k, 95)), 3) if per_1k.size else None,
+                }
+
+            return {
+                "candidate": self.name,
+                "enabled": self.enabled,
+                "since": self._since,
+                "batches": self._batches,
+                "flows": flows,
+                "pending": self._pending,
+                "skipped_batches": self._skipped,
+                "errors": self._errors,
+                "disagreement_rate": rate(self._disagree),
+                "disagreements": self._disagree,
+                "candidate_misses": self._misses,
+                "candidate_extra_alerts": self._extra,
+                "mean_score_delta": self._score_delta / flows if flows else 0.0,
+                "action_flips": sum(self._flips.values()),
+                "action_flip_rate": rate(sum(self._flips.values())),
+                "flips": [
+                    {"production": p, "candidate": c, "flows": k}
+                    for (p, c), k in self._flips.most_common()
+                ],
+                "latency": {
+                    "production": latency(self._prod_s, self._prod_ms),
+                    "candidate": latency(self._cand_s, self._cand_ms),
+                },
+            }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False)
+
+
+def load_shadow(path: Optional[str] = None, enabled: bool = False) -> ShadowScorer:
+    """ShadowScorer for the candidate at `path` ($SENTINEL_SHADOW_MODEL, else the light XGBoost model)."""
+    path = path or os.environ.get(SHADOW_MODEL_ENV) or DEFAULT_SHADOW_MODEL
+    return ShadowScorer(scoring.load_model(path), name=os.path.basename(path), enabled=enabled)
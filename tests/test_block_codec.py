@@ -0,0 +1,143 @@
+# tests/test_block_codec.py
+"""
+Pins the ledger's block encodings (block_codec.py). Existing ledgers are
+verified by re-hashing their blocks, so ANY change to these bytes breaks
+verification of chains already on disk: change the encoding version instead.
+"""
+
+import hashlib
+import json
+import math
+
+import numpy as np
+import pytest
+
+from block_codec import (
+    ENCODING_LEGACY, ENCODING_V2, FEATURE_SCHEMA_V2, encode_features_v2, encode_payload_v2,
+    features_digest, hash_core, pack_features, unpack_features,
+)
+
+PREV = "ab" * 32
+
+FEATURES = {
+    "duration": 0,                  # int
+    "protocol_type": 1,
+    "src_bytes": 181.0,             # float
+    "dst_bytes": 5450.5,
+    "serror_rate": float("nan"),    # NaN
+    "service": "http",              # non-numeric -> JSON rest
+    "land": True,                   # bool is not an int here
+    "num_root": 2 ** 60,            # beyond float64's exact integers
+    "extra_field": "x",             # off-schema
+}
+
+ENTRY = {
+    "flow_index": 7,
+    "label": "Intrusion",
+    "recommended_action": "BLOCK",
+    "confidence": 0.975,
+    "features": FEATURES,
+}
+
+
+def _core(data, index=1, timestamp=1700000000.25, prev_hash=PREV):
+    return {"index": index, "timestamp": timestamp, "event_type": "intrusion_log",
+            "data": data, "prev_hash": prev_hash}
+
+
+def _same_row(a, b):
+    assert set(a) == set(b)
+    for name in a:
+        if isinstance(a[name], float) and math.isnan(a[name]):
+            assert math.isnan(b[name])
+        else:
+            assert b[name] == a[name] and type(b[name]) is type(a[name])
+
+
+# -------------------------------------------------------
+# Golden hashes (computed when v2 shipped; must never change)
+# -------------------------------------------------------
+
+def test_v2_block_hash_is_stable():
+    assert hash_core(_core(ENTRY), ENCODING_V2) == (
+        "63eec5b5a1593ebf2dabbab0a4de8b1395284d86cd0658187a287897ebae5eba"
+    )
+
+
+def test_v2_features_digest_is_stable():
+    assert features_digest(FEATURES) == "b885139e4c91f8edce6b3c4066638464e31b64e9f6e159fc068d7efb5dcbb4e2"
+
+
+def test_v2_encoding_without_features_matches_spec():
+    core = _core({"label": "Benign"}, index=2, timestamp=1700000001.5, prev_hash="cd" * 32)
+    expected = b"SSv2|2|1700000001.5|intrusion_log|" + b"cd" * 32 + b'|N{"label":"Benign"}'
+    assert hash_core(core, ENCODING_V2) == hashlib.sha256(expected).hexdigest()
+    assert hash_core(core, ENCODING_V2) == "5bad91d4572c504168354823138c0614edbda3a63e17e93c137db450ab252a5c"
+
+
+def test_legacy_block_hash_is_sorted_compact_json():
+    core = _core({"label": "Intrusion", "features": {"src_bytes": 181.0, "duration": 0}})
+    expected = json.dumps(core, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    assert hash_core(core) == hash_core(core, ENCODING_LEGACY) == hashlib.sha256(expected).hexdigest()
+
+
+def test_unknown_encoding_is_rejected():
+    with pytest.raises(ValueError):
+        hash_core(_core({}), 3)
+
+
+# -------------------------------------------------------
+# Round trips
+# -------------------------------------------------------
+
+def test_pack_round_trip_keeps_values_and_types():
+    _same_row(FEATURES, unpack_features(*pack_features(FEATURES)))
+
+
+def test_pack_round_trip_all_float_fast_path():
+    row = {name: float(i) + 0.5 for i, name in enumerate(FEATURE_SCHEMA_V2)}
+    mask, packed, extra = pack_features(row)
+    assert mask == b"f" * len(FEATURE_SCHEMA_V2) and extra == {}
+    _same_row(row, unpack_features(mask, packed, extra))
+
+
+def test_round_trip_through_stored_json_keeps_the_hash():
+    # What the ledger does: hash the entry, store it as JSON, re-hash what it reads back
+    stored = json.loads(json.dumps(_core(ENTRY)))
+    assert hash_core(stored, ENCODING_V2) == hash_core(_core(ENTRY), ENCODING_V2)
+    mask, packed, extra = pack_features(FEATURES)
+    assert features_digest(stored["data"]["features"]) == hashlib.sha256(
+        encode_features_v2(mask, packed, extra)
+    ).hexdigest()
+
+
+def test_int_and_float_features_hash_differently():
+    assert features_digest({"duration": 1}) != features_digest({"duration": 1.0})
+
+
+# -------------------------------------------------------
+# NumPy scalars (pandas rows)
+# -------------------------------------------------------
+
+def test_numpy_scalars_hash_like_python_values():
+    numpy_row = {
+        "duration": np.int64(0),
+        "protocol_type": np.int32(1),
+        "src_bytes": np.float64(181.0),
+        "dst_bytes": np.float32(5450.5),
+        "serror_rate": np.float64("nan"),
+        "service": "http",
+        "land": np.bool_(True),
+        "num_root": np.int64(2 ** 60),
+        "extra_field": "x",
+    }
+    assert features_digest(numpy_row) == features_digest(FEATURES)
+    numpy_entry = dict(ENTRY, flow_index=np.int64(7), confidence=np.float64(0.975), features=numpy_row)
+    assert encode_payload_v2(numpy_entry) == encode_payload_v2(ENTRY)
+
+
+def test_float32_values_survive_storage():
+    value = np.float32(0.1)  # not exactly representable: stored as float(value)
+    entry = {"confidence": value, "features": {"src_bytes": value}}
+    stored = json.loads(json.dumps(entry, default=float))
+    assert encode_payload_v2(stored) == encode_payload_v2(entry)
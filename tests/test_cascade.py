@@ -0,0 +1,113 @@
+# tests/test_cascade.py
+"""
+Cascaded inference: the tuned band honours its recall and accuracy targets,
+unreachable targets forward everything, and CascadeModel only sends flows
+inside the band to the full ensemble.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cascade import CascadeModel, tune_band
+
+
+def _flows(n=4000, seed=0):
+    """Labels, a sharp 'full' model and a noisier 'fast' one that is most unsure near 0.5."""
+    rng = np.random.default_rng(seed)
+    y = rng.random(n) < 0.3
+    p_full = np.clip(np.where(y, 0.9, 0.1) + rng.normal(0, 0.15, n), 0, 1)
+    p_fast = np.clip(np.where(y, 0.7, 0.3) + rng.normal(0, 0.2, n), 0, 1)
+    return p_fast, p_full, y
+
+
+def _cascade_rates(report, p_fast, p_full, y):
+    band = (p_fast >= report["low"]) & (p_fast <= report["high"])
+    pred = np.where(band, p_full > 0.5, p_fast > 0.5)
+    return (pred & y).sum() / y.sum(), (pred == y).mean(), band.mean()
+
+
+# -------------------------------------------------------
+# tune_band
+# -------------------------------------------------------
+
+@pytest.mark.parametrize("min_recall", [None, 0.9, 0.95])
+def test_band_honours_min_recall(min_recall):
+    p_fast, p_full, y = _flows()
+    report = tune_band(p_fast, p_full, y, min_recall=min_recall)
+    recall, accuracy, pass_through = _cascade_rates(report, p_fast, p_full, y)
+
+    assert report["target_met"]
+    assert recall >= report["target_recall"] - 1e-4
+    assert accuracy >= report["min_accuracy"] - 1e-4
+    assert report["cascade"]["recall"] == round(recall, 4)
+    assert report["pass_through"] == round(pass_through, 4) < 1.0
+    if min_recall is None:
+        assert report["target_recall"] == report["full"]["recall"]
+
+
+def test_lower_recall_target_forwards_fewer_flows():
+    p_fast, p_full, y = _flows()
+    strict = tune_band(p_fast, p_full, y, min_recall=0.95, max_accuracy_drop=1.0)
+    loose = tune_band(p_fast, p_full, y, min_recall=0.85, max_accuracy_drop=1.0)
+    assert loose["pass_through"] <= strict["pass_through"]
+
+
+def test_band_honours_max_accuracy_drop():
+    # The fast model flags every intrusion but also most benign flows near 0.5:
+    # recall alone needs no forwarding, accuracy does
+    p_fast, p_full, y = _flows(seed=1)
+    p_fast = np.where(y, np.maximum(p_fast, 0.55), p_fast + 0.15).clip(0, 1)
+
+    recall_only = tune_band(p_fast, p_full, y, min_recall=0.9, max_accuracy_drop=1.0)
+    bounded = tune_band(p_fast, p_full, y, min_recall=0.9, max_accuracy_drop=0.0)
+    assert recall_only["pass_through"] < bounded["pass_through"]
+    assert bounded["target_met"]
+    _, accuracy, _ = _cascade_rates(bounded, p_fast, p_full, y)
+    assert accuracy >= bounded["full"]["accuracy"] - 1e-4
+    assert bounded["min_accuracy"] == bounded["full"]["accuracy"]
+
+
+def test_unreachable_target_forwards_everything():
+    p_fast, p_full, y = _flows()
+    report = tune_band(p_fast, p_full, y, min_recall=1.01)
+    assert not report["target_met"]
+    assert (report["low"], report["high"], report["pass_through"]) == (0.0, 1.0, 1.0)
+    assert report["cascade"] == report["full"]
+
+
+# -------------------------------------------------------
+# CascadeModel
+# -------------------------------------------------------
+
+class _Constant:
+    """Stand-in model: P(Intrusion) read from the frame's `p` column."""
+
+    classes_ = np.array(["Benign", "Intrusion"])
+
+    def __init__(self):
+        self.seen = 0
+
+    def predict_proba(self, X):
+        self.seen += len(X)
+        p = X["p"].to_numpy(dtype=np.float32)
+        return np.column_stack([1 - p, p])
+
+
+def test_only_flows_inside_the_band_reach_the_full_model():
+    fast, full = _Constant(), _Constant()
+    X = pd.DataFrame({"p": [0.05, 0.3, 0.5, 0.7, 0.95]})
+    model = CascadeModel(fast, full, 0.2, 0.8)
+    proba, forwarded = model.predict_proba_staged(X)
+    assert forwarded.tolist() == [False, True, True, True, False]
+    assert full.seen == 3 and fast.seen == 5
+    assert proba.dtype == np.float32
+    np.testing.assert_allclose(proba[:, 1], X["p"])
+    assert model.predict(X).tolist() == ["Benign", "Benign", "Benign", "Intrusion", "Intrusion"]
+
+
+def test_non_binary_models_are_rejected():
+    full = _Constant()
+    full.classes_ = np.array(["Benign", "DoS", "Probe"])
+    with pytest.raises(ValueError):
+        CascadeModel(_Constant(), full, 0.2, 0.8)
@@ -0,0 +1,32 @@
+# tests/test_column_profile.py
+"""Per-upload column profile: exact statistics, NaN handling, skipped columns."""
+
+import numpy as np
+import pandas as pd
+
+from column_profile import DISTINCT_CAP, PROFILE_QUANTILES, build_profile, slider_max
+
+
+def test_profile_is_exact():
+    values = np.random.default_rng(0).exponential(100.0, 50_000)
+    profile = build_profile(pd.DataFrame({"src_bytes": values}))["src_bytes"]
+    expected = np.quantile(values, PROFILE_QUANTILES)
+    assert [profile[f"q{int(round(q * 100)):02d}"] for q in PROFILE_QUANTILES] == expected.tolist()
+    assert profile["count"] == values.size and profile["mean"] == values.mean()
+    assert profile["distinct"] == DISTINCT_CAP and profile["distinct_capped"]
+    assert not profile["is_integer"]
+
+
+def test_missing_values_and_non_numeric_columns_are_skipped():
+    df = pd.DataFrame({"count": [1, 2, np.nan, 4], "service": ["http", "ftp", "smtp", "http"]})
+    profile = build_profile(df, columns=["count", "service", "absent"])
+    assert list(profile) == ["count"]
+    stats = profile["count"]
+    assert (stats["count"], stats["min"], stats["max"], stats["distinct"]) == (3, 1.0, 4.0, 3)
+    assert stats["is_integer"] and not stats["distinct_capped"]
+
+
+def test_slider_max_falls_back_to_the_floor():
+    profile = build_profile(pd.DataFrame({"duration": [0.0, 0.0, 0.1]}))
+    assert slider_max(profile, "duration") == 1.0
+    assert slider_max(profile, "absent", floor=5.0) == 5.0
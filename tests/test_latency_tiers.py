@@ -0,0 +1,120 @@
+# tests/test_latency_tiers.py
+"""
+Latency tiers: truncated evaluation matches the boosted model's own tree
+ranges (plain and stacked), and TierPolicy degrades with the latency budget
+and the job queue depth.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+import xgboost
+from sklearn.ensemble import StackingClassifier
+from sklearn.linear_model import LogisticRegression
+
+from latency_tiers import (
+    QUEUE_DEPTH_TIERS, TIER_NAMES, TierPolicy, TieredModel, _stack_features, boosted_rounds,
+    run_tiered, truncated_proba,
+)
+
+ROUNDS = 20
+
+
+@pytest.fixture(scope="module")
+def data():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(400, 4)), columns=["duration", "src_bytes", "dst_bytes", "count"])
+    y = np.where(X["src_bytes"] + 0.5 * X["count"] + rng.normal(0, 0.5, len(X)) > 0, "Intrusion", "Benign")
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def xgb(data):
+    X, y = data
+    model = xgboost.XGBClassifier(n_estimators=ROUNDS, max_depth=3, n_jobs=1)
+    return model.fit(X, (y == "Intrusion").astype(int))
+
+
+# -------------------------------------------------------
+# Truncated evaluation
+# -------------------------------------------------------
+
+def test_truncation_uses_a_prefix_of_the_trees(xgb, data):
+    X, _ = data
+    assert boosted_rounds(xgb) == ROUNDS
+    np.testing.assert_array_equal(truncated_proba(xgb, X, 1.0), xgb.predict_proba(X))
+    np.testing.assert_array_equal(truncated_proba(xgb, X, 0.5),
+                                  xgb.predict_proba(X, iteration_range=(0, ROUNDS // 2)))
+    np.testing.assert_array_equal(truncated_proba(xgb, X, 0.001),  # never fewer than one tree
+                                  xgb.predict_proba(X, iteration_range=(0, 1)))
+    assert not np.array_equal(truncated_proba(xgb, X, 0.2), xgb.predict_proba(X))
+
+
+def test_stacked_meta_features_match_sklearn(data):
+    X, y = data
+    stack = StackingClassifier(
+        [("xgb", xgboost.XGBClassifier(n_estimators=ROUNDS, max_depth=3, n_jobs=1)),
+         ("lr", LogisticRegression())],
+        final_estimator=LogisticRegression(), cv=3,
+    ).fit(X, (y == "Intrusion").astype(int))
+    np.testing.assert_allclose(truncated_proba(stack, X, 1.0), stack.predict_proba(X))
+
+    # At 0.5 only the boosted base model changes; the meta-features are rebuilt from it
+    xgb_half = stack.estimators_[0].predict_proba(X, iteration_range=(0, ROUNDS // 2))[:, 1:]
+    lr = stack.estimators_[1].predict_proba(X)[:, 1:]
+    np.testing.assert_allclose(_stack_features(stack, X, 0.5), np.hstack([xgb_half, lr]))
+    np.testing.assert_allclose(_stack_features(stack, X, 1.0), stack.transform(X))
+
+
+def test_models_without_trees_are_not_truncated(data):
+    X, y = data
+    lr = LogisticRegression().fit(X, y)
+    assert boosted_rounds(lr) is None
+    np.testing.assert_array_equal(truncated_proba(lr, X, 0.2), lr.predict_proba(X))
+
+
+def test_tiered_model(xgb, data):
+    X, _ = data
+    tiered = TieredModel(xgb, "reduced")
+    np.testing.assert_array_equal(tiered.predict_proba(X), truncated_proba(xgb, X, 0.5))
+    assert tiered.predict(X).tolist() == tiered.predict_proba(X).argmax(axis=1).tolist()
+    with pytest.raises(ValueError):
+        TieredModel(xgb, "turbo")
+
+
+def test_run_tiered_records_the_tier(xgb, data):
+    X, _ = data
+    policy = TierPolicy(queue_depth=lambda: QUEUE_DEPTH_TIERS[0])
+    result = run_tiered(xgb, X, policy)
+    assert result["tier"].unique().tolist() == ["reduced"]
+    assert list(result["tier"].cat.categories) == list(TIER_NAMES)
+    assert policy.costs()["reduced"] is not None
+
+
+# -------------------------------------------------------
+# Tier selection
+# -------------------------------------------------------
+
+@pytest.mark.parametrize("depth, tier", [(0, "full"), (QUEUE_DEPTH_TIERS[0], "reduced"),
+                                         (QUEUE_DEPTH_TIERS[1], "minimal"), (100, "minimal")])
+def test_queue_depth_sets_the_floor(depth, tier):
+    assert TierPolicy(queue_depth=lambda: depth).choose() == tier
+
+
+def test_budget_picks_the_most_accurate_tier_that_fits():
+    measured = [{"tier": "full", "ms_per_1k": 40.0}, {"tier": "reduced", "ms_per_1k": 20.0},
+                {"tier": "minimal", "ms_per_1k": 8.0}]
+    assert TierPolicy(50.0, measurements=measured).choose() == "full"
+    assert TierPolicy(25.0, measurements=measured).choose() == "reduced"
+    assert TierPolicy(5.0, measurements=measured).choose() == "minimal"  # nothing fits
+    assert TierPolicy(50.0, lambda: QUEUE_DEPTH_TIERS[0], measured).choose() == "reduced"
+
+
+def test_observed_latency_moves_the_choice():
+    policy = TierPolicy(25.0, measurements=[{"tier": "full", "ms_per_1k": 20.0}])
+    assert policy.choose() == "full"
+    for _ in range(10):
+        policy.observe("full", 1000, 0.1)  # 100 ms per 1,000 flows
+    assert policy.costs()["full"] > 25.0
+    assert policy.choose() == "reduced"  # unmeasured: tried next
+    policy.observe("full", 0, 1.0)  # empty batches are ignored
@@ -0,0 +1,69 @@
+# tests/test_ledger_chain.py
+"""
+A ledger written before the v2 encoding (blocks without `enc`) must keep
+verifying once v2 blocks are appended to it, and tampering must still be
+found, by the incremental check and by the full audit.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+import ledger
+from block_codec import hash_core
+from ledger_store import SegmentedFileStore
+
+
+def _legacy_block(index, data, prev_hash, event_type="intrusion_log"):
+    core = {"index": index, "timestamp": 1700000000.0 + index, "event_type": event_type,
+            "data": data, "prev_hash": prev_hash}
+    core["hash"] = hash_core(core)  # legacy JSON encoding, no `enc` field
+    return core
+
+
+def _write_legacy_chain(directory):
+    genesis = _legacy_block(0, {"info": "SentinelSecure threat ledger genesis block"}, "0", "genesis")
+    hit = _legacy_block(1, {"flow_index": 3, "label": "Intrusion", "recommended_action": "BLOCK",
+                            "features": {"src_bytes": 181.0, "duration": 0}}, genesis["hash"])
+    store = SegmentedFileStore(directory)
+    store.append([genesis, hit])
+    store.close()
+
+
+@pytest.fixture
+def ledger_dir(tmp_path):
+    directory = str(tmp_path / "ledger")
+    _write_legacy_chain(directory)
+    ledger.configure_storage(directory)
+    yield directory
+    ledger.configure_storage(None)
+
+
+def test_legacy_blocks_verify_alongside_v2_blocks(ledger_dir):
+    ledger.add_log({"flow_index": 4, "label": "Intrusion", "recommended_action": "QUARANTINE",
+                    "confidence": np.float32(0.8),
+                    "features": {"src_bytes": np.float64(10.5), "duration": np.int64(2)}})
+    ledger.flush()
+    blocks = ledger.get_chain_as_list()
+    assert [b.get("enc") for b in blocks] == [None, None, 2]
+    assert ledger.verify_chain(full=True)
+    assert ledger.audit_report(workers=1)["ok"]
+    assert ledger.get_block_features(blocks[2]) == {"src_bytes": 10.5, "duration": 2}
+
+
+def test_tampered_legacy_block_is_located(ledger_dir):
+    ledger.add_log({"flow_index": 4, "label": "Intrusion", "recommended_action": "BLOCK"})
+    ledger.configure_storage(None)
+
+    (segment,) = [f for f in os.listdir(ledger_dir) if f.startswith("segment")]
+    path = os.path.join(ledger_dir, segment)
+    with open(path, "rb") as fh:
+        payload = fh.read()
+    with open(path, "wb") as fh:
+        fh.write(payload.replace(b'"BLOCK"', b'"ALLOW"', 1))
+
+    ledger.configure_storage(ledger_dir)
+    assert not ledger.verify_chain(full=True)
+    report = ledger.audit_report(workers=1)
+    assert not report["ok"] and report["first_bad_index"] == 1
@@ -0,0 +1,80 @@
+# tests/test_ledger_checkpoint.py
+"""
+Incremental verification: verify_chain() checks only the blocks appended since
+the trusted checkpoint, after confirming the checkpoint block is still in place.
+"""
+
+import os
+
+import pytest
+
+import ledger
+
+
+def _add(flow_indices):
+    for i in flow_indices:
+        ledger.add_log({"flow_index": i, "label": "Intrusion", "recommended_action": "BLOCK"})
+
+
+def _tamper(directory, flow_index):
+    (segment,) = [f for f in os.listdir(directory) if f.endswith(".jsonl")]
+    path = os.path.join(directory, segment)
+    with open(path, "rb") as fh:
+        data = fh.read()
+    old = b'"flow_index":%d' % flow_index
+    assert data.count(old) == 1
+    with open(path, "wb") as fh:
+        fh.write(data.replace(old, b'"flow_index":999'))
+
+
+@pytest.fixture
+def ledger_dir(tmp_path):
+    """Genesis + blocks 1..3 (flows 0..2), verified: the checkpoint sits on block 3."""
+    directory = str(tmp_path / "ledger")
+    ledger.configure_storage(directory)
+    _add(range(3))
+    assert ledger.get_checkpoint() is None
+    assert ledger.verify_chain()
+    yield directory
+    ledger.configure_storage(None)
+
+
+def test_checkpoint_advances_to_the_tip(ledger_dir):
+    tip = ledger.get_chain_as_list()[-1]
+    assert ledger.get_checkpoint() == {"index": 3, "hash": tip["hash"]}
+    _add([3, 4])
+    assert ledger.get_checkpoint()["index"] == 3
+    assert ledger.verify_chain()
+    assert ledger.get_checkpoint()["index"] == 5
+
+
+def test_checkpoint_survives_reopening(ledger_dir):
+    checkpoint = ledger.get_checkpoint()
+    ledger.configure_storage(None)
+    ledger.configure_storage(ledger_dir)
+    assert ledger.get_checkpoint() == checkpoint and ledger.verify_chain()
+
+
+def test_tampered_block_after_the_checkpoint_is_caught(ledger_dir):
+    _add([3, 4])
+    ledger.configure_storage(None)
+    _tamper(ledger_dir, 4)
+    ledger.configure_storage(ledger_dir)
+    assert not ledger.verify_chain()
+    assert ledger.get_checkpoint()["index"] == 3  # not advanced past the bad block
+
+
+def test_tampered_checkpoint_block_is_caught(ledger_dir):
+    ledger.configure_storage(None)
+    _tamper(ledger_dir, 2)  # block 3, the checkpoint anchor
+    ledger.configure_storage(ledger_dir)
+    assert not ledger.verify_chain()
+
+
+def test_blocks_before_the_checkpoint_need_a_full_audit(ledger_dir):
+    ledger.configure_storage(None)
+    _tamper(ledger_dir, 0)  # block 1, already covered by the checkpoint
+    ledger.configure_storage(ledger_dir)
+    assert ledger.verify_chain()
+    assert not ledger.verify_chain(full=True)
+    assert ledger.audit_report(workers=1)["first_bad_index"] == 1
@@ -0,0 +1,38 @@
+# tests/test_ledger_concurrency.py
+"""
+Concurrent writers and readers: no append is lost, block indexes stay unique
+and contiguous, and the chain still verifies (ledger_stress.run_stress).
+"""
+
+import pytest
+
+import ledger
+from ledger_stress import run_stress
+
+
+@pytest.mark.parametrize("backend", ["segments", "sqlite"])
+@pytest.mark.parametrize("batch", [1, 8])
+def test_concurrent_appends_are_all_kept(tmp_path, backend, batch):
+    report = run_stress(writers=4, blocks_per_writer=40, batch=batch, readers=1,
+                        directory=str(tmp_path / "ledger"), backend=backend)
+    assert report["appended"] == 160
+    assert report["indices_contiguous"] and report["all_entries_once"]
+    assert report["chain_valid"] and report["reader_errors"] == 0
+    assert report["ok"]
+
+
+def test_stress_on_an_existing_ledger_checks_only_new_blocks(tmp_path):
+    directory = str(tmp_path / "ledger")
+    ledger.configure_storage(directory)
+    ledger.add_logs([{"flow_index": i, "label": "Intrusion"} for i in range(5)])
+    ledger.configure_storage(None)
+
+    report = run_stress(writers=3, blocks_per_writer=20, batch=4, directory=directory)
+    assert report["appended"] == 60 and report["ok"]
+
+    ledger.configure_storage(directory)
+    try:
+        assert ledger.query_blocks(page_size=1)["total"] == 1 + 5 + 60
+        assert ledger.verify_chain(full=True)
+    finally:
+        ledger.configure_storage(None)
@@ -0,0 +1,99 @@
+# tests/test_ledger_idempotency.py
+"""
+Idempotent appends: re-committing the same scored flows (same features,
+flow_index, decision and model version) never adds a second block.
+"""
+
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ledger
+from scoring import ledger_batch
+
+
+def _intrusions():
+    return pd.DataFrame(
+        {
+            "src_bytes": [181.0, 239.0, 0.0],
+            "label": ["Intrusion"] * 3,
+            "score": np.float32([0.95, 0.75, 0.6]),
+            "recommended_action": ["BLOCK", "QUARANTINE", "ALERT"],
+        },
+        index=[3, 8, 11],
+    )
+
+
+@pytest.fixture(params=["segments", "sqlite"])
+def ledger_dir(request, tmp_path):
+    directory = str(tmp_path / "ledger")
+    ledger.configure_storage(directory, backend=request.param)
+    yield directory, request.param
+    ledger.configure_storage(None)
+
+
+def _n_blocks():
+    return ledger.query_blocks(page_size=1)["total"]
+
+
+def test_repeated_add_logs_is_a_no_op(ledger_dir):
+    batch, keys = ledger_batch(_intrusions(), ledger.idempotency_key, "v1")
+    assert len(ledger.add_logs(batch, idempotency_keys=keys)) == 3
+    assert ledger.add_logs(batch, idempotency_keys=keys) == []
+    assert _n_blocks() == 4 and ledger.verify_chain(full=True)
+
+    block = ledger.find_block(keys[1])
+    assert block["index"] == 2 and block["data"]["flow_index"] == 8
+    assert ledger.find_block("00" * 32) is None
+
+
+def test_keys_survive_reopening(ledger_dir):
+    directory, backend = ledger_dir
+    batch, keys = ledger_batch(_intrusions(), ledger.idempotency_key, "v1")
+    ledger.add_logs(batch, idempotency_keys=keys)
+    ledger.configure_storage(None)
+    ledger.configure_storage(directory, backend=backend)
+    assert ledger.add_logs(batch, idempotency_keys=keys) == []
+    assert ledger.find_block(keys[2])["data"]["flow_index"] == 11
+
+
+def test_new_model_version_or_decision_is_a_new_entry(ledger_dir):
+    batch, keys = ledger_batch(_intrusions(), ledger.idempotency_key, "v1")
+    ledger.add_logs(batch, idempotency_keys=keys)
+    batch, keys = ledger_batch(_intrusions(), ledger.idempotency_key, "v2")
+    assert len(ledger.add_logs(batch, idempotency_keys=keys)) == 3
+
+    entry = {"flow_index": 3, "label": "Intrusion", "recommended_action": "ALERT",
+             "features": {"src_bytes": 181.0}}
+    assert ledger.idempotency_key(entry, "v1") != ledger.idempotency_key(
+        dict(entry, recommended_action="BLOCK"), "v1")
+    # Confidence is not part of the key: float noise between reruns still deduplicates
+    assert ledger.idempotency_key(dict(entry, confidence=0.91), "v1") == ledger.idempotency_key(entry, "v1")
+
+
+def test_duplicates_within_one_batch_are_skipped(ledger_dir):
+    entry = {"flow_index": 1, "label": "Intrusion", "recommended_action": "BLOCK"}
+    key = ledger.idempotency_key(entry)
+    blocks = ledger.add_logs([entry, entry, dict(entry, flow_index=2)], idempotency_keys=[key, key, None])
+    assert [b["data"]["flow_index"] for b in blocks] == [1, 2]
+    with pytest.raises(ValueError):
+        ledger.add_logs([entry], idempotency_keys=[])
+
+
+def test_concurrent_add_log_with_one_key_appends_once(ledger_dir):
+    entry = {"flow_index": 5, "label": "Intrusion", "recommended_action": "BLOCK"}
+    key = ledger.idempotency_key(entry, "v1")
+    results = []
+
+    def commit():
+        results.append(ledger.add_log(entry, idempotency_key=key))
+
+    threads = [threading.Thread(target=commit) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert {b["index"] for b in results} == {1}
+    assert _n_blocks() == 2
@@ -0,0 +1,109 @@
+# tests/test_ledger_sqlite.py
+"""
+SQLite (WAL) backend: blocks survive reopening, stream and random-access
+correctly, audit in index ranges, and tampering with a row is detected.
+"""
+
+import os
+import sqlite3
+
+import pytest
+
+import ledger
+from ledger_audit import run_audit
+from ledger_store import SQLITE_FILE, TIP_CACHE_BLOCKS, SQLiteStore
+
+N_FLOWS = 300  # more than the tip cache, so some reads go to the database
+
+
+def _blocks(start, n):
+    return [{"index": i, "timestamp": float(i), "event_type": "intrusion_log",
+             "data": {"flow_index": i}, "prev_hash": "0", "hash": f"{i:064x}"} for i in range(start, start + n)]
+
+
+@pytest.fixture
+def ledger_dir(tmp_path):
+    directory = str(tmp_path / "ledger")
+    ledger.configure_storage(directory, backend="sqlite")
+    ledger.add_logs([{"flow_index": i, "label": "Intrusion", "recommended_action": "BLOCK",
+                      "features": {"src_bytes": float(i)}} for i in range(N_FLOWS)])
+    ledger.configure_storage(None)
+    yield directory
+    ledger.configure_storage(None)
+
+
+# -------------------------------------------------------
+# Through the ledger
+# -------------------------------------------------------
+
+def test_chain_survives_reopening_and_audits(ledger_dir):
+    ledger.configure_storage(ledger_dir, backend="sqlite")
+    assert ledger.query_blocks(page_size=1)["total"] == N_FLOWS + 1
+    ledger.add_log({"flow_index": N_FLOWS, "label": "Intrusion", "recommended_action": "ALERT"})
+    assert ledger.verify_chain(full=True)
+    report = ledger.audit_report(workers=1)
+    assert report["ok"] and report["blocks"] == N_FLOWS + 2 and report["feature_rows"] == N_FLOWS
+    block = next(ledger.iter_blocks(5))
+    assert ledger.get_block_features(block) == {"src_bytes": 4.0}
+
+
+def test_tampered_row_is_detected(ledger_dir):
+    conn = sqlite3.connect(os.path.join(ledger_dir, SQLITE_FILE))
+    with conn:
+        conn.execute("UPDATE blocks SET line = replace(line, '\"BLOCK\"', '\"ALLOW\"') WHERE idx = 42")
+    conn.close()
+
+    ledger.configure_storage(ledger_dir, backend="sqlite")
+    assert not ledger.verify_chain(full=True)
+    assert ledger.audit_report(workers=1)["first_bad_index"] == 42
+
+
+def test_audit_ranges_cover_the_chain(ledger_dir):
+    store = SQLiteStore(ledger_dir)
+    tasks = store.audit_tasks(len(store), chunk_blocks=7)
+    assert tasks[0][2:] == (0, 7) and tasks[-1][3] == len(store)
+    assert run_audit(tasks, len(store), workers=1)["ok"]
+    store.close()
+
+
+# -------------------------------------------------------
+# Store
+# -------------------------------------------------------
+
+def test_reads_page_and_reach_past_the_tip_cache(tmp_path):
+    store = SQLiteStore(str(tmp_path))
+    store.append(_blocks(0, TIP_CACHE_BLOCKS + 50))
+    store.close()
+
+    store = SQLiteStore(str(tmp_path))
+    n = TIP_CACHE_BLOCKS + 50
+    assert len(store) == n and store.tip()["index"] == n - 1
+    assert [b["index"] for b in store.iter_blocks(10)] == list(range(10, n))
+    assert [b["data"]["flow_index"] for b in store.read_blocks([n - 1, 3, 3])] == [n - 1, 3, 3]
+    with pytest.raises(IndexError):
+        store.read_blocks([n])
+    store.close()
+
+
+def test_failed_append_rolls_back(tmp_path):
+    store = SQLiteStore(str(tmp_path))
+    store.append(_blocks(0, 3))
+    with pytest.raises(sqlite3.IntegrityError):
+        store.append(_blocks(3, 2) + _blocks(2, 1))  # duplicate index 2
+    assert len(store) == 3
+    store.close()
+    store = SQLiteStore(str(tmp_path))
+    assert [b["index"] for b in store.iter_blocks()] == [0, 1, 2]
+    store.close()
+
+
+def test_wal_checkpoint_is_batched(tmp_path):
+    syncs = []
+    store = SQLiteStore(str(tmp_path), fsync_batch=3, before_sync=lambda: syncs.append(True))
+    store.append(_blocks(0, 2))
+    assert store._pending == 2 and not syncs
+    store.append(_blocks(2, 1))
+    assert store._pending == 0 and len(syncs) == 1
+    store.put_meta("k", {"a": 1})
+    assert store.get_meta("k") == {"a": 1} and store.get_meta("missing", 0) == 0
+    store.close()
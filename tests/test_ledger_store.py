@@ -0,0 +1,131 @@
+# tests/test_ledger_store.py
+"""
+Segmented file store: recovery on open (torn tails are cut, tampered blocks
+are kept for the audit) and group commit (batched / timed fsync).
+"""
+
+import os
+import time
+
+import pytest
+
+import ledger
+from ledger_store import SegmentedFileStore
+
+
+def _blocks(start, n):
+    return [{"index": i, "timestamp": float(i), "event_type": "intrusion_log",
+             "data": {"flow_index": i}, "prev_hash": "0", "hash": f"{i:064x}"} for i in range(start, start + n)]
+
+
+def _segment(directory):
+    (name,) = [f for f in os.listdir(directory) if f.endswith(".jsonl")]
+    return os.path.join(directory, name)
+
+
+@pytest.fixture
+def chain_dir(tmp_path):
+    """A closed ledger directory holding genesis + 3 intrusion blocks."""
+    directory = str(tmp_path / "ledger")
+    ledger.configure_storage(directory)
+    for i in range(3):
+        ledger.add_log({"flow_index": i, "label": "Intrusion", "recommended_action": "BLOCK"})
+    ledger.configure_storage(None)
+    yield directory
+    ledger.configure_storage(None)
+
+
+def _rewrite(path, fn):
+    with open(path, "rb") as fh:
+        data = fh.read()
+    with open(path, "wb") as fh:
+        fh.write(fn(data))
+
+
+# -------------------------------------------------------
+# Recovery
+# -------------------------------------------------------
+
+def test_torn_tail_is_truncated(chain_dir):
+    path = _segment(chain_dir)
+    size = os.path.getsize(path)
+    with open(path, "ab") as fh:
+        fh.write(b'{"index":4,"timest')  # crash mid-line
+
+    store = SegmentedFileStore(chain_dir)
+    assert len(store) == 4 and store.truncated_bytes > 0
+    store.close()
+    assert os.path.getsize(path) == size
+
+    ledger.configure_storage(chain_dir)
+    assert ledger.verify_chain(full=True)
+
+
+def test_unparsable_final_line_is_truncated(chain_dir):
+    with open(_segment(chain_dir), "ab") as fh:
+        fh.write(b"\x00" * 40 + b"\n")
+    ledger.configure_storage(chain_dir)
+    assert len(ledger.get_chain_as_list()) == 4 and ledger.verify_chain(full=True)
+
+
+def test_tampered_final_block_is_kept_and_reported(chain_dir):
+    _rewrite(_segment(chain_dir), lambda d: d.replace(b'"flow_index":2', b'"flow_index":9'))
+    ledger.configure_storage(chain_dir)
+    blocks = ledger.get_chain_as_list()
+    assert len(blocks) == 4 and blocks[3]["data"]["flow_index"] == 9
+    assert not ledger.verify_chain(full=True)
+    assert ledger.audit_report(workers=1)["first_bad_index"] == 3
+
+
+def test_tampered_middle_block_is_kept_and_reported(chain_dir):
+    _rewrite(_segment(chain_dir), lambda d: d.replace(b'"flow_index":0', b'"flow_index":9'))
+    ledger.configure_storage(chain_dir)
+    assert len(ledger.get_chain_as_list()) == 4
+    assert ledger.audit_report(workers=1)["first_bad_index"] == 1
+
+
+def test_garbled_middle_block_is_refused(chain_dir):
+    def garble(data):
+        lines = data.split(b"\n")
+        lines[1] = lines[1][:20]
+        return b"\n".join(lines)
+
+    _rewrite(_segment(chain_dir), garble)
+    with pytest.raises(ValueError):
+        SegmentedFileStore(chain_dir)
+
+
+# -------------------------------------------------------
+# Group commit
+# -------------------------------------------------------
+
+def test_fsync_is_batched(tmp_path):
+    syncs = []
+    store = SegmentedFileStore(str(tmp_path), fsync_batch=3, fsync_interval=3600,
+                               before_sync=lambda: syncs.append(True))
+    store.append(_blocks(0, 2))
+    assert store._pending == 2 and not syncs
+    store.append(_blocks(2, 1))
+    assert store._pending == 0 and len(syncs) == 1
+    store.close()
+
+
+def test_idle_tail_is_synced_by_the_flusher(tmp_path):
+    store = SegmentedFileStore(str(tmp_path), fsync_batch=1000, fsync_interval=0.02)
+    store.append(_blocks(0, 1))
+    deadline = time.monotonic() + 5
+    while store._pending and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert store._pending == 0
+    store.close()
+
+
+def test_blocks_survive_reopening_across_segments(tmp_path):
+    store = SegmentedFileStore(str(tmp_path), segment_max_blocks=4)
+    store.append(_blocks(0, 10))
+    store.close()
+    store = SegmentedFileStore(str(tmp_path), segment_max_blocks=4)
+    assert len(store) == 10 and store.verify_seals()["ok"]
+    assert [b["index"] for b in store.iter_blocks(0)] == list(range(10))
+    assert [b["data"]["flow_index"] for b in store.read_blocks([7, 1])] == [7, 1]
+    store.close()
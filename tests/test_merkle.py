@@ -0,0 +1,99 @@
+# tests/test_merkle.py
+"""
+Merkle tree over block hashes: roots match RFC 6962, inclusion proofs verify
+against the root (and nothing else does), and the ledger keeps the tree in
+line with the chain across reopening.
+"""
+
+import hashlib
+import os
+import shutil
+
+import pytest
+
+import ledger
+from merkle import MerkleTree, leaf_hash, node_hash, proof_to_dict, verify_inclusion
+
+HASHES = [hashlib.sha256(str(i).encode()).hexdigest() for i in range(17)]
+
+
+def _mth(hashes):
+    """Reference Merkle tree hash (RFC 6962 §2.1), straight from the definition."""
+    if len(hashes) == 1:
+        return leaf_hash(hashes[0])
+    k = 1 << ((len(hashes) - 1).bit_length() - 1)
+    return node_hash(_mth(hashes[:k]), _mth(hashes[k:]))
+
+
+# -------------------------------------------------------
+# Tree
+# -------------------------------------------------------
+
+def test_every_proof_verifies_against_the_root():
+    tree = MerkleTree(None)
+    for size in range(1, len(HASHES) + 1):
+        tree.append([HASHES[size - 1]])
+        assert tree.root() == _mth(HASHES[:size])
+        for index in range(size):
+            proof = proof_to_dict(tree, index, HASHES[index])
+            assert verify_inclusion(**proof), (size, index)
+
+
+def test_wrong_proofs_fail():
+    tree = MerkleTree(None)
+    tree.append(HASHES[:11])
+    proof = proof_to_dict(tree, 6, HASHES[6])
+    assert verify_inclusion(**proof)
+    assert not verify_inclusion(**dict(proof, block_hash=HASHES[7]))
+    assert not verify_inclusion(**dict(proof, index=7))
+    assert not verify_inclusion(**dict(proof, tree_size=7))  # leaf 6 would be the last
+    assert not verify_inclusion(**dict(proof, root=_mth(HASHES[:10]).hex()))
+    assert not verify_inclusion(**dict(proof, path=proof["path"][:-1]))
+    with pytest.raises(IndexError):
+        tree.inclusion_path(11)
+
+
+def test_tree_is_rebuilt_from_its_level_files(tmp_path):
+    directory = str(tmp_path / "merkle")
+    tree = MerkleTree(directory)
+    tree.append(HASHES)
+    tree.close()
+    os.remove(os.path.join(directory, "level-02.bin"))  # parents lost in a crash
+
+    tree = MerkleTree(directory)
+    assert len(tree) == len(HASHES) and tree.root() == _mth(HASHES)
+    assert tree.root(5) == _mth(HASHES[:5])
+    tree.close()
+
+
+# -------------------------------------------------------
+# Ledger
+# -------------------------------------------------------
+
+@pytest.fixture
+def ledger_dir(tmp_path):
+    directory = str(tmp_path / "ledger")
+    ledger.configure_storage(directory)
+    ledger.add_logs([{"flow_index": i, "label": "Intrusion"} for i in range(6)])
+    yield directory
+    ledger.configure_storage(None)
+
+
+def test_ledger_proofs_verify_against_the_published_root(ledger_dir):
+    published = ledger.get_merkle_root()
+    assert published["tree_size"] == 7
+    for index in range(7):
+        proof = ledger.get_inclusion_proof(index)
+        assert proof["block_hash"] == next(ledger.iter_blocks(index))["hash"]
+        assert verify_inclusion(**dict(proof, root=published["root"]))
+    with pytest.raises(IndexError):
+        ledger.get_inclusion_proof(7)
+
+
+def test_ledger_rebuilds_a_lost_tree_on_open(ledger_dir):
+    root = ledger.get_merkle_root()
+    ledger.configure_storage(None)
+    shutil.rmtree(os.path.join(ledger_dir, "merkle"))
+    ledger.configure_storage(ledger_dir)
+    assert ledger.get_merkle_root() == root
+    assert verify_inclusion(**ledger.get_inclusion_proof(3))
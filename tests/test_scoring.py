@@ -0,0 +1,46 @@
+# tests/test_scoring.py
+"""
+Vectorized decisions (scoring.action_codes) must match recommend_action flow
+by flow, and ledger commits must carry the scores the analyst sees.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from scoring import ACTIONS, action_codes, ledger_batch, recommend_action
+
+EDGES = [0.0, 0.5, 0.699, 0.7, 0.701, 0.899, 0.9, 0.901, 1.0]
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_action_codes_match_recommend_action_at_the_thresholds(dtype):
+    # Scores are rounded to 3 decimals in the model's own dtype, as score_features does
+    scores = np.asarray(EDGES, dtype=dtype).round(3)
+    for intrusion in (True, False):
+        mask = np.full(len(scores), intrusion)
+        label = "Intrusion" if intrusion else "Benign"
+        got = [ACTIONS[c] for c in action_codes(mask, scores)]
+        assert got == [recommend_action(label, s) for s in scores]
+
+
+def test_float32_thresholds_are_inclusive():
+    codes = action_codes(np.array([True, True, True, False]), np.float32([0.9, 0.7, 0.5, 0.9]))
+    assert [ACTIONS[c] for c in codes] == ["BLOCK", "QUARANTINE", "ALERT", "ALLOW"]
+
+
+def test_action_codes_without_scores():
+    codes = action_codes(np.array([True, False]))
+    assert [ACTIONS[c] for c in codes] == ["BLOCK", "ALLOW (monitor)"]
+
+
+def test_ledger_batch_commits_the_displayed_confidence():
+    intrusions = pd.DataFrame({
+        "src_bytes": [1.0, 2.0],
+        "label": ["Intrusion", "Intrusion"],
+        "score": np.float32([0.9, 0.7]),
+        "recommended_action": ["BLOCK", "QUARANTINE"],
+    })
+    batch, keys = ledger_batch(intrusions)
+    assert batch["confidence"] == [0.9, 0.7]
+    assert keys is None